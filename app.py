@@ -1,41 +1,67 @@
-from flask import Flask, render_template, request, redirect, flash, send_file
-import pandas as pd
+from flask import Flask, render_template, request, redirect, flash, send_file, g, jsonify, Response
+import io
 import os
+import threading
 from datetime import datetime
 import sys
-import tempfile
 
 # Importar módulos del core
-from core.dashboard import obtener_datos_dashboard, obtener_habitaciones_ocupadas
+from core.dashboard import obtener_datos_dashboard, obtener_habitaciones_ocupadas, construir_snapshot
 from core.consumos import (
     obtener_resumen_habitacion, 
     agregar_consumo, 
     eliminar_consumo_por_indice
 )
 from core.reserva_express import crear_reserva_express, obtener_habitaciones_disponibles, validar_datos_reserva
+from core.almacen import (
+    obtener_almacen_pasajeros, obtener_almacen_consumos,
+    COLUMNAS_REQUERIDAS_PASAJEROS, TIPOS_PASAJEROS
+)
+from core.exportacion import generar_pase_de_caja, generar_csv, TIPO_XLSX, TIPO_CSV
+from core import metricas
+from core.perfilado import perfilador, instalar as instalar_perfilado
 
 app = Flask(__name__)
 app.secret_key = 'temporada_2026_recepcion_key_secreta'
+metricas.instalar(app)
+instalar_perfilado(app)
 
 # Archivos de datos
 DB_PASAJEROS = 'data/pasajeros.csv'
 DB_CONSUMOS = 'data/consumos_diarios.csv'
 
+def snapshot_actual():
+    """
+    Retorna el snapshot del hotel de la request actual.
+    Se calcula la primera vez que se pide y se reutiliza en el resto de la request.
+    """
+    if 'snapshot' not in g:
+        g.snapshot = construir_snapshot(DB_PASAJEROS, DB_CONSUMOS)
+    return g.snapshot
+
 def validar_pasajero(habitacion):
     """
     Verifica que la habitación exista en el CSV de pasajeros activos.
     Retorna el nombre del pasajero si existe, None si no.
     """
-    if not os.path.exists(DB_PASAJEROS):
-        return None
-    
-    df_pasajeros = pd.read_csv(DB_PASAJEROS)
-    pasajero = df_pasajeros[df_pasajeros['Nro. habitación'] == int(habitacion)]
-    
-    if pasajero.empty:
-        return None
+    return validar_pasajeros([habitacion])[habitacion]
+
+def validar_pasajeros(habitaciones):
+    """
+    Versión por lotes de validar_pasajero: busca todas las habitaciones en el
+    índice habitación → nombre, que se arma una sola vez por versión del archivo.
+    Retorna un diccionario {habitacion: nombre o None}.
+    """
+    almacen = obtener_almacen_pasajeros(DB_PASAJEROS)
+    nombres = almacen.nombres_por_habitacion() if almacen.existe() else {}
     
-    return pasajero.iloc[0]['Apellido y nombre']
+    resultado = {}
+    for habitacion in habitaciones:
+        try:
+            resultado[habitacion] = nombres.get(int(habitacion))
+        except (TypeError, ValueError):
+            resultado[habitacion] = None
+    return resultado
 
 @app.route('/')
 def index():
@@ -45,14 +71,19 @@ def index():
 @app.route('/dashboard')
 def dashboard():
     """Dashboard principal con las 53 habitaciones"""
-    datos = obtener_datos_dashboard()
+    datos = obtener_datos_dashboard(snapshot_actual())
+    # Pie de depuración: costos de esta request y de las últimas acciones
+    pie_metricas = None
+    if app.debug or request.args.get('metricas'):
+        pie_metricas = {'actual': metricas.resumen_request(), 'recientes': metricas.metricas.recientes()}
     return render_template('dashboard.html', 
                          pisos=datos['pisos'],
                          estados=datos['estados'],
                          ocupadas=datos['ocupadas'],
                          reservadas=datos['reservadas'],
                          estadisticas=datos['estadisticas'],
-                         checkouts_hoy=datos['checkouts_hoy'])
+                         checkouts_hoy=datos['checkouts_hoy'],
+                         pie_metricas=pie_metricas)
 
 @app.route('/habitacion/<int:num_habitacion>')
 def ficha_habitacion(num_habitacion):
@@ -154,16 +185,12 @@ def confirmar_checkout(num_habitacion):
     
     try:
         # 1. Eliminar consumos de la habitación (se consideran pagados)
-        if os.path.exists(DB_CONSUMOS):
-            df_consumos = pd.read_csv(DB_CONSUMOS)
-            df_consumos = df_consumos[df_consumos['habitacion'] != num_habitacion]
-            df_consumos.to_csv(DB_CONSUMOS, index=False)
+        if obtener_almacen_consumos(DB_CONSUMOS).existe():
+            obtener_almacen_consumos(DB_CONSUMOS).liquidar_habitaciones([num_habitacion])
         
         # 2. Eliminar pasajero del registro
-        if os.path.exists(DB_PASAJEROS):
-            df_pasajeros = pd.read_csv(DB_PASAJEROS)
-            df_pasajeros = df_pasajeros[df_pasajeros['Nro. habitación'] != num_habitacion]
-            df_pasajeros.to_csv(DB_PASAJEROS, index=False)
+        if obtener_almacen_pasajeros(DB_PASAJEROS).existe():
+            obtener_almacen_pasajeros(DB_PASAJEROS).eliminar_habitaciones([num_habitacion])
         
         flash(f'✅ Check-out realizado exitosamente. Habitación {num_habitacion} ahora disponible.', 'success')
         return redirect('/dashboard')
@@ -176,12 +203,12 @@ def confirmar_checkout(num_habitacion):
 @app.route('/checkout-masivo')
 def vista_checkout_masivo():
     """Vista previa del checkout masivo con resumen de habitaciones y consumos"""
-    from core.dashboard import obtener_habitaciones_checkout, es_checkout_hoy
-    from core.consumos import obtener_total_consumos
+    from core.consumos import obtener_totales_por_habitacion
     
     # Obtener todas las habitaciones con checkout hoy
-    habitaciones_ocupadas = obtener_habitaciones_ocupadas()
-    checkouts_hoy = obtener_habitaciones_checkout()
+    snapshot = snapshot_actual()
+    habitaciones_ocupadas = snapshot.ocupadas
+    checkouts_hoy = snapshot.checkouts_hoy
     
     if not checkouts_hoy:
         flash('No hay habitaciones con checkout programado para hoy', 'info')
@@ -191,10 +218,15 @@ def vista_checkout_masivo():
     resumen_checkouts = []
     total_consumos_general = 0
     
+    # Totales de todas las habitaciones en una sola pasada
+    totales_por_habitacion = obtener_totales_por_habitacion(
+        [num_hab for num_hab in checkouts_hoy if num_hab in habitaciones_ocupadas], DB_CONSUMOS
+    )
+    
     for num_hab in sorted(checkouts_hoy):
         if num_hab in habitaciones_ocupadas:
             datos = habitaciones_ocupadas[num_hab]
-            totales_consumos = obtener_total_consumos(num_hab)
+            totales_consumos = totales_por_habitacion[num_hab]
             
             resumen_checkouts.append({
                 'habitacion': num_hab,
@@ -217,11 +249,9 @@ def vista_checkout_masivo():
 @app.route('/checkout-masivo/confirmar', methods=['POST'])
 def confirmar_checkout_masivo():
     """Procesa el checkout masivo: elimina todos los pasajeros con egreso hoy y sus consumos pagados"""
-    from core.dashboard import obtener_habitaciones_checkout
-    
     try:
         # Obtener habitaciones con checkout hoy
-        checkouts_hoy = obtener_habitaciones_checkout()
+        checkouts_hoy = snapshot_actual().checkouts_hoy
         
         if not checkouts_hoy:
             flash('No hay habitaciones para procesar', 'info')
@@ -231,21 +261,13 @@ def confirmar_checkout_masivo():
         
         # 1. Eliminar consumos de todas las habitaciones con checkout hoy
         consumos_eliminados = 0
-        if os.path.exists(DB_CONSUMOS):
-            df_consumos = pd.read_csv(DB_CONSUMOS)
-            consumos_antes = len(df_consumos)
-            df_consumos = df_consumos[~df_consumos['habitacion'].isin(checkouts_hoy)]
-            consumos_eliminados = consumos_antes - len(df_consumos)
-            df_consumos.to_csv(DB_CONSUMOS, index=False)
+        if obtener_almacen_consumos(DB_CONSUMOS).existe():
+            consumos_eliminados = obtener_almacen_consumos(DB_CONSUMOS).liquidar_habitaciones(checkouts_hoy)
         
         # 2. Eliminar pasajeros con fecha de egreso = hoy
-        if os.path.exists(DB_PASAJEROS):
-            df_pasajeros = pd.read_csv(DB_PASAJEROS)
-            fecha_hoy = datetime.now().strftime('%d/%m/%Y')
-            
-            # Eliminar todas las filas con egreso = hoy
-            df_pasajeros = df_pasajeros[df_pasajeros['Fecha de egreso'] != fecha_hoy]
-            df_pasajeros.to_csv(DB_PASAJEROS, index=False)
+        if obtener_almacen_pasajeros(DB_PASAJEROS).existe():
+            # Eliminar todas las filas con egreso = hoy (comparando fechas)
+            obtener_almacen_pasajeros(DB_PASAJEROS).eliminar_por_fecha('Fecha de egreso', datetime.now().date())
         
         flash(f'✅ Checkout masivo completado: {cantidad_procesada} habitaciones liberadas. '
               f'Consumos pagados: {consumos_eliminados} registros eliminados. '
@@ -275,35 +297,85 @@ def cargar_consumo():
         flash(f'❌ La habitación {habitacion} no está registrada en el sistema', 'danger')
         return redirect('/')
     
-    # Registrar el consumo
-    nuevo_registro = {
-        'fecha': datetime.now().strftime('%d/%m/%Y %H:%M'),
-        'habitacion': habitacion,
-        'pasajero': nombre_pasajero,
-        'categoria': categoria,
-        'monto': float(monto)
-    }
-    
-    # Guardar en el CSV
-    df_nuevo = pd.DataFrame([nuevo_registro])
-    
-    if os.path.exists(DB_CONSUMOS):
-        df_nuevo.to_csv(DB_CONSUMOS, mode='a', header=False, index=False)
-    else:
-        df_nuevo.to_csv(DB_CONSUMOS, mode='w', header=True, index=False)
+    # Registrar el consumo en el CSV
+    if not agregar_consumo(habitacion, categoria, monto, nombre_pasajero, DB_CONSUMOS):
+        flash('❌ Error al registrar el consumo', 'danger')
+        return redirect('/')
     
     flash(f'✅ Consumo registrado: {categoria} - ${monto} para {nombre_pasajero} (Hab. {habitacion})', 'success')
     return redirect('/')
 
+@app.route('/api/consumos/batch', methods=['POST'])
+def api_consumos_batch():
+    """
+    Registra un lote de consumos en una sola escritura.
+    Acepta JSON (lista de consumos o {"consumos": [...]}) o CSV con las columnas
+    habitacion, pasajero, categoria, monto, fecha (como cuerpo o en el campo 'archivo').
+    Retorna el resultado de cada fila (aceptada o rechazada con sus errores).
+    """
+    import pandas as pd
+    from core.consumos import agregar_consumos_lote
+    
+    try:
+        if request.is_json:
+            datos = request.get_json()
+            filas = datos.get('consumos') if isinstance(datos, dict) else datos
+        else:
+            archivo = request.files.get('archivo')
+            texto = archivo.read().decode('utf-8-sig') if archivo else request.get_data(as_text=True)
+            filas = pd.read_csv(io.StringIO(texto), dtype=str, keep_default_na=False).to_dict('records')
+    except Exception as e:
+        return jsonify({'error': f'No se pudo leer el lote: {e}'}), 400
+    
+    if not isinstance(filas, list) or not all(isinstance(fila, dict) for fila in filas):
+        return jsonify({'error': 'Se esperaba una lista de consumos'}), 400
+    
+    try:
+        resultados = agregar_consumos_lote(filas, snapshot_actual().ocupadas, DB_PASAJEROS, DB_CONSUMOS)
+    except Exception as e:
+        return jsonify({'error': f'Error al registrar el lote: {e}'}), 500
+    
+    aceptados = sum(1 for resultado in resultados if resultado['aceptado'])
+    return jsonify({
+        'aceptados': aceptados,
+        'rechazados': len(resultados) - aceptados,
+        'resultados': resultados
+    })
+
+@app.route('/api/validar-habitaciones')
+def api_validar_habitaciones():
+    """
+    Valida varias habitaciones a la vez: /api/validar-habitaciones?habitaciones=101,102
+    Retorna {habitacion: nombre del pasajero o null}.
+    """
+    habitaciones = [h.strip() for h in request.args.get('habitaciones', '').split(',') if h.strip()]
+    return jsonify(validar_pasajeros(habitaciones))
+
+@app.route('/api/disponibilidad')
+def api_disponibilidad():
+    """
+    Habitaciones libres para un rango: /api/disponibilidad?desde=2026-02-10&noches=3
+    Sin 'desde' se toma hoy; sin 'noches', una noche.
+    """
+    from core.disponibilidad import buscar_disponibles
+
+    try:
+        desde = request.args.get('desde', '').strip()
+        desde = datetime.strptime(desde, '%Y-%m-%d').date() if desde else datetime.now().date()
+        noches = request.args.get('noches', 1, type=int)
+        return jsonify(buscar_disponibles(desde, noches, DB_PASAJEROS))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
 @app.route('/cierre-dia')
 def cierre_dia():
     """Generar archivo de consulta de consumos agrupados por categoría (CSV)"""
-    if not os.path.exists(DB_CONSUMOS):
+    if not obtener_almacen_consumos(DB_CONSUMOS).existe():
         flash("No hay consumos registrados para realizar el cierre.", "warning")
         return redirect('/')
 
     # 1. Leer los consumos registrados
-    df = pd.read_csv(DB_CONSUMOS)
+    df = obtener_almacen_consumos(DB_CONSUMOS).obtener_df()
 
     # 2. Pivotear datos: Habitaciones como filas, solo 3 categorías como columnas
     tabla_cierre = df.pivot_table(
@@ -326,23 +398,21 @@ def cierre_dia():
     # 5. Calcular el total acumulado por habitación
     tabla_cierre['TOTAL_GENERAL'] = tabla_cierre.sum(axis=1)
 
-    # 6. Guardar temporalmente para la descarga
-    with tempfile.NamedTemporaryFile(mode='w', suffix='.csv', delete=False, newline='') as tmp:
-        archivo_salida = tmp.name
-        tabla_cierre.to_csv(archivo_salida)
+    # 6. Generar el CSV en memoria para la descarga
+    archivo_salida = generar_csv(tabla_cierre)
 
-    return send_file(archivo_salida, as_attachment=True, download_name=f"consulta_consumos_{datetime.now().strftime('%d-%m-%Y')}.csv")
+    return send_file(archivo_salida, mimetype=TIPO_CSV, as_attachment=True, download_name=f"consulta_consumos_{datetime.now().strftime('%d-%m-%Y')}.csv")
 
 @app.route('/cierre-xlsx')
 def cierre_xlsx():
     """Generar archivo de salidas en formato XLSX (Excel) - Cada categoría en su columna"""
-    if not os.path.exists(DB_CONSUMOS):
+    if not obtener_almacen_consumos(DB_CONSUMOS).existe():
         flash("No hay consumos registrados para generar el archivo de salidas.", "warning")
         return redirect('/')
     
     try:
         # Leer consumos
-        df_consumos = pd.read_csv(DB_CONSUMOS)
+        df_consumos = obtener_almacen_consumos(DB_CONSUMOS).obtener_df()
         
         # Crear tabla pivote: habitaciones en filas, categorías en columnas
         tabla_pivot = df_consumos.pivot_table(
@@ -361,49 +431,15 @@ def cierre_xlsx():
         # Calcular total por habitación
         tabla_pivot['Total'] = tabla_pivot['Estadía'] + tabla_pivot['Map'] + tabla_pivot['Bebidas']
         
-        # Crear estructura del archivo (replica salidas.xlsx)
-        max_filas = 30
-        data = [[None] * 6 for _ in range(max_filas)]
-        
-        # Fila 0: Título
-        data[0] = ['Pase de caja e información a turno mañana', None, None, None, None, None]
-        data[2] = [None, None, 'Turno:   00 A 08 HS', None, None, None]
-        data[3] = [None, None, None, None, f'Fecha: {datetime.now().strftime("%Y-%m-%d")}', None]
-        data[4] = ['Detalle a cobrar de habitaciones con salida', None, None, None, None, None]
-        data[5] = ['HAB', 'Estadía', 'Map', 'Bebidas', 'Forma de pago', 'Total']
-        data[6] = [None, None, None, None, None, None]
-        
-        # Datos de habitaciones - Cada categoría en su columna
-        fila_actual = 7
-        for idx, row in tabla_pivot.iterrows():
-            habitacion = row['habitacion']
-            estadia = row['Estadía'] if row['Estadía'] > 0 else None
-            map_val = row['Map'] if row['Map'] > 0 else None
-            bebidas = row['Bebidas'] if row['Bebidas'] > 0 else None
-            total = row['Total']
-            
-            # Distribuir valores en sus respectivas columnas
-            data[fila_actual] = [
-                int(habitacion),  # HAB (col 0)
-                estadia,          # Estadía (col 1)
-                map_val,          # Map (col 2)
-                bebidas,          # Bebidas (col 3)
-                None,             # Forma de pago (col 4)
-                total             # Total (col 5)
-            ]
-            fila_actual += 1
-        
-        # Rellenar filas vacías
-        for i in range(fila_actual, max_filas):
-            data[i] = [None, None, None, None, None, 0.0]
-        
-        # Guardar como XLSX in archivo temporal
-        df_salidas = pd.DataFrame(data)
-        with tempfile.NamedTemporaryFile(mode='wb', suffix='.xlsx', delete=False) as tmp:
-            archivo_salida = tmp.name
-            df_salidas.to_excel(archivo_salida, engine='openpyxl', index=False, header=False)
-        
-        return send_file(os.path.abspath(archivo_salida), as_attachment=True, download_name=f'salidas_{datetime.now().strftime("%d-%m-%Y")}.xlsx')
+        # Generar el Excel en memoria (replica salidas.xlsx)
+        archivo_salida = generar_pase_de_caja(
+            tabla_pivot.to_dict('records'),
+            fecha=datetime.now().strftime("%Y-%m-%d"),
+            detalle='Detalle a cobrar de habitaciones con salida',
+            total_relleno=0.0
+        )
+        
+        return send_file(archivo_salida, mimetype=TIPO_XLSX, as_attachment=True, download_name=f'salidas_{datetime.now().strftime("%d-%m-%Y")}.xlsx')
         
     except Exception as e:
         flash(f"Error al generar archivo Excel: {str(e)}", "danger")
@@ -412,33 +448,34 @@ def cierre_xlsx():
 @app.route('/generar-salidas-checkouts')
 def generar_salidas_checkouts():
     """Generar archivo consolidado de checkouts del día (XLSX) - Descarga automática"""
-    from core.dashboard import obtener_habitaciones_checkout, obtener_habitaciones_ocupadas
-    
     try:
         # Obtener habitaciones con checkout hoy
-        checkouts_hoy = obtener_habitaciones_checkout()
+        snapshot = snapshot_actual()
+        checkouts_hoy = snapshot.checkouts_hoy
         
         if not checkouts_hoy:
             flash("No hay habitaciones con check-out programado para hoy.", "warning")
             return redirect('/dashboard')
         
         # Obtener datos de las habitaciones ocupadas
-        habitaciones_ocupadas = obtener_habitaciones_ocupadas()
+        habitaciones_ocupadas = snapshot.ocupadas
         
         # Crear lista de habitaciones con checkout y sus consumos
+        from core.consumos import construir_folios
+        folios = construir_folios(
+            [num_hab for num_hab in checkouts_hoy if num_hab in habitaciones_ocupadas],
+            DB_PASAJEROS, DB_CONSUMOS
+        )
         datos_checkouts = []
-        for num_hab in checkouts_hoy:
-            if num_hab in habitaciones_ocupadas:
-                from core.consumos import obtener_resumen_habitacion
-                resumen = obtener_resumen_habitacion(num_hab, habitaciones_ocupadas[num_hab])
-                datos_checkouts.append({
-                    'habitacion': num_hab,
-                    'pasajero': habitaciones_ocupadas[num_hab]['pasajero'],
-                    'Estadía': resumen['totales']['Estadía'],
-                    'Map': resumen['totales']['Map'],
-                    'Bebidas': resumen['totales']['Bebidas'],
-                    'Total': resumen['totales']['total']
-                })
+        for num_hab, folio in folios.items():
+            datos_checkouts.append({
+                'habitacion': num_hab,
+                'pasajero': habitaciones_ocupadas[num_hab]['pasajero'],
+                'Estadía': folio['totales']['Estadía'],
+                'Map': folio['totales']['Map'],
+                'Bebidas': folio['totales']['Bebidas'],
+                'Total': folio['totales']['total']
+            })
         
         # Si no hay datos, generar archivo vacío indicando que no hay consumos
         if not datos_checkouts:
@@ -453,182 +490,157 @@ def generar_salidas_checkouts():
                     'Total': 0
                 })
         
-        # Crear estructura del archivo (replica salidas.xlsx)
-        max_filas = 30
-        data = [[None] * 6 for _ in range(max_filas)]
-        
-        # Encabezados
-        data[0] = ['Pase de caja e información a turno mañana', None, None, None, None, None]
-        data[2] = [None, None, 'Turno:   00 A 08 HS', None, None, None]
-        data[3] = [None, None, None, None, f'Fecha: {datetime.now().strftime("%d/%m/%Y")}', None]
-        data[4] = ['Detalle a cobrar de habitaciones con salida HOY', None, None, None, None, None]
-        data[5] = ['HAB', 'Estadía', 'Map', 'Bebidas', 'Forma de pago', 'Total']
-        data[6] = [None, None, None, None, None, None]
-        
-        # Datos de habitaciones con checkout - Cada categoría en su columna
-        fila_actual = 7
-        for item in sorted(datos_checkouts, key=lambda x: x['habitacion']):
-            estadia = item['Estadía'] if item['Estadía'] > 0 else None
-            map_val = item['Map'] if item['Map'] > 0 else None
-            bebidas = item['Bebidas'] if item['Bebidas'] > 0 else None
-            total = item['Total']
-            
-            data[fila_actual] = [
-                int(item['habitacion']),  # HAB (col 0)
-                estadia,                   # Estadía (col 1)
-                map_val,                   # Map (col 2)
-                bebidas,                   # Bebidas (col 3)
-                None,                      # Forma de pago (col 4)
-                total                      # Total (col 5)
-            ]
-            fila_actual += 1
-        
-        # Rellenar filas vacías
-        for i in range(fila_actual, max_filas):
-            data[i] = [None, None, None, None, None, None]
-        
-        # Guardar como XLSX en archivo temporal
-        df_salidas = pd.DataFrame(data)
-        with tempfile.NamedTemporaryFile(mode='wb', suffix='.xlsx', delete=False) as tmp:
-            archivo_salida = tmp.name
-            df_salidas.to_excel(archivo_salida, engine='openpyxl', index=False, header=False)
-        
-        # Descargar automáticamente (usar ruta absoluta)
-        return send_file(os.path.abspath(archivo_salida), as_attachment=True, download_name=f'checkouts_{datetime.now().strftime("%d-%m-%Y")}.xlsx')
+        # Generar el Excel en memoria (replica salidas.xlsx)
+        archivo_salida = generar_pase_de_caja(
+            sorted(datos_checkouts, key=lambda x: x['habitacion']),
+            fecha=datetime.now().strftime("%d/%m/%Y"),
+            detalle='Detalle a cobrar de habitaciones con salida HOY'
+        )
+        
+        # Descargar automáticamente
+        return send_file(archivo_salida, mimetype=TIPO_XLSX, as_attachment=True, download_name=f'checkouts_{datetime.now().strftime("%d-%m-%Y")}.xlsx')
         
     except Exception as e:
         flash(f"Error al generar archivo de checkouts: {str(e)}", "danger")
         return redirect('/dashboard')
 
+def filtros_consumos(args):
+    """Lee los filtros del historial de consumos desde los parámetros de la URL"""
+    filtros = {
+        'habitacion': args.get('habitacion', type=int),
+        'pasajero': args.get('pasajero', '').strip() or None,
+        'categoria': args.get('categoria', '').strip() or None,
+        'desde': None,
+        'hasta': None,
+        'pagina': args.get('pagina', 1, type=int),
+        'por_pagina': min(max(args.get('por_pagina', 50, type=int), 1), 500)
+    }
+    for campo in ('desde', 'hasta'):
+        try:
+            filtros[campo] = datetime.strptime(args.get(campo, ''), '%Y-%m-%d').date()
+        except ValueError:
+            pass
+    return filtros
+
+
 @app.route('/ver-consumos')
 def ver_consumos():
-    """Vista de todos los consumos registrados con opción de eliminar"""
-    if not os.path.exists(DB_CONSUMOS):
-        return """
-        <!DOCTYPE html>
-        <html>
-        <head>
-            <link href="https://cdn.jsdelivr.net/npm/bootstrap@5.3.0/dist/css/bootstrap.min.css" rel="stylesheet">
-            <title>Consumos Registrados</title>
-        </head>
-        <body>
-            <div class="container mt-5">
-                <div class="alert alert-info">
-                    <h3>No hay consumos registrados aún</h3>
-                </div>
-                <a href="/dashboard" class="btn btn-primary">Volver al Dashboard</a>
-            </div>
-        </body>
-        </html>
-        """
+    """Historial de consumos paginado y filtrable, con opción de eliminar"""
+    from core.consumos import buscar_consumos, CATEGORIAS
     
-    df = pd.read_csv(DB_CONSUMOS)
-    
-    # Construir tabla HTML con botón de eliminar
-    html = """
-    <!DOCTYPE html>
-    <html>
-    <head>
-        <link href="https://cdn.jsdelivr.net/npm/bootstrap@5.3.0/dist/css/bootstrap.min.css" rel="stylesheet">
-        <title>Consumos Registrados</title>
-        <script>
-            function confirmarEliminacion(indice) {
-                if (confirm('¿Estás seguro de eliminar este consumo?\\nEsta acción no se puede deshacer.')) {
-                    window.location.href = '/eliminar-consumo/' + indice;
-                }
-            }
-        </script>
-        <style>
-            .btn-eliminar { font-size: 0.8rem; padding: 0.25rem 0.5rem; }
-        </style>
-    </head>
-    <body>
-        <div class="container mt-5">
-            <h2>Historial de Consumos</h2>
-            <p class="text-muted">Total de registros: """ + str(len(df)) + """</p>
-            
-            <div class="table-responsive">
-                <table class="table table-striped table-hover">
-                    <thead class="table-dark">
-                        <tr>
-                            <th>#</th>
-                            <th>Fecha</th>
-                            <th>Habitación</th>
-                            <th>Pasajero</th>
-                            <th>Categoría</th>
-                            <th>Monto</th>
-                            <th>Acción</th>
-                        </tr>
-                    </thead>
-                    <tbody>
-    """
+    filtros = filtros_consumos(request.args)
+    resultado = buscar_consumos(archivo_consumos=DB_CONSUMOS, **filtros)
     
-    for idx, row in df.iterrows():
-        html += f"""
-                        <tr>
-                            <td>{idx + 1}</td>
-                            <td>{row['fecha']}</td>
-                            <td>{row['habitacion']}</td>
-                            <td>{row['pasajero']}</td>
-                            <td><span class="badge bg-primary">{row['categoria']}</span></td>
-                            <td>${row['monto']:.2f}</td>
-                            <td>
-                                <button onclick="confirmarEliminacion({idx})" class="btn btn-danger btn-sm btn-eliminar">
-                                    🗑️ Eliminar
-                                </button>
-                            </td>
-                        </tr>
-        """
+    # Parámetros actuales sin la página, para armar los enlaces de paginación
+    parametros = {clave: valor for clave, valor in request.args.items() if clave != 'pagina' and valor}
     
-    html += """
-                    </tbody>
-                </table>
-            </div>
-            
-            <div class="mt-4">
-                <a href="/dashboard" class="btn btn-primary">Volver al Dashboard</a>
-                <a href="/cierre-dia" class="btn btn-secondary">Descargar CSV</a>
-                <a href="/cierre-xlsx" class="btn btn-success">Descargar Excel</a>
-            </div>
-        </div>
-    </body>
-    </html>
-    """
+    return render_template('ver_consumos.html',
+                         resultado=resultado,
+                         filtros=filtros,
+                         parametros=parametros,
+                         categorias=CATEGORIAS,
+                         hay_consumos=obtener_almacen_consumos(DB_CONSUMOS).existe())
+
+
+@app.route('/api/consumos')
+def api_consumos():
+    """Mismo historial que /ver-consumos en formato JSON"""
+    from core.consumos import buscar_consumos
     
-    return html
+    filtros = filtros_consumos(request.args)
+    resultado = buscar_consumos(archivo_consumos=DB_CONSUMOS, **filtros)
+    resultado['filtros'] = {clave: (valor.isoformat() if hasattr(valor, 'isoformat') else valor)
+                            for clave, valor in filtros.items()}
+    return jsonify(resultado)
+
+@app.route('/api/consumos/totales/verificar', methods=['GET', 'POST'])
+def verificar_totales_consumos():
+    """
+    Recalcula los totales por (habitación, pasajero, categoría) desde los
+    consumos y los compara con la tabla mantenida. Con POST además la
+    reemplaza por la recalculada si encuentra diferencias.
+    """
+    almacen_consumos = obtener_almacen_consumos(DB_CONSUMOS)
+    if not almacen_consumos.existe():
+        return jsonify({'ok': True, 'diferencias': [], 'reparado': False})
+
+    reparar = request.method == 'POST'
+    diferencias = almacen_consumos.verificar_totales(reparar=reparar)
+    return jsonify({
+        'ok': not diferencias,
+        'diferencias': diferencias,
+        'reparado': reparar and bool(diferencias)
+    })
+
+@app.route('/metrics')
+def metrics():
+    """Métricas de rendimiento en formato de texto de Prometheus"""
+    return Response(metricas.metricas.exponer(), mimetype='text/plain; version=0.0.4; charset=utf-8')
+
+@app.route('/debug/profiles', methods=['GET', 'POST'])
+def debug_profiles():
+    """Perfiles cProfile guardados (los más lentos primero) y configuración del perfilado"""
+    if request.method == 'POST':
+        rutas = request.form.get('rutas', '').split(',')
+        try:
+            umbral = request.form.get('umbral_ms', '').strip()
+            umbral_ms = float(umbral) if umbral else None
+            muestreo = float(request.form.get('muestreo', '1') or 1)
+        except ValueError:
+            flash('❌ El umbral y el muestreo deben ser números', 'danger')
+            return redirect('/debug/profiles')
+        perfilador.configurar(rutas, umbral_ms, muestreo)
+        flash('✅ Configuración de perfilado actualizada', 'success')
+        return redirect('/debug/profiles')
+
+    reglas = sorted({regla.rule for regla in app.url_map.iter_rules() if regla.endpoint != 'static'})
+    return render_template('debug_profiles.html', perfiles=perfilador.listar(), perfilador=perfilador,
+                           reglas=reglas)
+
+@app.route('/debug/profiles/<nombre>.prof')
+def descargar_perfil(nombre):
+    """Descarga el .prof de un perfil (se abre con pstats o snakeviz)"""
+    ruta = perfilador.ruta_prof(nombre)
+    if ruta is None:
+        flash('Perfil no encontrado', 'warning')
+        return redirect('/debug/profiles')
+    return send_file(os.path.abspath(ruta), as_attachment=True, download_name=f'{nombre}.prof')
 
 @app.route('/eliminar-consumo/<int:indice>')
 def eliminar_consumo(indice):
     """Eliminar un consumo específico por su índice"""
-    if not os.path.exists(DB_CONSUMOS):
+    # Volver al historial con los mismos filtros y página
+    volver = '/ver-consumos'
+    if request.query_string:
+        volver += '?' + request.query_string.decode()
+    
+    if not obtener_almacen_consumos(DB_CONSUMOS).existe():
         flash('No hay consumos para eliminar', 'warning')
-        return redirect('/ver-consumos')
+        return redirect(volver)
     
     try:
         # Leer el archivo
-        df = pd.read_csv(DB_CONSUMOS)
+        almacen_consumos = obtener_almacen_consumos(DB_CONSUMOS)
+        df = almacen_consumos.obtener_df()
         
         # Verificar que el índice existe
         if indice < 0 or indice >= len(df):
             flash(f'❌ Índice inválido: {indice}', 'danger')
-            return redirect('/ver-consumos')
+            return redirect(volver)
         
         # Guardar información del consumo eliminado para mostrar
         consumo_eliminado = df.iloc[indice]
         info = f"Hab {consumo_eliminado['habitacion']} - {consumo_eliminado['categoria']} - ${consumo_eliminado['monto']}"
         
-        # Eliminar la fila
-        df = df.drop(indice)
-        
-        # Guardar el archivo actualizado
-        df.to_csv(DB_CONSUMOS, index=False)
+        # Dar de baja la fila (se registra una baja, no se reescribe el archivo)
+        almacen_consumos.eliminar_posiciones([indice])
         
         flash(f'✅ Consumo eliminado correctamente: {info}', 'success')
         
     except Exception as e:
         flash(f'❌ Error al eliminar consumo: {str(e)}', 'danger')
     
-    return redirect('/ver-consumos')
+    return redirect(volver)
 
 @app.route('/reiniciar-temporada', methods=['GET', 'POST'])
 def reiniciar_temporada():
@@ -671,7 +683,7 @@ def reiniciar_temporada():
         """
     
     # POST: Ejecutar el reinicio
-    if not os.path.exists(DB_CONSUMOS):
+    if not obtener_almacen_consumos(DB_CONSUMOS).existe():
         flash("No hay consumos para archivar. El sistema ya está limpio.", "info")
         return redirect('/')
     
@@ -680,13 +692,12 @@ def reiniciar_temporada():
         timestamp = datetime.now().strftime('%d-%m-%Y_%H-%M')
         archivo_backup = f'data/consumos_diarios_BACKUP_{timestamp}.csv'
         
-        # Copiar el archivo actual al backup
-        import shutil
-        shutil.copy(DB_CONSUMOS, archivo_backup)
+        # Copiar los consumos vigentes al backup (sin consumos dados de baja)
+        almacen_consumos = obtener_almacen_consumos(DB_CONSUMOS)
+        almacen_consumos.respaldar(archivo_backup)
         
         # Reiniciar el archivo de consumos
-        with open(DB_CONSUMOS, 'w', encoding='utf-8') as f:
-            f.write('fecha,habitacion,pasajero,categoria,monto\n')
+        almacen_consumos.vaciar()
         
         flash(f'✅ Temporada reiniciada correctamente. Backup guardado en: {archivo_backup}', 'success')
         return redirect('/')
@@ -698,7 +709,7 @@ def reiniciar_temporada():
 @app.route('/gestionar-pasajeros')
 def gestionar_pasajeros():
     """Página para gestionar archivos de pasajeros (cambiar entre temporada alta/baja)"""
-    from core.dashboard import es_checkout_hoy
+    from core.dashboard import clasificar_pasajeros
     
     # Obtener información del archivo actual
     info_actual = {
@@ -711,29 +722,29 @@ def gestionar_pasajeros():
         'fecha_egreso_max': 'N/A'
     }
     
-    if os.path.exists(DB_PASAJEROS):
-        df = pd.read_csv(DB_PASAJEROS)
+    if obtener_almacen_pasajeros(DB_PASAJEROS).existe():
+        df, tipos = obtener_almacen_pasajeros(DB_PASAJEROS).proyeccion_tipada('disponibilidad')
         info_actual['total'] = len(df)
         info_actual['habitaciones'] = df['Nro. habitación'].tolist()
         
         # Contar checkouts hoy
-        checkouts_hoy = 0
-        for _, row in df.iterrows():
-            if es_checkout_hoy(row['Fecha de egreso']):
-                checkouts_hoy += 1
-        info_actual['checkouts_hoy'] = checkouts_hoy
-        
-        # Rango de fechas
-        info_actual['fecha_ingreso_min'] = df['Fecha de ingreso'].min()
-        info_actual['fecha_ingreso_max'] = df['Fecha de ingreso'].max()
-        info_actual['fecha_egreso_min'] = df['Fecha de egreso'].min()
-        info_actual['fecha_egreso_max'] = df['Fecha de egreso'].max()
+        _, _, salen_hoy = clasificar_pasajeros(tipos)
+        info_actual['checkouts_hoy'] = int(salen_hoy.sum())
+        
+        # Rango de fechas (sobre fechas, no sobre los textos DD/MM/YYYY)
+        for columna, clave in (('Fecha de ingreso', 'fecha_ingreso'), ('Fecha de egreso', 'fecha_egreso')):
+            fechas = tipos[columna].dropna()
+            if not fechas.empty:
+                info_actual[f'{clave}_min'] = fechas.min().strftime('%d/%m/%Y')
+                info_actual[f'{clave}_max'] = fechas.max().strftime('%d/%m/%Y')
     
     return render_template('gestionar_pasajeros.html', info_actual=info_actual)
 
 @app.route('/subir-pasajeros', methods=['POST'])
 def subir_pasajeros():
     """Permite subir un archivo CSV de pasajeros personalizado"""
+    import pandas as pd
+    
     try:
         if 'archivo' not in request.files:
             flash('❌ No se seleccionó ningún archivo', 'danger')
@@ -749,68 +760,57 @@ def subir_pasajeros():
             flash('❌ El archivo debe ser CSV', 'danger')
             return redirect('/gestionar-pasajeros')
         
+        # Validar estructura del CSV (solo el encabezado, antes de leerlo completo)
+        columnas = pd.read_csv(archivo, nrows=0).columns
+        for col in COLUMNAS_REQUERIDAS_PASAJEROS:
+            if col not in columnas:
+                flash(f'❌ Falta la columna requerida: {col}', 'danger')
+                return redirect('/gestionar-pasajeros')
+        
+        archivo.seek(0)
+        df_nuevo = pd.read_csv(archivo, dtype=TIPOS_PASAJEROS)
+        
         # Crear backup del archivo actual
-        if os.path.exists(DB_PASAJEROS):
+        if obtener_almacen_pasajeros(DB_PASAJEROS).existe():
             timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
             backup_path = f'data/backups/pasajeros_backup_{timestamp}.csv'
             os.makedirs('data/backups', exist_ok=True)
             
-            import shutil
-            shutil.copy(DB_PASAJEROS, backup_path)
-        
-        # Validar estructura del CSV
-        df_nuevo = pd.read_csv(archivo)
-        columnas_requeridas = ['Nro. habitación', 'Fecha de ingreso', 'Fecha de egreso', 
-                               'Apellido y nombre', 'Servicios']
-        
-        for col in columnas_requeridas:
-            if col not in df_nuevo.columns:
-                flash(f'❌ Falta la columna requerida: {col}', 'danger')
-                return redirect('/gestionar-pasajeros')
+            obtener_almacen_pasajeros(DB_PASAJEROS).respaldar(backup_path)
         
         # Determinar modo de carga
         modo = request.form.get('modo_carga', 'agregar')
         
         if modo == 'reemplazar':
             # MODO REEMPLAZAR: Sobreescribir todo (como antes)
-            df_nuevo.to_csv(DB_PASAJEROS, index=False)
+            obtener_almacen_pasajeros(DB_PASAJEROS).guardar(df_nuevo)
             
             # Limpiar consumos
-            if os.path.exists(DB_CONSUMOS):
-                with open(DB_CONSUMOS, 'w') as f:
-                    f.write('fecha,habitacion,pasajero,categoria,monto\n')
+            if obtener_almacen_consumos(DB_CONSUMOS).existe():
+                obtener_almacen_consumos(DB_CONSUMOS).vaciar()
             
             flash(f'✅ Archivo reemplazado completamente ({len(df_nuevo)} pasajeros). Consumos limpiados.', 'success')
         else:
             # MODO AGREGAR: Mantener reservas existentes y agregar/actualizar nuevas
-            if os.path.exists(DB_PASAJEROS):
-                df_existente = pd.read_csv(DB_PASAJEROS)
-                
+            almacen = obtener_almacen_pasajeros(DB_PASAJEROS)
+            if almacen.existe():
                 # Obtener habitaciones del archivo nuevo
                 habitaciones_nuevas = df_nuevo['Nro. habitación'].unique()
                 
-                # Mantener solo las habitaciones que NO están en el archivo nuevo
-                df_mantener = df_existente[~df_existente['Nro. habitación'].isin(habitaciones_nuevas)]
-                
-                # Combinar: mantener existentes + agregar nuevas
-                df_final = pd.concat([df_mantener, df_nuevo], ignore_index=True)
+                # Mantener solo las habitaciones que NO están en el archivo nuevo y agregar las nuevas
+                mantenidas = almacen.reemplazar_habitaciones(df_nuevo)
                 
                 # Eliminar consumos SOLO de las habitaciones que se están reemplazando
-                if os.path.exists(DB_CONSUMOS):
-                    df_consumos = pd.read_csv(DB_CONSUMOS)
-                    df_consumos = df_consumos[~df_consumos['habitacion'].isin(habitaciones_nuevas)]
-                    df_consumos.to_csv(DB_CONSUMOS, index=False)
+                if obtener_almacen_consumos(DB_CONSUMOS).existe():
+                    obtener_almacen_consumos(DB_CONSUMOS).liquidar_habitaciones(habitaciones_nuevas, 'reemplazo de rooming')
                 
                 flash(f'✅ Archivo agregado: {len(df_nuevo)} nuevos pasajeros. '
-                      f'Mantenidas: {len(df_mantener)} reservas existentes. '
-                      f'Total: {len(df_final)} pasajeros.', 'success')
+                      f'Mantenidas: {mantenidas} reservas existentes. '
+                      f'Total: {mantenidas + len(df_nuevo)} pasajeros.', 'success')
             else:
                 # Si no existe archivo previo, crear nuevo
-                df_final = df_nuevo
+                almacen.guardar(df_nuevo)
                 flash(f'✅ Archivo creado con {len(df_nuevo)} pasajeros.', 'success')
-            
-            # Guardar archivo combinado
-            df_final.to_csv(DB_PASAJEROS, index=False)
         
         return redirect('/dashboard')
         
@@ -823,11 +823,11 @@ def reserva_express():
     """Página de registro rápido para walk-ins (huéspedes sin reserva)"""
     
     if request.method == 'GET':
-        from core.dashboard import obtener_habitaciones_reservadas_futuras
         from core.reserva_express import calcular_noches_maximas
         
         # Mostrar formulario con habitaciones disponibles
-        habitaciones_disponibles = obtener_habitaciones_disponibles()
+        snapshot = snapshot_actual()
+        habitaciones_disponibles = obtener_habitaciones_disponibles(snapshot.ocupadas)
         habitacion_preseleccionada = request.args.get('habitacion', type=int)
         tiene_reserva_futura = request.args.get('reserva_futura', type=int) == 1
         
@@ -841,7 +841,7 @@ def reserva_express():
         # Si tiene reserva futura, obtener la información
         fecha_reserva_futura = None
         if tiene_reserva_futura and habitacion_preseleccionada:
-            reservas_futuras = obtener_habitaciones_reservadas_futuras()
+            reservas_futuras = snapshot.reservadas
             if habitacion_preseleccionada in reservas_futuras:
                 fecha_reserva_futura = reservas_futuras[habitacion_preseleccionada]['ingreso']
         
@@ -897,9 +897,8 @@ def cambiar_habitacion_route(num_habitacion):
         datos_pasajero = habitaciones_ocupadas[num_habitacion]
         
         # Obtener consumos para mostrar cuántos hay
-        if os.path.exists(DB_CONSUMOS):
-            df_consumos = pd.read_csv(DB_CONSUMOS)
-            cantidad_consumos = len(df_consumos[df_consumos['habitacion'] == num_habitacion])
+        if obtener_almacen_consumos(DB_CONSUMOS).existe():
+            cantidad_consumos = len(obtener_almacen_consumos(DB_CONSUMOS).posiciones_habitacion(num_habitacion))
         else:
             cantidad_consumos = 0
         
@@ -939,5 +938,19 @@ def cambiar_habitacion_route(num_habitacion):
         flash(f'❌ {mensaje}', 'danger')
         return redirect(f'/cambiar-habitacion/{num_habitacion}')
 
+def precargar_datos():
+    """
+    Importa pandas y carga pasajeros y consumos en segundo plano al arrancar,
+    para que el primer dashboard no pague el parseo de los CSV.
+    """
+    try:
+        construir_snapshot(DB_PASAJEROS, DB_CONSUMOS)
+    except Exception as e:
+        print(f"⚠️  No se pudieron precargar los datos: {e}")
+
 if __name__ == '__main__':
+    # Con el recargador de Flask el proceso que atiende requests es el hijo
+    # (WERKZEUG_RUN_MAIN); el proceso vigilante no necesita pandas
+    if os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        threading.Thread(target=precargar_datos, name='precarga', daemon=True).start()
     app.run(debug=True, host='0.0.0.0', port=5000)
\ No newline at end of file
@@ -0,0 +1,42 @@
+"""
+Benchmarks del dashboard y de la ficha de habitación.
+"""
+
+import pytest
+
+pytest.importorskip('pytest_benchmark')
+
+from conftest import borrar_generados
+from core.almacen import AlmacenCSV, _almacenes
+from core.consumos import obtener_resumen_habitacion
+from core.dashboard import construir_snapshot, obtener_datos_dashboard, obtener_habitaciones_ocupadas
+
+
+def test_obtener_datos_dashboard(benchmark, hotel):
+    datos = benchmark(obtener_datos_dashboard)
+    assert datos['estadisticas']
+
+
+def test_obtener_datos_dashboard_en_frio(benchmark, hotel, monkeypatch):
+    """Primera carga: sin almacenes en memoria ni caché en disco, se leen y parsean los CSV"""
+    # Sin caché: un guardado pendiente de otro test no puede convertirla en carga en caliente
+    monkeypatch.setattr(AlmacenCSV, 'CACHE', False)
+
+    def en_frio():
+        _almacenes.clear()
+        borrar_generados(hotel.carpeta / 'data')
+
+    datos = benchmark.pedantic(obtener_datos_dashboard, setup=en_frio, rounds=10)
+    assert datos['estadisticas']
+
+
+def test_construir_snapshot(benchmark, hotel):
+    snapshot = benchmark(construir_snapshot)
+    assert snapshot.ocupadas
+
+
+def test_obtener_resumen_habitacion(benchmark, hotel):
+    ocupadas = obtener_habitaciones_ocupadas()
+    num = max(ocupadas)
+    resumen = benchmark(obtener_resumen_habitacion, num, ocupadas[num])
+    assert resumen
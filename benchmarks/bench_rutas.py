@@ -0,0 +1,62 @@
+"""
+Benchmarks de las rutas de la app con el cliente de pruebas de Flask.
+Las que modifican los archivos restauran el dataset antes de cada ronda.
+"""
+
+import pytest
+
+pytest.importorskip('pytest_benchmark')
+
+from core.dashboard import obtener_habitaciones_ocupadas
+from core.reserva_express import obtener_habitaciones_disponibles
+
+
+def test_dashboard(benchmark, cliente):
+    respuesta = benchmark(cliente.get, '/dashboard')
+    assert respuesta.status_code == 200
+
+
+def test_checkout_masivo(benchmark, cliente):
+    respuesta = benchmark(cliente.get, '/checkout-masivo')
+    assert respuesta.status_code == 200
+
+
+def test_cierre_xlsx(benchmark, cliente):
+    respuesta = benchmark(cliente.get, '/cierre-xlsx')
+    assert respuesta.status_code == 200
+
+
+def test_reserva_express_formulario(benchmark, cliente):
+    respuesta = benchmark(cliente.get, '/reserva-express')
+    assert respuesta.status_code == 200
+
+
+def test_reserva_express(benchmark, cliente, restaurar):
+    habitacion = obtener_habitaciones_disponibles(obtener_habitaciones_ocupadas())[0]
+    datos = {'habitacion': habitacion, 'nombre': 'BENCH WALKIN', 'pax': 2,
+             'servicios': 'DESAYUNO', 'noches': 1}
+
+    respuesta = benchmark.pedantic(cliente.post, args=('/reserva-express',), kwargs={'data': datos},
+                                   setup=restaurar, rounds=20)
+    assert respuesta.headers['Location'].endswith('/dashboard')
+
+
+def test_cambiar_habitacion(benchmark, restaurar):
+    from core.almacen import obtener_almacen_consumos, obtener_almacen_pasajeros
+    from core.cambio_habitacion import cambiar_habitacion, obtener_habitaciones_disponibles_para_cambio
+
+    origen = max(obtener_habitaciones_ocupadas())
+    almacen = obtener_almacen_pasajeros()
+    # El destino no puede tener ningún pasajero registrado, ni siquiera reservas futuras
+    destino = next((hab for hab in obtener_habitaciones_disponibles_para_cambio(origen)
+                    if almacen.pasajeros_habitacion(hab).empty), None)
+    if destino is None:
+        pytest.skip('El dataset no tiene habitaciones sin pasajeros')
+    consumos_origen = len(obtener_almacen_consumos().posiciones_habitacion(origen))
+
+    exito, mensaje = benchmark.pedantic(cambiar_habitacion, args=(origen, destino, 'benchmark'),
+                                        setup=restaurar, rounds=20)
+    assert exito, mensaje
+    # Cada ronda parte del dataset original: se trasladan todos los consumos del origen
+    if consumos_origen:
+        assert f'({consumos_origen} consumo(s) trasladado(s))' in mensaje, mensaje
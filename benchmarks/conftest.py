@@ -0,0 +1,88 @@
+"""
+Fixtures de los benchmarks.
+Cada sesión genera un hotel sintético con generar_datos_prueba.py en una
+carpeta temporal y corre la app parada en esa carpeta, así las rutas
+relativas data/... nunca tocan los datos reales.
+
+La escala se elige con variables de entorno:
+    BENCH_HABITACIONES (53), BENCH_CONSUMOS (5000), BENCH_ESQUEMA (activos)
+"""
+
+import os
+import shutil
+import sys
+from types import SimpleNamespace
+
+import pytest
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if RAIZ not in sys.path:
+    sys.path.insert(0, RAIZ)
+
+ARCHIVOS = ('pasajeros.csv', 'consumos_diarios.csv')
+
+
+def borrar_generados(carpeta_datos):
+    """Borra las bajas de consumos y la caché de datos parseados (RECEPCION_CACHE de la sesión)"""
+    from core.almacen import carpeta_cache
+
+    bajas = os.path.join(carpeta_datos, 'consumos_diarios_bajas.csv')
+    if os.path.exists(bajas):
+        os.remove(bajas)
+    shutil.rmtree(carpeta_cache(), ignore_errors=True)
+
+
+@pytest.fixture(scope='session')
+def hotel(tmp_path_factory):
+    from generar_datos_prueba import generar_dataset
+
+    carpeta = tmp_path_factory.mktemp('hotel')
+    datos = carpeta / 'data'
+    original = carpeta / 'original'
+    resultado = generar_dataset(
+        str(datos),
+        habitaciones=int(os.environ.get('BENCH_HABITACIONES', 53)),
+        consumos=int(os.environ.get('BENCH_CONSUMOS', 5000)),
+        esquema=os.environ.get('BENCH_ESQUEMA', 'activos'),
+    )
+    shutil.copytree(datos, original)
+
+    anterior, cache_anterior = os.getcwd(), os.environ.get('RECEPCION_CACHE')
+    os.chdir(carpeta)
+    # La caché de datos parseados también queda en la carpeta temporal
+    os.environ['RECEPCION_CACHE'] = str(carpeta / 'cache')
+    try:
+        from app import app
+        app.config['TESTING'] = True
+        yield SimpleNamespace(carpeta=carpeta, app=app, **resultado)
+    finally:
+        os.chdir(anterior)
+        if cache_anterior is None:
+            os.environ.pop('RECEPCION_CACHE', None)
+        else:
+            os.environ['RECEPCION_CACHE'] = cache_anterior
+
+
+@pytest.fixture
+def cliente(hotel):
+    return hotel.app.test_client()
+
+
+@pytest.fixture
+def restaurar(hotel):
+    """
+    Función que vuelve data/ al dataset generado y deja los almacenes
+    cargados. Sirve de setup para los benchmarks que modifican los archivos.
+    """
+    from core.almacen import obtener_almacen_consumos, obtener_almacen_pasajeros
+
+    def restaurar():
+        borrar_generados(hotel.carpeta / 'data')
+        for nombre in ARCHIVOS:
+            shutil.copy(hotel.carpeta / 'original' / nombre, hotel.carpeta / 'data' / nombre)
+        obtener_almacen_pasajeros().obtener_df()
+        obtener_almacen_consumos().obtener_df()
+
+    restaurar()
+    yield restaurar
+    restaurar()
@@ -70,6 +70,16 @@ if [ -f data/pasajeros.csv ]; then
     echo -e "${GREEN}✅ Backup creado: pasajeros_backup_${TIMESTAMP}.csv${NC}"
 fi
 
+if [ -f data/consumos_diarios_bajas.csv ]; then
+    # Aplicar las bajas pendientes para que el backup tenga solo consumos vigentes
+    PYTHON=python3
+    [ -x .venv/bin/python3 ] && PYTHON=.venv/bin/python3
+    if ! $PYTHON -m core.almacen compactar; then
+        cp data/consumos_diarios_bajas.csv "data/backups/consumos_bajas_backup_${TIMESTAMP}.csv"
+        echo -e "${YELLOW}⚠️  No se pudieron aplicar las bajas: se guardan aparte en consumos_bajas_backup_${TIMESTAMP}.csv${NC}"
+    fi
+fi
+
 if [ -f data/consumos_diarios.csv ]; then
     cp data/consumos_diarios.csv "data/backups/consumos_backup_${TIMESTAMP}.csv"
     echo -e "${GREEN}✅ Backup creado: consumos_backup_${TIMESTAMP}.csv${NC}"
@@ -96,6 +106,7 @@ echo -e "${BLUE}🧹 Limpiando datos de temporada anterior...${NC}"
 
 # Resetear consumos
 echo "fecha,habitacion,pasajero,categoria,monto" > data/consumos_diarios.csv
+rm -f data/consumos_diarios_bajas.csv
 echo -e "${GREEN}✅ Consumos reseteados${NC}"
 
 # Información sobre pasajeros.csv
@@ -0,0 +1,1295 @@
+"""
+Módulo de acceso a los archivos de datos del hotel.
+Mantiene en memoria los CSV de pasajeros y de consumos para que todas las
+consultas compartan un único parseo por proceso.
+
+Las escrituras toman un bloqueo exclusivo entre procesos (fcntl.flock sobre
+<archivo>.lock) y las reescrituras completas se hacen en un archivo temporal
+que reemplaza al original con os.replace, de modo que varios workers o una
+segunda PC de recepción sobre la misma carpeta no pierden escrituras.
+
+Lo ya parseado y los índices derivados se guardan además en la caché del
+usuario (pickle, ver carpeta_cache y AlmacenCSV._cargar_cache) para que al
+reiniciar la app no haya que volver a parsear los CSV si no cambiaron.
+"""
+
+import atexit
+import hashlib
+import os
+import pickle
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import weakref
+from contextlib import contextmanager
+from datetime import date, datetime
+
+try:
+    import fcntl
+except ImportError:
+    # Windows: sin bloqueo entre procesos, solo dentro del proceso
+    fcntl = None
+
+from core.metricas import registrar_escritura, registrar_lectura
+from core.perezoso import importar_perezoso
+
+np = importar_perezoso('numpy')
+pd = importar_perezoso('pandas')
+
+DB_PASAJEROS = 'data/pasajeros.csv'
+DB_CONSUMOS = 'data/consumos_diarios.csv'
+
+COLUMNAS_CONSUMOS = ['fecha', 'habitacion', 'pasajero', 'categoria', 'monto']
+
+# Formato de las fechas de pasajeros.csv
+FORMATO_FECHA = '%d/%m/%Y'
+
+# Columnas de texto de pasajeros.csv: se leen siempre como texto para no
+# perder ceros a la izquierda (documentos, teléfonos) ni convertir vouchers
+# numéricos en float cuando hay celdas vacías
+TIPOS_PASAJEROS = {columna: str for columna in (
+    'Fecha de ingreso', 'Fecha de egreso', 'Apellido y nombre', 'Tipo documento',
+    'Nro. doc.', 'Voucher', 'Servicios', 'Email', 'Teléfono', 'Celular', 'Parada'
+)}
+
+# Columnas que necesita cada caso de uso (ver AlmacenCSV.proyeccion)
+COLUMNAS_REQUERIDAS_PASAJEROS = ['Nro. habitación', 'Fecha de ingreso', 'Fecha de egreso',
+                                 'Apellido y nombre', 'Servicios']
+PROYECCIONES_PASAJEROS = {
+    'disponibilidad': ['Nro. habitación', 'Fecha de ingreso', 'Fecha de egreso'],
+    'dashboard': ['Nro. habitación', 'Fecha de ingreso', 'Fecha de egreso', 'Apellido y nombre',
+                  'Plazas ocupadas', 'Servicios', 'Edad', 'Voucher'],
+    'folio': ['Nro. habitación', 'Fecha de ingreso', 'Fecha de egreso', 'Apellido y nombre',
+              'Plazas ocupadas', 'Servicios', 'Edad', 'Voucher', 'Tipo documento', 'Nro. doc.'],
+    'validacion': COLUMNAS_REQUERIDAS_PASAJEROS,
+}
+
+# Subir al cambiar qué se guarda en la caché en disco o cómo se tipan/derivan los datos
+VERSION_CACHE = 2
+# La caché se guarda cuando el almacén pasa este tiempo sin cambios (y al salir)
+SEGUNDOS_INACTIVIDAD_CACHE = 60.0
+
+# Backend de almacenamiento: 'csv' (por defecto) o 'sqlite' (ver core/almacen_sqlite.py)
+BACKEND = os.environ.get('RECEPCION_BACKEND', 'csv').strip().lower()
+
+
+def firma_archivo(archivo):
+    """
+    Obtiene la firma de un archivo en disco para detectar cambios.
+
+    Returns:
+        tuple (mtime_ns, tamaño, inodo) o None si el archivo no existe
+    """
+    try:
+        st = os.stat(archivo)
+    except FileNotFoundError:
+        return None
+    return (st.st_mtime_ns, st.st_size, st.st_ino)
+
+
+def carpeta_cache():
+    """
+    Carpeta de la caché de datos parseados: RECEPCION_CACHE si está definida,
+    si no la caché del usuario (~/.cache/recepcion2026, o en Windows
+    %LOCALAPPDATA%\\recepcion2026). No se usa la carpeta de datos porque
+    puede ser compartida y los pickles solo se cargan si son del usuario.
+    """
+    if os.environ.get('RECEPCION_CACHE'):
+        return os.environ['RECEPCION_CACHE']
+    base = os.environ.get('XDG_CACHE_HOME') or os.environ.get('LOCALAPPDATA') or os.path.join(
+        os.path.expanduser('~'), '.cache')
+    return os.path.join(base, 'recepcion2026')
+
+
+def _es_del_usuario(ruta):
+    """El archivo y su carpeta son del usuario actual y nadie más puede escribirlos"""
+    if not hasattr(os, 'getuid'):
+        return True
+    for camino in (ruta, os.path.dirname(ruta)):
+        st = os.stat(camino)
+        if st.st_uid != os.getuid() or st.st_mode & 0o022:
+            return False
+    return True
+
+
+def _de_dia_anterior(clave, hoy):
+    """Clave de un derivado por día, (nombre, fecha), de un día anterior a hoy"""
+    return isinstance(clave, tuple) and type(clave[-1]) is date and clave[-1] < hoy
+
+
+# Almacenes con cambios sin guardar en la caché en disco (se guardan al salir)
+_caches_pendientes = weakref.WeakSet()
+
+
+@atexit.register
+def _guardar_caches_pendientes():
+    for almacen in list(_caches_pendientes):
+        almacen.guardar_cache()
+
+
+def ruta_sqlite(archivo):
+    """
+    Base SQLite que reemplaza al CSV indicado: RECEPCION_DB si está definida,
+    si no recepcion.db en la misma carpeta que el CSV.
+    """
+    return os.environ.get('RECEPCION_DB') or os.path.join(os.path.dirname(archivo), 'recepcion.db')
+
+
+class AlmacenCSV:
+    """
+    Caché en memoria de un archivo CSV.
+
+    El archivo se parsea una sola vez y se vuelve a leer solo cuando cambia
+    su firma en disco (mtime, tamaño o inodo), por ejemplo si se edita a mano
+    o lo modifica otro proceso. Las escrituras hechas a través del almacén
+    actualizan la caché directamente, sin volver a parsear.
+
+    Las consultas que usan pocas columnas pueden pedir una proyección
+    (PROYECCIONES) en lugar del DataFrame completo: se lee solo esas columnas
+    y se guardan aparte, por proyección.
+
+    El DataFrame y los valores derivados se guardan también en una caché en
+    disco (carpeta_cache), identificada por la firma y el hash del contenido
+    de los archivos fuente: al arrancar se cargan de ahí en lugar de parsear
+    el CSV, y si el archivo cambió (o cambió VERSION_CACHE o la versión de
+    pandas) se ignora.
+    """
+
+    # dtypes explícitos por columna al leer el archivo
+    TIPOS = None
+    # Conjuntos de columnas por caso de uso: {nombre: [columnas]}
+    PROYECCIONES = {}
+    # Guardar lo parseado en la caché en disco (ver _cargar_cache)
+    CACHE = True
+
+    def __init__(self, archivo):
+        self.archivo = archivo
+        self.archivo_bloqueo = archivo + '.lock'
+        self._lock = threading.RLock()
+        self._df = None
+        self._firma = None
+        self._derivados = {}
+        self._proyecciones = {}
+        self._bloqueo_archivo = None
+        self._profundidad_bloqueo = 0
+        self._cache_consultada = False
+        self._temporizador_cache = None
+        self._ultimo_cambio = 0.0
+
+    def existe(self):
+        return os.path.exists(self.archivo)
+
+    def version(self):
+        """Firma del archivo correspondiente a los datos en caché"""
+        with self._lock:
+            self._refrescar()
+            return self._firma
+
+    def _firma_actual(self):
+        """Firma en disco de los datos; None si el archivo no existe"""
+        return firma_archivo(self.archivo)
+
+    def _leer(self):
+        return pd.read_csv(self.archivo, dtype=self.TIPOS)
+
+    def _leer_columnas(self, columnas):
+        """Lee solo las columnas indicadas (las que no existan se ignoran)"""
+        return pd.read_csv(self.archivo, usecols=lambda columna: columna in columnas, dtype=self.TIPOS)
+
+    def _bytes_en_disco(self):
+        """Bytes que recorre una lectura completa de los datos (para las métricas)"""
+        try:
+            return os.path.getsize(self.archivo)
+        except OSError:
+            return 0
+
+    def _archivos_fuente(self):
+        """Archivos cuyo contenido identifica a los datos en la caché en disco"""
+        return [self.archivo]
+
+    def _ruta_cache(self):
+        # Una caché por archivo de datos (por ruta absoluta) en la carpeta del usuario
+        ruta = os.path.abspath(self.archivo)
+        clave = hashlib.blake2b(ruta.encode(), digest_size=6).hexdigest()
+        return os.path.join(carpeta_cache(), f'{os.path.basename(ruta)}-{clave}.pkl')
+
+    def _hash_fuente(self):
+        """Hash del contenido de los archivos fuente (los que faltan cuentan como vacíos)"""
+        h = hashlib.blake2b(digest_size=20)
+        for archivo in self._archivos_fuente():
+            h.update(os.path.basename(archivo).encode() + b'\0')
+            if not os.path.exists(archivo):
+                h.update(b'-')
+                continue
+            with open(archivo, 'rb') as f:
+                while bloque := f.read(1 << 20):
+                    h.update(bloque)
+        return h.hexdigest()
+
+    def _cabecera_cache(self):
+        """Lo que tiene que coincidir, además del contenido, para usar la caché"""
+        return {'version': VERSION_CACHE, 'clase': type(self).__name__,
+                'pandas': pd.__version__, 'archivo': os.path.abspath(self.archivo)}
+
+    def _estado_cache(self, firma):
+        """
+        Estado en memoria de la versión `firma` que se guarda en la caché,
+        además de los derivados; None si no hay nada de esa versión.
+        Se llama con el lock tomado: lo que después se modifique en el
+        lugar tiene que ir copiado.
+        """
+        proyecciones = {nombre: df for nombre, (firma_df, df) in self._proyecciones.items() if firma_df == firma}
+        df = self._df if self._firma == firma else None
+        if df is None and not proyecciones:
+            return None
+        return {'df': df, 'proyecciones': proyecciones}
+
+    def _restaurar_cache(self, estado, firma):
+        self._proyecciones = {nombre: (firma, df) for nombre, df in estado['proyecciones'].items()}
+        if estado['df'] is not None:
+            self._df = estado['df']
+            self._firma = firma
+
+    def _cargar_cache(self, firma, completo=True):
+        """
+        Restaura el estado de la caché en disco si corresponde a los archivos
+        fuente actuales. Se consulta una sola vez por almacén, en la primera
+        carga: después los cambios de otros procesos se leen del CSV. Se
+        llama con el lock tomado y el bloqueo de lectura, para la versión `firma`.
+
+        Si la firma de los archivos es la misma que al guardar la caché no se
+        vuelven a leer; si cambió (copia, restauración de un backup) se
+        compara el hash del contenido.
+
+        Args:
+            completo (bool): exigir el DataFrame completo; si es False
+                alcanza con las proyecciones
+
+        Returns:
+            bool: True si se restauró el estado desde la caché
+        """
+        if not self.CACHE or self._cache_consultada:
+            return False
+        self._cache_consultada = True
+        ruta = self._ruta_cache()
+        if not os.path.exists(ruta):
+            return False
+        inicio = time.perf_counter()
+        try:
+            if not _es_del_usuario(ruta):
+                print(f"Caché de {os.path.basename(self.archivo)} ignorada: {ruta} no es solo del usuario")
+                return False
+            with open(ruta, 'rb') as f:
+                # La cabecera va primero para no deserializar datos de otra versión
+                cabecera = pickle.load(f)
+                if {clave: cabecera.get(clave) for clave in self._cabecera_cache()} != self._cabecera_cache():
+                    return False
+                if cabecera.get('firma') != firma and cabecera.get('hash') != self._hash_fuente():
+                    return False
+                estado = pickle.load(f)
+            if completo and estado['df'] is None:
+                return False
+            self._restaurar_cache(estado, firma)
+        except Exception as e:
+            print(f"Caché de {os.path.basename(self.archivo)} ignorada: {e}")
+            return False
+        hoy = date.today()
+        self._derivados = {clave: (firma, valor) for clave, valor in estado['derivados'].items()
+                           if not _de_dia_anterior(clave, hoy)}
+        filas = len(estado['df']) if estado['df'] is not None else max(map(len, estado['proyecciones'].values()))
+        registrar_lectura(os.path.basename(ruta), os.path.getsize(ruta), filas, time.perf_counter() - inicio)
+        return True
+
+    def _programar_cache(self):
+        """
+        Anota que cambió lo que hay en memoria. La caché se guarda en segundo
+        plano cuando el almacén pasa SEGUNDOS_INACTIVIDAD_CACHE sin cambios,
+        o al terminar el proceso: las ráfagas de escrituras no la reescriben.
+        """
+        if not self.CACHE:
+            return
+        self._ultimo_cambio = time.monotonic()
+        _caches_pendientes.add(self)
+        if self._temporizador_cache is None:
+            self._armar_temporizador_cache(SEGUNDOS_INACTIVIDAD_CACHE)
+
+    def _armar_temporizador_cache(self, segundos):
+        self._temporizador_cache = threading.Timer(segundos, self._al_vencer_temporizador_cache)
+        self._temporizador_cache.daemon = True
+        self._temporizador_cache.start()
+
+    def _al_vencer_temporizador_cache(self):
+        with self._lock:
+            restante = self._ultimo_cambio + SEGUNDOS_INACTIVIDAD_CACHE - time.monotonic()
+            if restante > 0:
+                self._armar_temporizador_cache(restante)
+                return
+            self._temporizador_cache = None
+        self.guardar_cache()
+
+    def guardar_cache(self):
+        """
+        Guarda en la caché en disco lo que haya en memoria de la versión
+        actual de los archivos (DataFrame, proyecciones y derivados del día).
+        Si los archivos cambian mientras tanto no se guarda nada.
+        """
+        with self._lock:
+            _caches_pendientes.discard(self)
+            firma = self._firma_actual()
+            estado = self._estado_cache(firma) if firma is not None else None
+            if estado is None:
+                return
+            hoy = date.today()
+            estado['derivados'] = {clave: valor for clave, (firma_derivado, valor) in self._derivados.items()
+                                   if firma_derivado == firma and not _de_dia_anterior(clave, hoy)}
+
+        ruta = self._ruta_cache()
+        temporal = None
+        try:
+            with self._bloqueo_lectura():
+                hash_fuente = self._hash_fuente()
+                if firma != self._firma_actual():
+                    return
+            os.makedirs(os.path.dirname(ruta), mode=0o700, exist_ok=True)
+            fd, temporal = tempfile.mkstemp(prefix=os.path.basename(ruta) + '.', suffix='.tmp',
+                                            dir=os.path.dirname(ruta))
+            with os.fdopen(fd, 'wb') as f:
+                pickle.dump(dict(self._cabecera_cache(), firma=firma, hash=hash_fuente), f,
+                            protocol=pickle.HIGHEST_PROTOCOL)
+                pickle.dump(estado, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(temporal, ruta)
+        except Exception as e:
+            print(f"No se pudo guardar la caché de {os.path.basename(self.archivo)}: {e}")
+            if temporal is not None and os.path.exists(temporal):
+                os.remove(temporal)
+
+    @contextmanager
+    def bloqueo(self):
+        """
+        Bloqueo exclusivo para leer-modificar-escribir: excluye a los demás
+        hilos del proceso y, con fcntl, a los demás procesos. Es reentrante.
+        Dentro del bloqueo, obtener_df() siempre refleja el archivo en disco.
+        """
+        with self._lock:
+            if self._profundidad_bloqueo == 0 and fcntl is not None:
+                self._bloqueo_archivo = open(self.archivo_bloqueo, 'a')
+                fcntl.flock(self._bloqueo_archivo, fcntl.LOCK_EX)
+            self._profundidad_bloqueo += 1
+            try:
+                yield
+            finally:
+                self._profundidad_bloqueo -= 1
+                if self._profundidad_bloqueo == 0 and self._bloqueo_archivo is not None:
+                    fcntl.flock(self._bloqueo_archivo, fcntl.LOCK_UN)
+                    self._bloqueo_archivo.close()
+                    self._bloqueo_archivo = None
+
+    @contextmanager
+    def _bloqueo_lectura(self):
+        """Bloqueo compartido mientras se lee, para no ver escrituras a medias"""
+        if self._profundidad_bloqueo > 0 or fcntl is None:
+            yield
+            return
+        with open(self.archivo_bloqueo, 'a') as f:
+            fcntl.flock(f, fcntl.LOCK_SH)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def _escribir_temporal(self, df):
+        """
+        Escribe df en un archivo temporal de la misma carpeta, sincronizado a
+        disco, listo para reemplazar al original con os.replace.
+        """
+        fd, temporal = tempfile.mkstemp(prefix=os.path.basename(self.archivo) + '.',
+                                        suffix='.tmp', dir=os.path.dirname(self.archivo) or '.')
+        try:
+            with os.fdopen(fd, 'w', newline='') as f:
+                df.to_csv(f, index=False)
+                f.flush()
+                os.fsync(f.fileno())
+            if os.path.exists(self.archivo):
+                shutil.copymode(self.archivo, temporal)
+        except:
+            os.remove(temporal)
+            raise
+        return temporal
+
+    def _antes_de_reemplazar(self):
+        """Se llama en guardar() entre escribir el temporal y reemplazar el archivo"""
+        pass
+
+    def _al_cargar(self):
+        """Se llama cada vez que cambia el DataFrame en caché"""
+        pass
+
+    def _refrescar(self):
+        firma = self._firma_actual()
+        if firma is None:
+            if self._df is not None:
+                self._df = None
+                self._firma = None
+                self._al_cargar()
+        elif firma != self._firma or self._df is None:
+            with self._bloqueo_lectura():
+                if self._cargar_cache(self._firma_actual()):
+                    return
+                inicio = time.perf_counter()
+                self._firma = self._firma_actual()
+                self._df = self._leer()
+                registrar_lectura(os.path.basename(self.archivo), self._bytes_en_disco(), len(self._df),
+                                  time.perf_counter() - inicio)
+            self._al_cargar()
+            self._programar_cache()
+
+    def obtener_df(self):
+        """
+        Retorna el DataFrame compartido.
+        Es de SOLO LECTURA: para modificarlo usar obtener_copia().
+        Si el archivo no existe retorna un DataFrame vacío.
+        """
+        with self._lock:
+            self._refrescar()
+            if self._df is None:
+                return pd.DataFrame()
+            return self._df
+
+    def obtener_copia(self):
+        """Retorna una copia del DataFrame que se puede modificar"""
+        return self.obtener_df().copy()
+
+    def proyeccion(self, nombre):
+        """
+        DataFrame de SOLO LECTURA con las columnas del caso de uso `nombre`
+        (ver PROYECCIONES) que existan en el archivo, alineado por índice con
+        obtener_df() de la misma versión.
+        """
+        return self._proyectar(nombre)[0]
+
+    def _proyectar(self, nombre):
+        """
+        Retorna (proyección, firma). Si el DataFrame completo o una proyección
+        más amplia de la misma versión ya está en memoria se recorta de ahí;
+        si no, se leen del archivo solo las columnas de la proyección.
+        """
+        columnas = self.PROYECCIONES[nombre]
+        with self._lock:
+            firma = self._firma_actual()
+            if firma is None:
+                return pd.DataFrame(), None
+
+            guardada = self._proyecciones.get(nombre)
+            if guardada is not None and guardada[0] == firma:
+                return guardada[1], firma
+
+            fuente = self._df if self._df is not None and self._firma == firma else None
+            if fuente is None and not any(firma_df == firma for firma_df, _ in self._proyecciones.values()):
+                # Nada de esta versión en memoria (por ejemplo recién arrancada la app)
+                with self._bloqueo_lectura():
+                    if self._firma_actual() == firma and self._cargar_cache(firma, completo=False):
+                        guardada = self._proyecciones.get(nombre)
+                        if guardada is not None:
+                            return guardada[1], firma
+                        fuente = self._df if self._firma == firma else None
+            if fuente is None:
+                fuente = next((df for otra, (firma_otra, df) in self._proyecciones.items()
+                               if firma_otra == firma and set(columnas) <= set(self.PROYECCIONES[otra])), None)
+
+            if fuente is not None:
+                df = fuente[[columna for columna in fuente.columns if columna in columnas]]
+            else:
+                with self._bloqueo_lectura():
+                    inicio = time.perf_counter()
+                    firma = self._firma_actual()
+                    df = self._leer_columnas(columnas)
+                    registrar_lectura(os.path.basename(self.archivo), self._bytes_en_disco(), len(df),
+                                      time.perf_counter() - inicio)
+                self._programar_cache()
+
+            self._proyecciones = {otra: guardada for otra, guardada in self._proyecciones.items()
+                                  if guardada[0] == firma}
+            self._proyecciones[nombre] = (firma, df)
+            return df, firma
+
+    def derivado(self, clave, constructor, proyeccion=None):
+        """
+        Retorna un valor calculado a partir del DataFrame, memorizado hasta
+        que cambie la versión de los datos.
+
+        Args:
+            clave: identificador del valor derivado
+            constructor: función que recibe el DataFrame y calcula el valor
+            proyeccion: nombre de la proyección a usar en lugar del
+                DataFrame completo (ver proyeccion())
+        """
+        with self._lock:
+            if proyeccion is None:
+                df = self.obtener_df()
+                firma = self._firma
+            else:
+                df, firma = self._proyectar(proyeccion)
+            guardado = self._derivados.get(clave)
+            if guardado is not None and guardado[0] == firma:
+                return guardado[1]
+            valor = constructor(df)
+            # Los valores de versiones o días anteriores ya no se van a usar
+            hoy = date.today()
+            self._derivados = {k: v for k, v in self._derivados.items()
+                               if v[0] == firma and not _de_dia_anterior(k, hoy)}
+            self._derivados[clave] = (firma, valor)
+            self._programar_cache()
+            return valor
+
+    def guardar(self, df):
+        """
+        Reemplaza el contenido del archivo (temporal + os.replace) y
+        actualiza la caché en el lugar.
+        """
+        with self.bloqueo():
+            inicio = time.perf_counter()
+            df = df.reset_index(drop=True)
+            temporal = self._escribir_temporal(df)
+            self._antes_de_reemplazar()
+            os.replace(temporal, self.archivo)
+            registrar_escritura(os.path.basename(self.archivo), os.path.getsize(self.archivo), len(df),
+                                time.perf_counter() - inicio)
+            self._df = df
+            self._firma = self._firma_actual()
+            self._al_cargar()
+            self._programar_cache()
+
+    def respaldar(self, destino):
+        """Copia los datos actuales a un archivo CSV de respaldo"""
+        with self.bloqueo():
+            shutil.copy(self.archivo, destino)
+
+
+def _nombres_por_habitacion(df):
+    if df.empty:
+        return {}
+    primeros = df.dropna(subset=['Nro. habitación']).drop_duplicates('Nro. habitación', keep='first')
+    return dict(zip(primeros['Nro. habitación'].astype(int).tolist(), primeros['Apellido y nombre'].tolist()))
+
+
+def _centavos(serie):
+    """Montos como enteros en centavos (0 si no son un número)"""
+    montos = pd.to_numeric(serie, errors='coerce').to_numpy(dtype=float)
+    montos = np.where(np.isfinite(montos), montos, 0.0)
+    return np.round(montos * 100).astype(np.int64)
+
+
+def _claves_totales(df):
+    """Columnas (habitacion, pasajero, categoria, centavos) de la tabla de totales"""
+    return pd.DataFrame({
+        'habitacion': df['habitacion'].astype(int).to_numpy(),
+        'pasajero': df['pasajero'].fillna('').astype(str).to_numpy(),
+        'categoria': df['categoria'].fillna('').astype(str).to_numpy(),
+        'centavos': _centavos(df['monto']),
+    })
+
+
+def _tabla_totales(df):
+    """
+    Tabla de totales {habitacion: {(pasajero, categoria): [centavos, cantidad]}}
+    de todas las filas de df, con un solo groupby. Las claves de cada
+    habitación quedan en el orden en que aparecen en df.
+    """
+    if df is None or df.empty or 'habitacion' not in df.columns:
+        return {}
+
+    grupos = _claves_totales(df).groupby(['habitacion', 'pasajero', 'categoria'], sort=False)['centavos']
+    grupos = grupos.agg(['sum', 'size'])
+    totales = {}
+    for (num_hab, pasajero, categoria), centavos, cantidad in zip(grupos.index, grupos['sum'].tolist(),
+                                                                 grupos['size'].tolist()):
+        totales.setdefault(int(num_hab), {})[(pasajero, categoria)] = [centavos, cantidad]
+    return totales
+
+
+def _sumar_totales(totales, df, signo=1):
+    """
+    Suma (signo=1) o resta (signo=-1) las filas de df en la tabla de totales
+    (ver _tabla_totales). Los montos se acumulan como enteros en centavos:
+    restar un consumo deja el total exactamente como estaba antes de
+    agregarlo, sin error de redondeo.
+    """
+    if df is None or df.empty or 'habitacion' not in df.columns:
+        return totales
+
+    claves = _claves_totales(df)
+    for num_hab, pasajero, categoria, centavos in zip(claves['habitacion'].tolist(), claves['pasajero'].tolist(),
+                                                     claves['categoria'].tolist(), claves['centavos'].tolist()):
+        por_clave = totales.setdefault(num_hab, {})
+        acumulado = por_clave.setdefault((pasajero, categoria), [0, 0])
+        acumulado[0] += signo * centavos
+        acumulado[1] += signo
+
+        if acumulado[1] <= 0:
+            del por_clave[(pasajero, categoria)]
+            if not por_clave:
+                del totales[num_hab]
+    return totales
+
+
+def parsear_fechas(serie):
+    """Fechas DD/MM/YYYY → datetime64 (NaT si no se pueden interpretar)"""
+    return pd.to_datetime(serie, format=FORMATO_FECHA, errors='coerce')
+
+
+def parsear_fecha(fecha):
+    """
+    Una fecha como Timestamp: acepta date/datetime o texto DD/MM/YYYY.
+
+    Raises:
+        ValueError si el texto no tiene el formato DD/MM/YYYY
+    """
+    if isinstance(fecha, str):
+        return pd.Timestamp(datetime.strptime(fecha.strip(), FORMATO_FECHA))
+    return pd.Timestamp(fecha).normalize()
+
+
+def _entero(serie):
+    """Columna numérica truncada a entero (Int64, <NA> si no es un número)"""
+    numeros = pd.to_numeric(serie, errors='coerce')
+    numeros = numeros.where(np.isfinite(numeros))
+    return np.trunc(numeros).astype('Int64')
+
+
+def tipar_pasajeros(df):
+    """
+    Columnas de pasajeros con su tipo: fechas de ingreso/egreso como
+    datetime64, habitación/edad/plazas como Int64 y voucher/servicios como
+    categorías. El voucher queda sin espacios, como se compara en todo el
+    sistema. Conserva el índice de df; las columnas que falten no se incluyen.
+
+    Los valores que no se pueden interpretar quedan como NaT / <NA>.
+    """
+    tipos = pd.DataFrame(index=df.index)
+    for columna in ('Nro. habitación', 'Fecha de ingreso', 'Fecha de egreso',
+                    'Edad', 'Plazas ocupadas', 'Voucher', 'Servicios'):
+        if columna not in df.columns:
+            continue
+        if columna.startswith('Fecha'):
+            tipos[columna] = parsear_fechas(df[columna])
+        elif columna == 'Voucher':
+            tipos[columna] = df[columna].map(lambda v: str(v).strip()).astype('category')
+        elif columna == 'Servicios':
+            tipos[columna] = df[columna].astype('category')
+        else:
+            tipos[columna] = _entero(df[columna])
+    return tipos
+
+
+class PasajerosStore(AlmacenCSV):
+    """Caché en memoria de pasajeros.csv"""
+
+    TIPOS = TIPOS_PASAJEROS
+    PROYECCIONES = PROYECCIONES_PASAJEROS
+
+    def __init__(self, archivo=DB_PASAJEROS):
+        super().__init__(archivo)
+
+    def pasajeros_habitacion(self, num_habitacion):
+        """DataFrame con todas las filas (actuales y futuras) de una habitación"""
+        df = self.obtener_df()
+        if df.empty:
+            return df
+        return df[df['Nro. habitación'] == int(num_habitacion)]
+
+    def proyeccion_tipada(self, nombre='dashboard'):
+        """
+        Tupla (proyección, columnas tipadas) de una misma versión del archivo,
+        alineadas por índice entre sí y con obtener_df(). Las columnas se
+        tipan una vez por versión (ver tipar_pasajeros); la proyección
+        conserva los textos originales para mostrar.
+        """
+        return self.derivado(('tipado', nombre), lambda df: (df, tipar_pasajeros(df)), proyeccion=nombre)
+
+    def obtener_tipado(self, nombre='dashboard'):
+        """Columnas tipadas de la proyección `nombre` (ver proyeccion_tipada)"""
+        return self.proyeccion_tipada(nombre)[1]
+
+    def nombres_por_habitacion(self):
+        """
+        Diccionario habitación → nombre del primer pasajero de la habitación
+        en el archivo. Se calcula una vez por versión del archivo.
+        """
+        return self.derivado('nombres_por_habitacion', _nombres_por_habitacion, proyeccion='dashboard')
+
+    def estadias(self):
+        """
+        IndiceEstadias (core/estadias.py) con las estadías de cada habitación
+        ordenadas por ingreso. Se construye una vez por versión del archivo.
+        """
+        from core.estadias import IndiceEstadias
+        return self.derivado('estadias', lambda df: IndiceEstadias(tipar_pasajeros(df)), proyeccion='disponibilidad')
+
+    def agregar(self, df_nuevos):
+        """Agrega pasajeros al final del archivo"""
+        with self.bloqueo():
+            df = self.obtener_df()
+            self.guardar(pd.concat([df, df_nuevos], ignore_index=True) if not df.empty else df_nuevos)
+
+    def eliminar_habitaciones(self, habitaciones):
+        """
+        Elimina todos los pasajeros de las habitaciones indicadas.
+
+        Returns:
+            int: cantidad de pasajeros eliminados
+        """
+        with self.bloqueo():
+            df = self.obtener_df()
+            eliminar = df['Nro. habitación'].isin([int(h) for h in habitaciones])
+            self.guardar(df[~eliminar])
+            return int(eliminar.sum())
+
+    def eliminar_por_fecha(self, columna, fecha):
+        """
+        Elimina los pasajeros cuya columna de fecha ('Fecha de ingreso' o
+        'Fecha de egreso') es igual a la fecha indicada (date o DD/MM/YYYY).
+        Se comparan fechas, no textos: 5/2/2026 y 05/02/2026 son la misma.
+
+        Returns:
+            int: cantidad de pasajeros eliminados
+        """
+        fecha = parsear_fecha(fecha)
+        with self.bloqueo():
+            df = self.obtener_df()
+            if columna not in df.columns:
+                return 0
+            eliminar = (parsear_fechas(df[columna]) == fecha).to_numpy()
+            self.guardar(df[~eliminar])
+            return int(eliminar.sum())
+
+    def reemplazar_habitaciones(self, df_nuevos):
+        """
+        Reemplaza los pasajeros de las habitaciones presentes en df_nuevos
+        y mantiene el resto.
+
+        Returns:
+            int: cantidad de pasajeros mantenidos
+        """
+        with self.bloqueo():
+            df = self.obtener_df()
+            df_mantener = df[~df['Nro. habitación'].isin(df_nuevos['Nro. habitación'].unique())]
+            self.guardar(pd.concat([df_mantener, df_nuevos], ignore_index=True))
+            return len(df_mantener)
+
+    def mover_habitacion(self, habitacion_origen, habitacion_destino, observacion=''):
+        """
+        Cambia la habitación de todos los pasajeros de habitacion_origen.
+        Si el archivo tiene la columna 'Observaciones', agrega la observación.
+
+        Returns:
+            int: cantidad de pasajeros movidos
+        """
+        with self.bloqueo():
+            df = self.obtener_copia()
+            mover = df['Nro. habitación'] == int(habitacion_origen)
+            df.loc[mover, 'Nro. habitación'] = int(habitacion_destino)
+
+            if observacion and 'Observaciones' in df.columns:
+                obs_actual = str(df.loc[mover, 'Observaciones'].iloc[0])
+                if pd.isna(obs_actual) or obs_actual == 'nan':
+                    obs_actual = ""
+                if obs_actual:
+                    observacion = f"{obs_actual} | {observacion}"
+                df.loc[mover, 'Observaciones'] = observacion
+
+            self.guardar(df)
+            return int(mover.sum())
+
+
+class ConsumosStore(AlmacenCSV):
+    """
+    Caché en memoria de consumos_diarios.csv con un índice
+    habitación → posiciones de sus filas, en orden de carga, y una tabla de
+    totales por (habitación, pasajero, categoría) que se actualiza en cada
+    alta y baja en lugar de recalcularse en cada consulta.
+
+    El archivo de consumos funciona como un diario de solo agregado:
+    las eliminaciones y las liquidaciones de checkout no lo reescriben,
+    sino que agregan una baja (tombstone) en consumos_diarios_bajas.csv con
+    la posición de la fila anulada. Al cargar se descartan las filas dadas
+    de baja. Cuando las bajas superan UMBRAL_COMPACTACION de las filas, un
+    hilo en segundo plano reescribe el archivo solo con las filas vigentes
+    y vacía las bajas.
+
+    Cada baja lleva además la generación del archivo de consumos (ver
+    _generacion): si el archivo se vacía por fuera de la app (cambio de
+    temporada) las bajas que quedaron no se aplican a los consumos nuevos.
+    """
+
+    UMBRAL_COMPACTACION = 0.25
+    MINIMO_BAJAS_COMPACTACION = 50
+    COLUMNAS_BAJAS = ['posicion', 'habitacion', 'motivo', 'fecha', 'generacion']
+
+    def __init__(self, archivo=DB_CONSUMOS):
+        super().__init__(archivo)
+        self.archivo_bajas = os.path.splitext(archivo)[0] + '_bajas.csv'
+        self._indice = {}
+        self._totales = {}
+        self._posiciones_archivo = np.array([], dtype=np.intp)
+        self._filas_archivo = 0
+        self._compactando = False
+
+    def _firma_actual(self):
+        firma = firma_archivo(self.archivo)
+        if firma is None:
+            return None
+        return (firma, firma_archivo(self.archivo_bajas))
+
+    def _bytes_en_disco(self):
+        bytes_bajas = os.path.getsize(self.archivo_bajas) if os.path.exists(self.archivo_bajas) else 0
+        return super()._bytes_en_disco() + bytes_bajas
+
+    def _archivos_fuente(self):
+        return [self.archivo, self.archivo_bajas]
+
+    def _estado_cache(self, firma):
+        if self._df is None or self._firma != firma:
+            return None
+        # El índice y los totales se modifican en el lugar al agregar consumos
+        return {
+            'df': self._df,
+            'filas_archivo': self._filas_archivo,
+            'posiciones_archivo': self._posiciones_archivo,
+            'indice': dict(self._indice),
+            'totales': {num_hab: {clave: list(acumulado) for clave, acumulado in por_clave.items()}
+                        for num_hab, por_clave in self._totales.items()},
+        }
+
+    def _restaurar_cache(self, estado, firma):
+        self._df = estado['df']
+        self._firma = firma
+        self._filas_archivo = estado['filas_archivo']
+        self._posiciones_archivo = estado['posiciones_archivo']
+        self._indice = estado['indice']
+        self._totales = estado['totales']
+
+    def _generacion(self):
+        """
+        Generación del archivo de consumos: hash de su primera fila de datos,
+        que no cambia mientras el archivo solo crece. Un archivo vaciado y
+        vuelto a llenar tiene otra primera fila ('' si no tiene filas).
+        """
+        try:
+            with open(self.archivo, 'rb') as f:
+                f.readline()
+                primera = f.readline().rstrip(b'\r\n')
+        except OSError:
+            return ''
+        return hashlib.blake2b(primera, digest_size=8).hexdigest() if primera else ''
+
+    def _leer_bajas(self):
+        """Bajas de la generación actual del archivo de consumos"""
+        bajas = pd.read_csv(self.archivo_bajas, dtype={'generacion': str})
+        if 'generacion' not in bajas.columns:
+            # Bajas anteriores a la generación: se asume que son de este archivo
+            return bajas
+        return bajas[bajas['generacion'] == self._generacion()]
+
+    def _leer(self):
+        df = pd.read_csv(self.archivo)
+        self._filas_archivo = len(df)
+        vigentes = np.ones(len(df), dtype=bool)
+
+        if os.path.exists(self.archivo_bajas) and not df.empty:
+            bajas = self._leer_bajas()
+            posiciones = bajas['posicion'].to_numpy()
+            en_rango = (posiciones >= 0) & (posiciones < len(df))
+            posiciones, habitaciones = posiciones[en_rango], bajas['habitacion'].to_numpy()[en_rango]
+            # Solo se aplican las bajas que coinciden con la habitación de la fila
+            coinciden = df['habitacion'].to_numpy()[posiciones] == habitaciones
+            vigentes[posiciones[coinciden]] = False
+
+        self._posiciones_archivo = np.flatnonzero(vigentes)
+        return df[vigentes].reset_index(drop=True)
+
+    def _al_cargar(self):
+        self._reconstruir_indice()
+        self._totales = _tabla_totales(self._df)
+
+    def _reconstruir_indice(self):
+        if self._df is None or self._df.empty or 'habitacion' not in self._df.columns:
+            self._indice = {}
+        else:
+            self._indice = {int(num_hab): posiciones
+                            for num_hab, posiciones in self._df.groupby('habitacion').indices.items()}
+
+    def habitaciones(self):
+        """Set con las habitaciones que tienen consumos registrados"""
+        with self._lock:
+            self._refrescar()
+            return set(self._indice)
+
+    def posiciones_habitacion(self, num_habitacion):
+        """Posiciones (dentro de obtener_df()) de los consumos de una habitación"""
+        with self._lock:
+            self._refrescar()
+            return self._indice.get(int(num_habitacion), np.array([], dtype=np.intp))
+
+    def consumos_habitacion(self, num_habitacion):
+        """
+        DataFrame con los consumos de una habitación, en el orden del archivo.
+        """
+        with self._lock:
+            df = self.obtener_df()
+            if df.empty:
+                return pd.DataFrame()
+            return df.iloc[self.posiciones_habitacion(num_habitacion)]
+
+    def totales_habitacion(self, num_habitacion, pasajero=None):
+        """
+        Montos por categoría de una habitación (o de un pasajero de la
+        habitación), leídos de la tabla de totales sin recorrer los consumos.
+
+        Returns:
+            dict: {categoria: monto} solo con las categorías que tienen consumos
+        """
+        with self._lock:
+            self._refrescar()
+            por_categoria = {}
+            for (nombre, categoria), (centavos, _) in self._totales.get(int(num_habitacion), {}).items():
+                if pasajero is None or nombre == pasajero:
+                    por_categoria[categoria] = por_categoria.get(categoria, 0) + centavos
+            return {categoria: centavos / 100 for categoria, centavos in por_categoria.items()}
+
+    def verificar_totales(self, reparar=False):
+        """
+        Recalcula la tabla de totales desde los consumos y la compara con la
+        mantenida en memoria.
+
+        Args:
+            reparar (bool): reemplazar la tabla por la recalculada si difieren
+
+        Returns:
+            list: diferencias encontradas, una por (habitacion, pasajero, categoria)
+        """
+        with self._lock:
+            self._refrescar()
+            recalculados = _tabla_totales(self._df)
+            diferencias = []
+            for num_hab in sorted(set(self._totales) | set(recalculados)):
+                actuales, esperados = self._totales.get(num_hab, {}), recalculados.get(num_hab, {})
+                for clave in sorted(set(actuales) | set(esperados)):
+                    actual, esperado = actuales.get(clave, [0, 0]), esperados.get(clave, [0, 0])
+                    if actual != esperado:
+                        diferencias.append({
+                            'habitacion': num_hab, 'pasajero': clave[0], 'categoria': clave[1],
+                            'monto': actual[0] / 100, 'monto_esperado': esperado[0] / 100,
+                            'cantidad': actual[1], 'cantidad_esperada': esperado[1]
+                        })
+
+            if reparar and diferencias:
+                self._totales = recalculados
+            return diferencias
+
+    def guardar(self, df):
+        """
+        Reescribe el archivo completo con df y descarta las bajas pendientes.
+        """
+        with self.bloqueo():
+            super().guardar(df)
+            self._filas_archivo = len(df)
+            self._posiciones_archivo = np.arange(len(df))
+
+    def _antes_de_reemplazar(self):
+        # Las bajas se borran antes de reemplazar el archivo: si el proceso se
+        # corta en el medio reaparecen consumos dados de baja, no se pierden válidos
+        if os.path.exists(self.archivo_bajas):
+            os.remove(self.archivo_bajas)
+
+    def vaciar(self):
+        """Deja el archivo de consumos solo con el encabezado"""
+        self.guardar(pd.DataFrame(columns=COLUMNAS_CONSUMOS))
+
+    def agregar(self, registros, sincronizar=False):
+        """
+        Agrega consumos al final del archivo y actualiza caché e índice
+        sin volver a leer el archivo.
+
+        Args:
+            registros: lista de diccionarios con las columnas de COLUMNAS_CONSUMOS
+            sincronizar (bool): si es True hace fsync antes de retornar, para
+                que el lote quede en disco aunque se corte la luz
+        """
+        df_nuevo = pd.DataFrame(registros, columns=COLUMNAS_CONSUMOS)
+        df_nuevo['habitacion'] = df_nuevo['habitacion'].astype(int)
+        df_nuevo['monto'] = df_nuevo['monto'].astype(float)
+
+        with self.bloqueo():
+            self._refrescar()
+            existia = self._df is not None
+
+            if not existia:
+                # Bajas huérfanas de un archivo anterior no aplican al nuevo
+                if os.path.exists(self.archivo_bajas):
+                    os.remove(self.archivo_bajas)
+                self._filas_archivo = 0
+
+            inicio = time.perf_counter()
+            with open(self.archivo, 'a' if existia else 'w', newline='') as f:
+                posicion = f.tell()
+                df_nuevo.to_csv(f, header=not existia, index=False)
+                if sincronizar:
+                    f.flush()
+                    os.fsync(f.fileno())
+                bytes_escritos = f.tell() - posicion
+            registrar_escritura(os.path.basename(self.archivo), bytes_escritos, len(df_nuevo),
+                                time.perf_counter() - inicio)
+
+            nuevas_posiciones = np.arange(self._filas_archivo, self._filas_archivo + len(df_nuevo))
+            self._filas_archivo += len(df_nuevo)
+            self._firma = self._firma_actual()
+            self._agregar_en_memoria(df_nuevo, nuevas_posiciones)
+            self._programar_cache()
+
+    def _agregar_en_memoria(self, df_nuevo, nuevas_posiciones):
+        """
+        Agrega df_nuevo al final del DataFrame en caché y actualiza índice y
+        totales sin recorrer los consumos anteriores.
+
+        Args:
+            nuevas_posiciones: posición en el archivo de cada fila de df_nuevo
+        """
+        if self._df is None or self._df.empty:
+            self._df = df_nuevo.reset_index(drop=True)
+            self._posiciones_archivo = nuevas_posiciones
+            self._al_cargar()
+            return
+
+        inicio = len(self._df)
+        self._df = pd.concat([self._df, df_nuevo], ignore_index=True)
+        self._posiciones_archivo = np.concatenate([self._posiciones_archivo, nuevas_posiciones])
+        for offset, num_hab in enumerate(df_nuevo['habitacion'].tolist()):
+            previas = self._indice.get(num_hab, np.array([], dtype=np.intp))
+            self._indice[num_hab] = np.append(previas, inicio + offset)
+        _sumar_totales(self._totales, df_nuevo)
+
+    def _quitar_en_memoria(self, posiciones):
+        """Quita del DataFrame en caché las filas en `posiciones` (sin repetidos)"""
+        _sumar_totales(self._totales, self._df.iloc[posiciones], signo=-1)
+        vigentes = np.ones(len(self._df), dtype=bool)
+        vigentes[posiciones] = False
+        self._df = self._df[vigentes].reset_index(drop=True)
+        self._posiciones_archivo = self._posiciones_archivo[vigentes]
+        self._reconstruir_indice()
+
+    def eliminar_posiciones(self, posiciones, motivo='eliminado'):
+        """
+        Da de baja consumos agregando tombstones al archivo de bajas.
+        No reescribe el archivo de consumos.
+
+        Args:
+            posiciones: posiciones dentro de obtener_df() de los consumos a anular
+            motivo (str): 'eliminado', 'checkout', etc.
+
+        Returns:
+            int: cantidad de consumos dados de baja
+        """
+        with self.bloqueo():
+            self._refrescar()
+            if self._df is None or len(posiciones) == 0:
+                return 0
+
+            posiciones = np.unique(np.asarray(posiciones, dtype=np.intp))
+            bajas = pd.DataFrame({
+                'posicion': self._posiciones_archivo[posiciones],
+                'habitacion': self._df['habitacion'].to_numpy()[posiciones],
+                'motivo': motivo,
+                'fecha': datetime.now().strftime('%d/%m/%Y %H:%M'),
+                'generacion': self._generacion()
+            }, columns=self.COLUMNAS_BAJAS)
+
+            inicio = time.perf_counter()
+            self._migrar_bajas()
+            existen_bajas = os.path.exists(self.archivo_bajas)
+            tamano_previo = os.path.getsize(self.archivo_bajas) if existen_bajas else 0
+            bajas.to_csv(self.archivo_bajas, mode='a' if existen_bajas else 'w',
+                         header=not existen_bajas, index=False)
+            registrar_escritura(os.path.basename(self.archivo_bajas),
+                                os.path.getsize(self.archivo_bajas) - tamano_previo, len(bajas),
+                                time.perf_counter() - inicio)
+
+            self._quitar_en_memoria(posiciones)
+            self._firma = self._firma_actual()
+            self._programar_cache()
+
+            self._compactar_si_corresponde()
+            return len(posiciones)
+
+    def _migrar_bajas(self):
+        """
+        Agrega la columna de generación a un archivo de bajas que no la tiene,
+        para poder seguir agregando filas con el formato actual.
+        """
+        if not os.path.exists(self.archivo_bajas):
+            return
+        with open(self.archivo_bajas, newline='') as f:
+            encabezado = f.readline().strip().split(',')
+        if 'generacion' in encabezado:
+            return
+        bajas = pd.read_csv(self.archivo_bajas)
+        bajas['generacion'] = self._generacion()
+        bajas.reindex(columns=self.COLUMNAS_BAJAS).to_csv(self.archivo_bajas, index=False)
+
+    def liquidar_habitaciones(self, habitaciones, motivo='checkout'):
+        """
+        Da de baja todos los consumos de las habitaciones indicadas
+        (consumos pagados al hacer checkout).
+
+        Returns:
+            int: cantidad de consumos dados de baja
+        """
+        with self.bloqueo():
+            posiciones = [self.posiciones_habitacion(num_hab) for num_hab in habitaciones]
+            if not posiciones:
+                return 0
+            return self.eliminar_posiciones(np.concatenate(posiciones), motivo)
+
+    def eliminar_de_habitacion(self, num_habitacion, indice, motivo='eliminado'):
+        """
+        Da de baja el consumo número `indice` (0 = el primero) de una habitación.
+
+        Returns:
+            bool: True si el consumo existía
+        """
+        with self.bloqueo():
+            posiciones = self.posiciones_habitacion(num_habitacion)
+            if indice < 0 or indice >= len(posiciones):
+                return False
+            return self.eliminar_posiciones([posiciones[indice]], motivo) == 1
+
+    def mover_habitacion(self, habitacion_origen, habitacion_destino):
+        """
+        Traslada los consumos de una habitación a otra: quedan al final del
+        archivo con la habitación destino.
+
+        Es una sola escritura (temporal + os.replace, ver guardar) y no un
+        alta más una baja: si el proceso se corta en el medio los consumos
+        quedan en una habitación o en la otra, nunca en las dos. Reescribe
+        el archivo completo, pero los cambios de habitación son pocos.
+
+        Returns:
+            int: cantidad de consumos trasladados
+        """
+        with self.bloqueo():
+            posiciones = self.posiciones_habitacion(habitacion_origen)
+            if len(posiciones) == 0:
+                return 0
+
+            quedan = np.ones(len(self._df), dtype=bool)
+            quedan[posiciones] = False
+            movidos = self._df.iloc[posiciones].copy()
+            movidos['habitacion'] = int(habitacion_destino)
+
+            self.guardar(pd.concat([self._df[quedan], movidos], ignore_index=True))
+            return len(posiciones)
+
+    def _compactar_si_corresponde(self):
+        bajas = self._filas_archivo - len(self._df)
+        if self._compactando or bajas < self.MINIMO_BAJAS_COMPACTACION:
+            return
+        if bajas / self._filas_archivo <= self.UMBRAL_COMPACTACION:
+            return
+
+        self._compactando = True
+        threading.Thread(target=self.compactar, daemon=True).start()
+
+    def respaldar(self, destino):
+        """Copia los consumos vigentes (sin bajas) a un archivo CSV de respaldo"""
+        with self.bloqueo():
+            self.compactar()
+            shutil.copy(self.archivo, destino)
+
+    def compactar(self):
+        """
+        Reescribe el archivo de consumos solo con las filas vigentes y vacía
+        las bajas. Primero se eliminan las bajas y después se reemplaza el
+        archivo: si el proceso se corta en el medio, los consumos dados de baja
+        reaparecen en lugar de perderse consumos válidos.
+        """
+        with self.bloqueo():
+            try:
+                self._refrescar()
+                if self._df is None:
+                    return
+
+                temporal = self._escribir_temporal(self._df)
+                self._antes_de_reemplazar()
+                os.replace(temporal, self.archivo)
+
+                self._filas_archivo = len(self._df)
+                self._posiciones_archivo = np.arange(len(self._df))
+                self._firma = self._firma_actual()
+                self._programar_cache()
+            finally:
+                self._compactando = False
+
+
+def compactar_consumos(archivo=DB_CONSUMOS):
+    """
+    Reescribe el archivo de consumos solo con los consumos vigentes y borra
+    el archivo de bajas (ver ConsumosStore.compactar).
+
+    Returns:
+        int: cantidad de consumos vigentes, o None si el archivo no existe
+    """
+    almacen = ConsumosStore(archivo)
+    if not almacen.existe():
+        return None
+    almacen.compactar()
+    return len(almacen.obtener_df())
+
+
+_almacenes = {}
+_lock_almacenes = threading.Lock()
+
+
+def _obtener_almacen(clase, archivo):
+    clave = (clase, os.path.abspath(archivo))
+    with _lock_almacenes:
+        if clave not in _almacenes:
+            _almacenes[clave] = clase(archivo)
+        return _almacenes[clave]
+
+
+def obtener_almacen_pasajeros(archivo=DB_PASAJEROS):
+    """
+    Retorna el almacén de pasajeros compartido por todo el proceso
+    para el archivo indicado.
+    """
+    if BACKEND == 'sqlite':
+        from core.almacen_sqlite import PasajerosSQLite
+        return _obtener_almacen(PasajerosSQLite, ruta_sqlite(archivo))
+    return _obtener_almacen(PasajerosStore, archivo)
+
+
+def obtener_almacen_consumos(archivo=DB_CONSUMOS):
+    """
+    Retorna el almacén de consumos compartido por todo el proceso
+    para el archivo indicado.
+    """
+    if BACKEND == 'sqlite':
+        from core.almacen_sqlite import ConsumosSQLite
+        return _obtener_almacen(ConsumosSQLite, ruta_sqlite(archivo))
+    return _obtener_almacen(ConsumosStore, archivo)
+
+
+if __name__ == '__main__':
+    comando = sys.argv[1] if len(sys.argv) > 1 else ''
+
+    if comando == 'compactar':
+        vigentes = compactar_consumos()
+        if vigentes is None:
+            print(f'ℹ️  No existe {DB_CONSUMOS}')
+        else:
+            print(f'✅ {DB_CONSUMOS} compactado: {vigentes} consumos vigentes, sin bajas pendientes')
+
+    else:
+        print('Uso:')
+        print('  python3 -m core.almacen compactar   # Aplica las bajas y reescribe consumos_diarios.csv')
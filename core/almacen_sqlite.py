@@ -0,0 +1,498 @@
+"""
+Backend opcional de almacenamiento en SQLite para pasajeros y consumos.
+Implementa la misma interfaz que los almacenes CSV de core/almacen.py, de modo
+que el resto de la aplicación no cambia. Se activa con la variable de entorno
+RECEPCION_BACKEND=sqlite.
+
+Uso por línea de comandos:
+    python3 -m core.almacen_sqlite importar   # CSV actuales → recepcion.db
+    python3 -m core.almacen_sqlite exportar   # recepcion.db → CSV actuales
+"""
+
+import os
+import sqlite3
+import sys
+from contextlib import contextmanager
+
+from core.almacen import (
+    DB_PASAJEROS, DB_CONSUMOS, COLUMNAS_CONSUMOS,
+    PasajerosStore, ConsumosStore, _sumar_totales, parsear_fecha, parsear_fechas, ruta_sqlite
+)
+from core.perezoso import importar_perezoso
+
+np = importar_perezoso('numpy')
+pd = importar_perezoso('pandas')
+
+TABLA_PASAJEROS = 'pasajeros'
+TABLA_CONSUMOS = 'consumos'
+
+COLUMNA_HABITACION = 'Nro. habitación'
+INDICES_PASAJEROS = ['Nro. habitación', 'Voucher', 'Fecha de ingreso', 'Fecha de egreso']
+
+
+def _q(nombre):
+    """Cita un nombre de columna o tabla para SQL"""
+    return '"' + str(nombre).replace('"', '""') + '"'
+
+
+def _tipo_sql(dtype):
+    if dtype.kind in 'iub':
+        return 'INTEGER'
+    if dtype.kind == 'f':
+        return 'REAL'
+    return 'TEXT'
+
+
+def _filas(df):
+    """Filas de df como tuplas de tipos nativos de Python (NaN → NULL)"""
+    return df.astype(object).where(df.notna(), None).itertuples(index=False, name=None)
+
+
+class _AlmacenSQLite:
+    """
+    Parte común de los almacenes SQLite.
+
+    Cada almacén abre su propia conexión (modo WAL) y la protege con el lock
+    del almacén. La versión de los datos combina PRAGMA data_version, que
+    cambia con los commits de otras conexiones, y un contador de los commits
+    propios. El DataFrame en caché se vuelve a leer cuando la versión no es
+    la de la última lectura; las escrituras que actualizan la caché en el
+    lugar (ver ConsumosSQLite) adoptan la versión nueva sin releer.
+    """
+
+    TABLA = None
+    # La firma de la base no depende del contenido del archivo (data_version)
+    CACHE = False
+
+    def __init__(self, archivo):
+        super().__init__(archivo)
+        self._conn = None
+        self._escrituras = 0
+
+    def _conexion(self):
+        if self._conn is None:
+            carpeta = os.path.dirname(self.archivo)
+            if carpeta:
+                os.makedirs(carpeta, exist_ok=True)
+            self._conn = sqlite3.connect(self.archivo, isolation_level=None,
+                                         check_same_thread=False, timeout=10)
+            self._conn.execute('PRAGMA journal_mode=WAL')
+        return self._conn
+
+    @contextmanager
+    def bloqueo(self):
+        # SQLite se encarga del bloqueo entre procesos (BEGIN IMMEDIATE)
+        with self._lock:
+            yield
+
+    @contextmanager
+    def _bloqueo_lectura(self):
+        yield
+
+    @contextmanager
+    def _transaccion(self):
+        """Ejecuta un bloque dentro de una transacción de escritura"""
+        with self._lock:
+            conn = self._conexion()
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                yield conn
+                conn.execute('COMMIT')
+            except:
+                conn.execute('ROLLBACK')
+                raise
+            self._escrituras += 1
+
+    def existe(self):
+        with self._lock:
+            if not os.path.exists(self.archivo):
+                return False
+            fila = self._conexion().execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (self.TABLA,)
+            ).fetchone()
+            return fila is not None
+
+    def _bytes_en_disco(self):
+        # Una consulta no recorre el archivo completo: las métricas solo cuentan filas
+        return 0
+
+    def _firma_actual(self):
+        if not self.existe():
+            return None
+        data_version = self._conexion().execute('PRAGMA data_version').fetchone()[0]
+        return (data_version, self._escrituras)
+
+    def _cache_al_dia(self):
+        """
+        True si el DataFrame en caché refleja la base. Dentro de una
+        transacción de escritura asegura que nadie más escribió desde la
+        última lectura, así que la caché se puede actualizar en el lugar.
+        """
+        return self._df is not None and self._firma == self._firma_actual()
+
+    def _columnas(self, conn):
+        return [fila[1] for fila in conn.execute(f'PRAGMA table_info({_q(self.TABLA)})')]
+
+    def _consultar(self, sql, parametros=()):
+        """Ejecuta un SELECT y retorna un DataFrame con NaN para los NULL"""
+        with self._lock:
+            df = pd.read_sql_query(sql, self._conexion(), params=parametros)
+        for columna in df.columns:
+            if df[columna].dtype == object:
+                df[columna] = df[columna].where(df[columna].notna(), np.nan)
+        return df
+
+    def _insertar(self, conn, df):
+        columnas = ', '.join(_q(c) for c in df.columns)
+        marcadores = ', '.join('?' * len(df.columns))
+        conn.executemany(f'INSERT INTO {_q(self.TABLA)} ({columnas}) VALUES ({marcadores})', _filas(df))
+
+    def exportar_csv(self, destino):
+        """Escribe el contenido de la tabla en un archivo CSV"""
+        self.obtener_df().to_csv(destino, index=False)
+
+    def respaldar(self, destino):
+        """Exporta los datos actuales a un archivo CSV de respaldo"""
+        self.exportar_csv(destino)
+
+
+class PasajerosSQLite(_AlmacenSQLite, PasajerosStore):
+    """
+    Pasajeros en la tabla `pasajeros`. Las columnas se toman del CSV cargado
+    (cambian según la temporada) y se agregan las que falten al insertar.
+    """
+
+    TABLA = TABLA_PASAJEROS
+
+    def _leer(self):
+        return self._consultar(f'SELECT * FROM {_q(self.TABLA)} ORDER BY rowid')
+
+    def _leer_columnas(self, columnas):
+        with self._lock:
+            presentes = [c for c in self._columnas(self._conexion()) if c in columnas]
+        if not presentes:
+            return pd.DataFrame()
+        return self._consultar(f'SELECT {", ".join(_q(c) for c in presentes)} FROM {_q(self.TABLA)} ORDER BY rowid')
+
+    def _crear_indices(self, conn):
+        columnas = self._columnas(conn)
+        for numero, columna in enumerate(INDICES_PASAJEROS):
+            if columna in columnas:
+                conn.execute(f'CREATE INDEX IF NOT EXISTS idx_pasajeros_{numero} '
+                             f'ON {_q(self.TABLA)} ({_q(columna)})')
+
+    def guardar(self, df):
+        """Reemplaza el contenido de la tabla (y su estructura) por df"""
+        definicion = ', '.join(f'{_q(c)} {_tipo_sql(df[c].dtype)}' for c in df.columns)
+        with self._transaccion() as conn:
+            conn.execute(f'DROP TABLE IF EXISTS {_q(self.TABLA)}')
+            conn.execute(f'CREATE TABLE {_q(self.TABLA)} ({definicion})')
+            self._crear_indices(conn)
+            self._insertar(conn, df)
+
+    def pasajeros_habitacion(self, num_habitacion):
+        if not self.existe():
+            return pd.DataFrame()
+        return self._consultar(
+            f'SELECT * FROM {_q(self.TABLA)} WHERE {_q(COLUMNA_HABITACION)} = ? ORDER BY rowid',
+            (int(num_habitacion),)
+        )
+
+    def agregar(self, df_nuevos):
+        if not self.existe():
+            self.guardar(df_nuevos)
+            return
+        with self._transaccion() as conn:
+            existentes = self._columnas(conn)
+            for columna in df_nuevos.columns:
+                if columna not in existentes:
+                    conn.execute(f'ALTER TABLE {_q(self.TABLA)} ADD COLUMN '
+                                 f'{_q(columna)} {_tipo_sql(df_nuevos[columna].dtype)}')
+            self._insertar(conn, df_nuevos)
+
+    def eliminar_habitaciones(self, habitaciones):
+        habitaciones = [int(h) for h in habitaciones]
+        if not habitaciones:
+            return 0
+        with self._transaccion() as conn:
+            cursor = conn.execute(
+                f'DELETE FROM {_q(self.TABLA)} WHERE {_q(COLUMNA_HABITACION)} '
+                f'IN ({", ".join("?" * len(habitaciones))})', habitaciones
+            )
+            return cursor.rowcount
+
+    def eliminar_por_fecha(self, columna, fecha):
+        fecha = parsear_fecha(fecha)
+        with self._transaccion() as conn:
+            if columna not in self._columnas(conn):
+                return 0
+            # Se comparan fechas y no textos (5/2/2026 y 05/02/2026 son la misma)
+            filas = conn.execute(f'SELECT rowid, {_q(columna)} FROM {_q(self.TABLA)}').fetchall()
+            fechas = parsear_fechas(pd.Series([valor for _, valor in filas], dtype=object))
+            rowids = [(rowid,) for (rowid, _), coincide in zip(filas, fechas == fecha) if coincide]
+            conn.executemany(f'DELETE FROM {_q(self.TABLA)} WHERE rowid = ?', rowids)
+            return len(rowids)
+
+    def reemplazar_habitaciones(self, df_nuevos):
+        if not self.existe():
+            self.guardar(df_nuevos)
+            return 0
+        habitaciones = [int(h) for h in df_nuevos[COLUMNA_HABITACION].unique()]
+        with self._transaccion() as conn:
+            conn.execute(
+                f'DELETE FROM {_q(self.TABLA)} WHERE {_q(COLUMNA_HABITACION)} '
+                f'IN ({", ".join("?" * len(habitaciones))})', habitaciones
+            )
+            mantenidas = conn.execute(f'SELECT COUNT(*) FROM {_q(self.TABLA)}').fetchone()[0]
+            existentes = self._columnas(conn)
+            for columna in df_nuevos.columns:
+                if columna not in existentes:
+                    conn.execute(f'ALTER TABLE {_q(self.TABLA)} ADD COLUMN '
+                                 f'{_q(columna)} {_tipo_sql(df_nuevos[columna].dtype)}')
+            self._insertar(conn, df_nuevos)
+            return mantenidas
+
+    def mover_habitacion(self, habitacion_origen, habitacion_destino, observacion=''):
+        with self._transaccion() as conn:
+            if observacion and 'Observaciones' in self._columnas(conn):
+                cursor = conn.execute(
+                    f'UPDATE {_q(self.TABLA)} SET {_q(COLUMNA_HABITACION)} = ?, '
+                    f'"Observaciones" = CASE WHEN "Observaciones" IS NULL OR "Observaciones" = \'\' '
+                    f'THEN ? ELSE "Observaciones" || \' | \' || ? END '
+                    f'WHERE {_q(COLUMNA_HABITACION)} = ?',
+                    (int(habitacion_destino), observacion, observacion, int(habitacion_origen))
+                )
+            else:
+                cursor = conn.execute(
+                    f'UPDATE {_q(self.TABLA)} SET {_q(COLUMNA_HABITACION)} = ? '
+                    f'WHERE {_q(COLUMNA_HABITACION)} = ?',
+                    (int(habitacion_destino), int(habitacion_origen))
+                )
+            return cursor.rowcount
+
+
+class ConsumosSQLite(_AlmacenSQLite, ConsumosStore):
+    """
+    Consumos en la tabla `consumos`, indexada por habitación y por
+    (habitación, pasajero). Las bajas son DELETE directos: no hay archivo
+    de bajas ni compactación. `_posiciones_archivo` guarda el id de cada
+    fila de obtener_df() para traducir posiciones a filas de la tabla.
+
+    Las altas, bajas y traslados actualizan el DataFrame en caché, el
+    índice y los totales después del COMMIT, como ConsumosStore, en lugar de
+    volver a leer la tabla. Si otra conexión escribió en el medio la caché
+    no se toca y la próxima lectura la vuelve a cargar.
+    """
+
+    TABLA = TABLA_CONSUMOS
+
+    def _crear_tabla(self, conn):
+        conn.execute(f'''CREATE TABLE IF NOT EXISTS {_q(self.TABLA)} (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            fecha TEXT,
+            habitacion INTEGER,
+            pasajero TEXT,
+            categoria TEXT,
+            monto REAL
+        )''')
+        conn.execute(f'CREATE INDEX IF NOT EXISTS idx_consumos_habitacion '
+                     f'ON {_q(self.TABLA)} (habitacion)')
+        conn.execute(f'CREATE INDEX IF NOT EXISTS idx_consumos_habitacion_pasajero '
+                     f'ON {_q(self.TABLA)} (habitacion, pasajero)')
+
+    def _leer(self):
+        df = self._consultar(f'SELECT id, {", ".join(COLUMNAS_CONSUMOS)} '
+                             f'FROM {_q(self.TABLA)} ORDER BY id')
+        self._posiciones_archivo = df.pop('id').to_numpy()
+        return df
+
+    def consumos_habitacion(self, num_habitacion):
+        if not self.existe():
+            return pd.DataFrame()
+        return self._consultar(f'SELECT {", ".join(COLUMNAS_CONSUMOS)} FROM {_q(self.TABLA)} '
+                               f'WHERE habitacion = ? ORDER BY id', (int(num_habitacion),))
+
+    def guardar(self, df):
+        """Reemplaza todos los consumos por los de df"""
+        df = df.reset_index(drop=True)[COLUMNAS_CONSUMOS]
+        with self._transaccion() as conn:
+            self._crear_tabla(conn)
+            conn.execute(f'DELETE FROM {_q(self.TABLA)}')
+            self._insertar(conn, df)
+
+    def vaciar(self):
+        self.guardar(pd.DataFrame(columns=COLUMNAS_CONSUMOS))
+
+    def agregar(self, registros, sincronizar=False):
+        # Con synchronous=FULL (el valor por defecto) cada COMMIT ya hace fsync del WAL
+        df_nuevo = pd.DataFrame(registros, columns=COLUMNAS_CONSUMOS)
+        df_nuevo['habitacion'] = df_nuevo['habitacion'].astype(int)
+        df_nuevo['monto'] = df_nuevo['monto'].astype(float)
+        with self._lock:
+            with self._transaccion() as conn:
+                self._crear_tabla(conn)
+                al_dia = self._cache_al_dia()
+                ultimo = conn.execute(f'SELECT COALESCE(MAX(id), 0) FROM {_q(self.TABLA)}').fetchone()[0]
+                self._insertar(conn, df_nuevo)
+                ids = [fila[0] for fila in conn.execute(
+                    f'SELECT id FROM {_q(self.TABLA)} WHERE id > ? ORDER BY id', (ultimo,))]
+
+            if al_dia:
+                self._agregar_en_memoria(df_nuevo, np.asarray(ids, dtype=np.int64))
+                self._firma = self._firma_actual()
+
+    def _eliminar_ids(self, conn, ids):
+        """Borra las filas con esos ids; retorna cuántas había"""
+        ids = [int(i) for i in ids]
+        if not ids:
+            return 0
+        cursor = conn.execute(
+            f'DELETE FROM {_q(self.TABLA)} WHERE id IN ({", ".join("?" * len(ids))})', ids
+        )
+        return cursor.rowcount
+
+    def _quitar_ids(self, ids):
+        """Quita de la caché las filas con esos ids (después del DELETE)"""
+        self._quitar_en_memoria(np.flatnonzero(np.isin(self._posiciones_archivo, np.asarray(ids, dtype=np.int64))))
+        self._firma = self._firma_actual()
+
+    def eliminar_posiciones(self, posiciones, motivo='eliminado'):
+        with self._lock:
+            self._refrescar()
+            if self._df is None or len(posiciones) == 0:
+                return 0
+            ids = self._posiciones_archivo[np.unique(np.asarray(posiciones, dtype=np.intp))]
+            with self._transaccion() as conn:
+                al_dia = self._cache_al_dia()
+                eliminados = self._eliminar_ids(conn, ids)
+            if al_dia:
+                self._quitar_ids(ids)
+            return eliminados
+
+    def liquidar_habitaciones(self, habitaciones, motivo='checkout'):
+        habitaciones = [int(h) for h in habitaciones]
+        if not habitaciones or not self.existe():
+            return 0
+        with self._lock:
+            with self._transaccion() as conn:
+                al_dia = self._cache_al_dia()
+                ids = [fila[0] for fila in conn.execute(
+                    f'SELECT id FROM {_q(self.TABLA)} WHERE habitacion '
+                    f'IN ({", ".join("?" * len(habitaciones))})', habitaciones
+                )]
+                eliminados = self._eliminar_ids(conn, ids)
+            if al_dia:
+                self._quitar_ids(ids)
+            return eliminados
+
+    def eliminar_de_habitacion(self, num_habitacion, indice, motivo='eliminado'):
+        if indice < 0 or not self.existe():
+            return False
+        with self._lock:
+            with self._transaccion() as conn:
+                al_dia = self._cache_al_dia()
+                ids = [fila[0] for fila in conn.execute(
+                    f'SELECT id FROM {_q(self.TABLA)} WHERE habitacion = ? ORDER BY id LIMIT 1 OFFSET ?',
+                    (int(num_habitacion), int(indice))
+                )]
+                eliminados = self._eliminar_ids(conn, ids)
+            if al_dia:
+                self._quitar_ids(ids)
+            return eliminados == 1
+
+    def mover_habitacion(self, habitacion_origen, habitacion_destino):
+        if not self.existe():
+            return 0
+        with self._lock:
+            with self._transaccion() as conn:
+                al_dia = self._cache_al_dia()
+                cursor = conn.execute(
+                    f'UPDATE {_q(self.TABLA)} SET habitacion = ? WHERE habitacion = ?',
+                    (int(habitacion_destino), int(habitacion_origen))
+                )
+            if al_dia:
+                # Las filas conservan su id: cambian de habitación en el lugar
+                posiciones = self._indice.get(int(habitacion_origen), np.array([], dtype=np.intp))
+                _sumar_totales(self._totales, self._df.iloc[posiciones], signo=-1)
+                habitaciones = self._df['habitacion'].to_numpy().copy()
+                habitaciones[posiciones] = int(habitacion_destino)
+                self._df = self._df.assign(habitacion=habitaciones)
+                _sumar_totales(self._totales, self._df.iloc[posiciones])
+                self._reconstruir_indice()
+                self._firma = self._firma_actual()
+            return cursor.rowcount
+
+    def compactar(self):
+        """Vuelca el WAL a la base de datos principal"""
+        with self._lock:
+            if os.path.exists(self.archivo):
+                self._conexion().execute('PRAGMA wal_checkpoint(TRUNCATE)')
+
+
+def importar_csv(archivo_pasajeros=DB_PASAJEROS, archivo_consumos=DB_CONSUMOS, archivo_db=None):
+    """
+    Carga los CSV actuales en la base SQLite, reemplazando su contenido.
+    Los consumos dados de baja en el archivo de bajas no se importan.
+
+    Returns:
+        tuple (pasajeros importados, consumos importados)
+    """
+    archivo_db = archivo_db or ruta_sqlite(archivo_pasajeros)
+    pasajeros = consumos = 0
+
+    if os.path.exists(archivo_pasajeros):
+        df = PasajerosStore(archivo_pasajeros).obtener_df()
+        PasajerosSQLite(archivo_db).guardar(df)
+        pasajeros = len(df)
+
+    if os.path.exists(archivo_consumos):
+        df = ConsumosStore(archivo_consumos).obtener_df()
+        ConsumosSQLite(archivo_db).guardar(df)
+        consumos = len(df)
+
+    return pasajeros, consumos
+
+
+def exportar_csv(archivo_pasajeros=DB_PASAJEROS, archivo_consumos=DB_CONSUMOS, archivo_db=None):
+    """
+    Escribe el contenido de la base SQLite en los CSV indicados, para
+    seguir trabajando con planillas o volver al backend CSV.
+
+    Returns:
+        tuple (pasajeros exportados, consumos exportados)
+    """
+    archivo_db = archivo_db or ruta_sqlite(archivo_pasajeros)
+    pasajeros = consumos = 0
+
+    almacen = PasajerosSQLite(archivo_db)
+    if almacen.existe():
+        almacen.exportar_csv(archivo_pasajeros)
+        pasajeros = len(almacen.obtener_df())
+
+    almacen = ConsumosSQLite(archivo_db)
+    if almacen.existe():
+        # Las bajas pendientes corresponden al CSV anterior
+        bajas = ConsumosStore(archivo_consumos).archivo_bajas
+        if os.path.exists(bajas):
+            os.remove(bajas)
+        almacen.exportar_csv(archivo_consumos)
+        consumos = len(almacen.obtener_df())
+
+    return pasajeros, consumos
+
+
+if __name__ == '__main__':
+    comando = sys.argv[1] if len(sys.argv) > 1 else ''
+
+    if comando == 'importar':
+        pasajeros, consumos = importar_csv()
+        print(f'✅ Importados {pasajeros} pasajeros y {consumos} consumos a {ruta_sqlite(DB_PASAJEROS)}')
+
+    elif comando == 'exportar':
+        pasajeros, consumos = exportar_csv()
+        print(f'✅ Exportados {pasajeros} pasajeros a {DB_PASAJEROS} y {consumos} consumos a {DB_CONSUMOS}')
+
+    else:
+        print('Uso:')
+        print('  python3 -m core.almacen_sqlite importar   # CSV → SQLite')
+        print('  python3 -m core.almacen_sqlite exportar   # SQLite → CSV')
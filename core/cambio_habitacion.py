@@ -3,11 +3,7 @@ Módulo para gestionar cambios de habitación por desperfectos o emergencias.
 Permite mover un huésped de una habitación a otra manteniendo sus consumos.
 """
 
-import pandas as pd
-import os
-
-DB_PASAJEROS = 'data/pasajeros.csv'
-DB_CONSUMOS = 'data/consumos_diarios.csv'
+from core.almacen import DB_PASAJEROS, DB_CONSUMOS, obtener_almacen_pasajeros, obtener_almacen_consumos
 
 
 def obtener_habitaciones_disponibles_para_cambio(habitacion_origen):
@@ -51,7 +47,7 @@ def cambiar_habitacion(habitacion_origen, habitacion_destino, motivo=""):
         tuple: (bool_exito, str_mensaje)
     """
     
-    if not os.path.exists(DB_PASAJEROS):
+    if not obtener_almacen_pasajeros(DB_PASAJEROS).existe():
         return False, "No existe el archivo de pasajeros"
     
     try:
@@ -64,52 +60,33 @@ def cambiar_habitacion(habitacion_origen, habitacion_destino, motivo=""):
         return False, "Las habitaciones origen y destino son iguales"
     
     try:
-        # 1. Verificar que la habitación origen esté ocupada
-        df_pasajeros = pd.read_csv(DB_PASAJEROS)
-        pasajero_origen = df_pasajeros[df_pasajeros['Nro. habitación'] == habitacion_origen]
-        
-        if pasajero_origen.empty:
-            return False, f"La habitación {habitacion_origen} no está ocupada"
+        # Verificar y mover bajo el bloqueo del archivo de pasajeros, para que
+        # otra reserva o cambio no ocupe el destino entre la consulta y la escritura
+        almacen = obtener_almacen_pasajeros(DB_PASAJEROS)
+        with almacen.bloqueo():
+            # 1. Verificar que la habitación origen esté ocupada
+            pasajero_origen = almacen.pasajeros_habitacion(habitacion_origen)
         
-        # 2. Verificar que la habitación destino esté disponible
-        pasajero_destino = df_pasajeros[df_pasajeros['Nro. habitación'] == habitacion_destino]
-        if not pasajero_destino.empty:
-            return False, f"La habitación {habitacion_destino} ya está ocupada"
+            if pasajero_origen.empty:
+                return False, f"La habitación {habitacion_origen} no está ocupada"
         
-        # 3. Obtener datos del pasajero
-        nombre_pasajero = pasajero_origen.iloc[0]['Apellido y nombre']
+            # 2. Verificar que la habitación destino esté disponible
+            pasajero_destino = almacen.pasajeros_habitacion(habitacion_destino)
+            if not pasajero_destino.empty:
+                return False, f"La habitación {habitacion_destino} ya está ocupada"
         
-        # 4. Actualizar habitación en pasajeros.csv
-        df_pasajeros.loc[df_pasajeros['Nro. habitación'] == habitacion_origen, 
-                         'Nro. habitación'] = habitacion_destino
+            # 3. Obtener datos del pasajero
+            nombre_pasajero = pasajero_origen.iloc[0]['Apellido y nombre']
         
-        # 5. Agregar observación si existe el campo
-        if 'Observaciones' in df_pasajeros.columns:
-            obs_actual = str(df_pasajeros.loc[df_pasajeros['Nro. habitación'] == habitacion_destino, 
-                                              'Observaciones'].iloc[0])
-            if pd.isna(obs_actual) or obs_actual == 'nan':
-                obs_actual = ""
-            
+            # 4. Actualizar habitación en pasajeros.csv (con observación si existe el campo)
             nueva_obs = f"Cambio desde Hab {habitacion_origen}. Motivo: {motivo}" if motivo else f"Cambio desde Hab {habitacion_origen}"
-            if obs_actual:
-                nueva_obs = f"{obs_actual} | {nueva_obs}"
-            
-            df_pasajeros.loc[df_pasajeros['Nro. habitación'] == habitacion_destino, 
-                            'Observaciones'] = nueva_obs
-        
-        df_pasajeros.to_csv(DB_PASAJEROS, index=False)
+            almacen.mover_habitacion(habitacion_origen, habitacion_destino, nueva_obs)
         
-        # 6. Actualizar consumos si existen
-        consumos_actualizados = 0
-        if os.path.exists(DB_CONSUMOS):
-            df_consumos = pd.read_csv(DB_CONSUMOS)
-            consumos_habitacion = df_consumos[df_consumos['habitacion'] == habitacion_origen]
-            
-            if not consumos_habitacion.empty:
-                df_consumos.loc[df_consumos['habitacion'] == habitacion_origen, 
-                               'habitacion'] = habitacion_destino
-                df_consumos.to_csv(DB_CONSUMOS, index=False)
-                consumos_actualizados = len(consumos_habitacion)
+            # 5. Actualizar consumos si existen
+            consumos_actualizados = 0
+            if obtener_almacen_consumos(DB_CONSUMOS).existe():
+                almacen_consumos = obtener_almacen_consumos(DB_CONSUMOS)
+                consumos_actualizados = almacen_consumos.mover_habitacion(habitacion_origen, habitacion_destino)
         
         mensaje = f"Cambio exitoso: {nombre_pasajero} movido de habitación {habitacion_origen} → {habitacion_destino}"
         if consumos_actualizados > 0:
@@ -138,17 +115,17 @@ def validar_cambio_habitacion(habitacion_origen, habitacion_destino):
     if habitacion_origen == habitacion_destino:
         return False, "Debe seleccionar una habitación diferente"
     
-    if not os.path.exists(DB_PASAJEROS):
+    if not obtener_almacen_pasajeros(DB_PASAJEROS).existe():
         return False, "No existe el archivo de pasajeros"
     
-    df_pasajeros = pd.read_csv(DB_PASAJEROS)
+    almacen = obtener_almacen_pasajeros(DB_PASAJEROS)
     
     # Verificar origen ocupada
-    if df_pasajeros[df_pasajeros['Nro. habitación'] == habitacion_origen].empty:
+    if almacen.pasajeros_habitacion(habitacion_origen).empty:
         return False, f"La habitación {habitacion_origen} no está ocupada"
     
     # Verificar destino disponible
-    if not df_pasajeros[df_pasajeros['Nro. habitación'] == habitacion_destino].empty:
+    if not almacen.pasajeros_habitacion(habitacion_destino).empty:
         return False, f"La habitación {habitacion_destino} ya está ocupada"
     
     return True, ""
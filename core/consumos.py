@@ -2,10 +2,16 @@
 Módulo para gestionar operaciones de consumos individuales por habitación.
 """
 
-import pandas as pd
-import os
 from datetime import datetime
 
+from core.almacen import obtener_almacen_consumos, parsear_fechas
+from core.perezoso import importar_perezoso
+
+np = importar_perezoso('numpy')
+pd = importar_perezoso('pandas')
+
+CATEGORIAS = ['Bebidas', 'Estadía', 'Map']
+
 
 def obtener_consumos_habitacion(num_habitacion, archivo_consumos='data/consumos_diarios.csv'):
     """
@@ -14,11 +20,10 @@ def obtener_consumos_habitacion(num_habitacion, archivo_consumos='data/consumos_
     Returns:
         DataFrame con los consumos ordenados por fecha
     """
-    if not os.path.exists(archivo_consumos):
+    if not obtener_almacen_consumos(archivo_consumos).existe():
         return pd.DataFrame()
     
-    df = pd.read_csv(archivo_consumos)
-    consumos_hab = df[df['habitacion'] == num_habitacion].copy()
+    consumos_hab = obtener_almacen_consumos(archivo_consumos).consumos_habitacion(num_habitacion).copy()
     
     # Agregar índice para identificar cada consumo
     if not consumos_hab.empty:
@@ -27,6 +32,20 @@ def obtener_consumos_habitacion(num_habitacion, archivo_consumos='data/consumos_
     return consumos_hab
 
 
+def _totales_por_categoria(por_categoria):
+    """
+    Completa los montos por categoría de la tabla de totales con las
+    categorías sin consumos y el total general.
+    
+    Returns:
+        Diccionario con totales por categoría y total general
+    """
+    totales = {categoria: por_categoria.get(categoria, 0) for categoria in CATEGORIAS}
+    totales['total'] = sum(totales.values())
+    
+    return totales
+
+
 def obtener_total_consumos(num_habitacion, archivo_consumos='data/consumos_diarios.csv'):
     """
     Calcula el total de consumos de una habitación.
@@ -34,24 +53,112 @@ def obtener_total_consumos(num_habitacion, archivo_consumos='data/consumos_diari
     Returns:
         Diccionario con totales por categoría y total general
     """
-    consumos = obtener_consumos_habitacion(num_habitacion, archivo_consumos)
+    almacen = obtener_almacen_consumos(archivo_consumos)
+    if not almacen.existe():
+        return _totales_por_categoria({})
+    return _totales_por_categoria(almacen.totales_habitacion(num_habitacion))
+
+
+def obtener_totales_por_habitacion(habitaciones, archivo_consumos='data/consumos_diarios.csv'):
+    """
+    Calcula los totales de consumos de varias habitaciones a la vez,
+    leyendo la tabla de totales del almacén (sin recorrer los consumos).
     
-    if consumos.empty:
-        return {
-            'Bebidas': 0,
-            'Estadía': 0,
-            'Map': 0,
-            'total': 0
-        }
+    Args:
+        habitaciones: colección de números de habitación
+        archivo_consumos (str): Ruta al archivo CSV de consumos
     
-    totales = {
-        'Bebidas': consumos[consumos['categoria'] == 'Bebidas']['monto'].sum() if 'Bebidas' in consumos['categoria'].values else 0,
-        'Estadía': consumos[consumos['categoria'] == 'Estadía']['monto'].sum() if 'Estadía' in consumos['categoria'].values else 0,
-        'Map': consumos[consumos['categoria'] == 'Map']['monto'].sum() if 'Map' in consumos['categoria'].values else 0,
+    Returns:
+        Diccionario {num_habitacion: totales} con el mismo formato que
+        obtener_total_consumos (incluye las habitaciones sin consumos)
+    """
+    almacen = obtener_almacen_consumos(archivo_consumos)
+    existe = almacen.existe()
+    
+    return {
+        int(num_hab): _totales_por_categoria(almacen.totales_habitacion(num_hab) if existe else {})
+        for num_hab in habitaciones
     }
-    totales['total'] = sum(totales.values())
+
+
+def buscar_consumos(habitacion=None, pasajero=None, categoria=None, desde=None, hasta=None,
+                    pagina=1, por_pagina=50, archivo_consumos='data/consumos_diarios.csv'):
+    """
+    Busca consumos con filtros y retorna solo la página pedida.
+    Si se filtra por habitación se parte del índice de la habitación en lugar
+    de recorrer todos los consumos; solo se arman las filas de la página.
     
-    return totales
+    Args:
+        habitacion (int): Número de habitación
+        pasajero (str): Texto a buscar en el nombre (sin distinguir mayúsculas)
+        categoria (str): Categoría exacta
+        desde, hasta (date): Rango de fechas del consumo (inclusive)
+        pagina (int): Número de página, desde 1
+        por_pagina (int): Cantidad de consumos por página
+    
+    Returns:
+        Diccionario con 'consumos' (lista de la página, cada uno con su
+        'indice' global para eliminarlo), 'total', 'total_monto', 'pagina',
+        'paginas' y 'por_pagina'
+    """
+    resultado = {'consumos': [], 'total': 0, 'total_monto': 0.0,
+                 'pagina': 1, 'paginas': 1, 'por_pagina': por_pagina}
+    
+    almacen = obtener_almacen_consumos(archivo_consumos)
+    if not almacen.existe():
+        return resultado
+    
+    df = almacen.obtener_df()
+    if df.empty:
+        return resultado
+    
+    if habitacion is not None:
+        posiciones = almacen.posiciones_habitacion(habitacion)
+    else:
+        posiciones = np.arange(len(df))
+    
+    if pasajero or categoria or desde or hasta:
+        candidatos = df.iloc[posiciones]
+        mascara = np.ones(len(candidatos), dtype=bool)
+        if pasajero:
+            mascara &= candidatos['pasajero'].astype(str).str.contains(pasajero, case=False, regex=False).to_numpy()
+        if categoria:
+            mascara &= (candidatos['categoria'] == categoria).to_numpy()
+        if desde or hasta:
+            # La fecha es lo anterior a la hora; puede venir sin ceros (5/2/2026 10:00)
+            fechas = parsear_fechas(candidatos['fecha'].astype(str).str.strip().str.split(' ').str[0])
+            if desde:
+                mascara &= (fechas >= pd.Timestamp(desde)).to_numpy()
+            if hasta:
+                mascara &= (fechas <= pd.Timestamp(hasta)).to_numpy()
+        posiciones = posiciones[mascara]
+    
+    total = len(posiciones)
+    paginas = max(1, -(-total // por_pagina))
+    pagina = min(max(1, pagina), paginas)
+    inicio = (pagina - 1) * por_pagina
+    posiciones_pagina = posiciones[inicio:inicio + por_pagina]
+    
+    filas = df.iloc[posiciones_pagina]
+    consumos = []
+    for indice, row in zip(posiciones_pagina.tolist(), filas.to_dict('records')):
+        consumos.append({
+            'indice': indice,
+            'fecha': row['fecha'],
+            'habitacion': int(row['habitacion']),
+            'pasajero': row['pasajero'] if pd.notna(row['pasajero']) else '',
+            'categoria': row['categoria'],
+            'monto': float(row['monto'])
+        })
+    
+    resultado.update({
+        'consumos': consumos,
+        'total': total,
+        'total_monto': float(df['monto'].to_numpy()[posiciones].sum()),
+        'pagina': pagina,
+        'paginas': paginas
+    })
+    return resultado
 
 
 def obtener_consumos_por_pasajero(num_habitacion, archivo_consumos='data/consumos_diarios.csv'):
@@ -72,7 +179,13 @@ def obtener_consumos_por_pasajero(num_habitacion, archivo_consumos='data/consumo
         }
     """
     consumos = obtener_consumos_habitacion(num_habitacion, archivo_consumos)
-    
+    return _agrupar_por_pasajero(consumos)
+
+
+def _agrupar_por_pasajero(consumos):
+    """
+    Agrupa un DataFrame de consumos de una habitación por pasajero.
+    """
     if consumos.empty:
         return {}
     
@@ -119,44 +232,23 @@ def obtener_total_consumos_pasajero(num_habitacion, nombre_pasajero, archivo_con
     Returns:
         Diccionario con totales por categoría y total general del pasajero
     """
-    consumos = obtener_consumos_habitacion(num_habitacion, archivo_consumos)
-    
-    if consumos.empty:
-        return {
-            'Bebidas': 0,
-            'Estadía': 0,
-            'Map': 0,
-            'total': 0
-        }
-    
-    # Filtrar solo consumos de este pasajero
-    consumos_pasajero = consumos[consumos['pasajero'] == nombre_pasajero]
-    
-    if consumos_pasajero.empty:
-        return {
-            'Bebidas': 0,
-            'Estadía': 0,
-            'Map': 0,
-            'total': 0
-        }
-    
-    totales = {
-        'Bebidas': consumos_pasajero[consumos_pasajero['categoria'] == 'Bebidas']['monto'].sum() if 'Bebidas' in consumos_pasajero['categoria'].values else 0,
-        'Estadía': consumos_pasajero[consumos_pasajero['categoria'] == 'Estadía']['monto'].sum() if 'Estadía' in consumos_pasajero['categoria'].values else 0,
-        'Map': consumos_pasajero[consumos_pasajero['categoria'] == 'Map']['monto'].sum() if 'Map' in consumos_pasajero['categoria'].values else 0,
-    }
-    totales['total'] = sum(totales.values())
-    
-    return totales
+    almacen = obtener_almacen_consumos(archivo_consumos)
+    if not almacen.existe():
+        return _totales_por_categoria({})
+    return _totales_por_categoria(almacen.totales_habitacion(num_habitacion, nombre_pasajero))
 
 
 def agregar_consumo(num_habitacion, categoria, monto, pasajero, archivo_consumos='data/consumos_diarios.csv'):
     """
     Agrega un nuevo consumo a una habitación.
+    El consumo pasa por el escritor diferido, que agrupa los consumos que
+    llegan juntos en una sola escritura; retorna cuando ya está en disco.
     
     Returns:
         True si se agregó correctamente, False en caso contrario
     """
+    from core.escritura_diferida import obtener_escritor
+    
     try:
         nuevo_registro = {
             'fecha': datetime.now().strftime('%d/%m/%Y %H:%M'),
@@ -166,12 +258,7 @@ def agregar_consumo(num_habitacion, categoria, monto, pasajero, archivo_consumos
             'monto': float(monto)
         }
         
-        df_nuevo = pd.DataFrame([nuevo_registro])
-        
-        if os.path.exists(archivo_consumos):
-            df_nuevo.to_csv(archivo_consumos, mode='a', header=False, index=False)
-        else:
-            df_nuevo.to_csv(archivo_consumos, mode='w', header=True, index=False)
+        obtener_escritor(archivo_consumos).agregar([nuevo_registro])
         
         return True
     except Exception as e:
@@ -179,33 +266,114 @@ def agregar_consumo(num_habitacion, categoria, monto, pasajero, archivo_consumos
         return False
 
 
-def eliminar_consumo_por_indice(num_habitacion, indice, archivo_consumos='data/consumos_diarios.csv'):
+def agregar_consumos_lote(filas, habitaciones_ocupadas, archivo_pasajeros='data/pasajeros.csv',
+                          archivo_consumos='data/consumos_diarios.csv'):
     """
-    Elimina un consumo específico de una habitación por su índice.
+    Valida y registra un lote de consumos (por ejemplo, el cierre de tickets
+    del bar). Todas las filas se validan contra la misma foto de pasajeros y
+    las aceptadas se agregan con una sola escritura sincronizada a disco.
+    
+    Args:
+        filas: lista de diccionarios con 'habitacion', 'categoria', 'monto' y
+            opcionalmente 'pasajero' (por defecto el titular) y 'fecha'
+            (DD/MM/YYYY o DD/MM/YYYY HH:MM, por defecto ahora)
+        habitaciones_ocupadas (dict): habitaciones ocupadas del snapshot
     
     Returns:
-        True si se eliminó correctamente, False en caso contrario
+        Lista con un resultado por fila: {'fila', 'aceptado', ...} con los
+        datos registrados o la lista de 'errores'
     """
-    try:
-        if not os.path.exists(archivo_consumos):
-            return False
+    from core.dashboard import obtener_pasajeros_por_habitacion
+    
+    habitaciones = set()
+    for fila in filas:
+        try:
+            habitaciones.add(int(fila.get('habitacion')))
+        except (TypeError, ValueError):
+            pass
+    pasajeros = obtener_pasajeros_por_habitacion(
+        [num_hab for num_hab in habitaciones if num_hab in habitaciones_ocupadas], archivo_pasajeros
+    )
+    
+    ahora = datetime.now().strftime('%d/%m/%Y %H:%M')
+    resultados = []
+    registros = []
+    
+    for numero, fila in enumerate(filas, start=1):
+        errores = []
         
-        df = pd.read_csv(archivo_consumos)
-        consumos_hab = df[df['habitacion'] == num_habitacion]
+        try:
+            num_hab = int(fila.get('habitacion'))
+        except (TypeError, ValueError):
+            num_hab = None
+            errores.append('habitación inválida')
+        if num_hab is not None and num_hab not in habitaciones_ocupadas:
+            errores.append(f'la habitación {num_hab} no está ocupada')
         
-        if indice >= len(consumos_hab):
-            return False
+        categoria = str(fila.get('categoria') or '').strip()
+        if categoria not in CATEGORIAS:
+            errores.append(f'categoría inválida: {categoria!r}')
         
-        # Obtener el índice global del consumo a eliminar
-        indice_global = consumos_hab.index[indice]
+        try:
+            monto = float(fila.get('monto'))
+            if not monto > 0:
+                errores.append('el monto debe ser mayor a cero')
+        except (TypeError, ValueError):
+            errores.append('monto inválido')
         
-        # Eliminar la fila
-        df = df.drop(indice_global)
+        fecha = str(fila.get('fecha') or '').strip() or ahora
+        for formato in ('%d/%m/%Y %H:%M', '%d/%m/%Y'):
+            try:
+                datetime.strptime(fecha, formato)
+                break
+            except ValueError:
+                pass
+        else:
+            errores.append(f'fecha inválida: {fecha!r}')
         
-        # Guardar el archivo
-        df.to_csv(archivo_consumos, index=False)
+        pasajero = str(fila.get('pasajero') or '').strip()
+        if not errores:
+            # Se acepta el titular (puede ser de otra habitación del voucher) o un alojado
+            titular = habitaciones_ocupadas[num_hab]['pasajero']
+            nombres = [titular] + [p['nombre'] for p in pasajeros.get(num_hab, [])]
+            if not pasajero:
+                pasajero = titular
+            elif pasajero not in nombres:
+                errores.append(f'{pasajero} no está alojado en la habitación {num_hab}')
         
-        return True
+        if errores:
+            resultados.append({'fila': numero, 'aceptado': False, 'errores': errores})
+            continue
+        
+        registro = {
+            'fecha': fecha,
+            'habitacion': num_hab,
+            'pasajero': pasajero,
+            'categoria': categoria,
+            'monto': monto
+        }
+        registros.append(registro)
+        resultados.append({'fila': numero, 'aceptado': True, **registro})
+    
+    if registros:
+        obtener_almacen_consumos(archivo_consumos).agregar(registros, sincronizar=True)
+    
+    return resultados
+
+
+def eliminar_consumo_por_indice(num_habitacion, indice, archivo_consumos='data/consumos_diarios.csv'):
+    """
+    Elimina un consumo específico de una habitación por su índice.
+    
+    Returns:
+        True si se eliminó correctamente, False en caso contrario
+    """
+    try:
+        if not obtener_almacen_consumos(archivo_consumos).existe():
+            return False
+        
+        # Dar de baja el consumo (no se reescribe el archivo)
+        return obtener_almacen_consumos(archivo_consumos).eliminar_de_habitacion(num_habitacion, indice)
     except Exception as e:
         print(f"Error al eliminar consumo: {e}")
         return False
@@ -226,6 +394,7 @@ def obtener_resumen_habitacion(num_habitacion, datos_pasajero, archivo_consumos=
     """
     from core.dashboard import obtener_todos_pasajeros_habitacion
     
+    # Una sola búsqueda en el índice de consumos para toda la ficha
     consumos = obtener_consumos_habitacion(num_habitacion, archivo_consumos)
     totales = obtener_total_consumos(num_habitacion, archivo_consumos)
     
@@ -233,7 +402,7 @@ def obtener_resumen_habitacion(num_habitacion, datos_pasajero, archivo_consumos=
     todos_pasajeros = obtener_todos_pasajeros_habitacion(num_habitacion)
     
     # Obtener consumos agrupados por pasajero
-    consumos_por_pasajero = obtener_consumos_por_pasajero(num_habitacion, archivo_consumos)
+    consumos_por_pasajero = _agrupar_por_pasajero(consumos)
     
     # Convertir consumos a lista de diccionarios para el template
     lista_consumos = []
@@ -262,3 +431,32 @@ def obtener_resumen_habitacion(num_habitacion, datos_pasajero, archivo_consumos=
         'tiene_vouchers_separados': tiene_vouchers_separados,
         'cantidad_pasajeros': len(todos_pasajeros)
     }
+
+
+def construir_folios(habitaciones, archivo_pasajeros='data/pasajeros.csv', archivo_consumos='data/consumos_diarios.csv'):
+    """
+    Arma los folios de salida de varias habitaciones a la vez: totales por
+    categoría (de la tabla de totales) y lista de pasajeros, con una sola
+    pasada sobre el archivo de pasajeros.
+    
+    Args:
+        habitaciones: colección de números de habitación
+        archivo_pasajeros (str): Ruta al archivo CSV de pasajeros
+        archivo_consumos (str): Ruta al archivo CSV de consumos
+    
+    Returns:
+        Diccionario {num_habitacion: {'numero', 'totales', 'todos_pasajeros'}}
+    """
+    from core.dashboard import obtener_pasajeros_por_habitacion
+    
+    totales = obtener_totales_por_habitacion(habitaciones, archivo_consumos)
+    pasajeros = obtener_pasajeros_por_habitacion(habitaciones, archivo_pasajeros)
+    
+    return {
+        num_hab: {
+            'numero': num_hab,
+            'totales': totales[num_hab],
+            'todos_pasajeros': pasajeros[num_hab]
+        }
+        for num_hab in totales
+    }
@@ -3,9 +3,15 @@ Módulo para gestionar el dashboard de habitaciones del hotel.
 Calcula estados y colores según ocupación y consumos.
 """
 
-import pandas as pd
-import os
+from dataclasses import dataclass
 from datetime import datetime
+from types import MappingProxyType
+from typing import Mapping
+
+from core.almacen import obtener_almacen_pasajeros, obtener_almacen_consumos, parsear_fecha, tipar_pasajeros
+from core.perezoso import importar_perezoso
+
+pd = importar_perezoso('pandas')
 
 # Estructura del hotel
 PISOS = {
@@ -37,6 +43,165 @@ def obtener_titular_por_edad(pasajeros_lista):
         return pasajeros_lista[0]
 
 
+def clasificar_pasajeros(df):
+    """
+    Clasifica a todos los pasajeros según sus fechas, de forma vectorizada.
+    Recibe las columnas tipadas (PasajerosStore.obtener_tipado() o una
+    selección de sus filas); si recibe los textos del CSV los tipa antes.
+    
+    Regla histórica: si la fecha de ingreso no se puede interpretar,
+    el pasajero se considera alojado (en casa).
+    
+    Returns:
+        tuple de máscaras booleanas alineadas con df:
+            (en_casa, futuros, salen_hoy)
+    """
+    if not pd.api.types.is_datetime64_any_dtype(df['Fecha de ingreso']):
+        df = tipar_pasajeros(df)
+    
+    hoy = pd.Timestamp(datetime.now().date())
+    ingreso = df['Fecha de ingreso']
+    egreso = df['Fecha de egreso']
+    
+    en_casa = ingreso.isna() | (ingreso <= hoy)
+    futuros = ingreso > hoy
+    salen_hoy = en_casa & (egreso == hoy)
+    
+    return en_casa, futuros, salen_hoy
+
+
+def _analizar_pasajeros(df, tipos=None):
+    """
+    Separa los pasajeros que ya ingresaron (ocupación actual) de las
+    reservas con ingreso futuro, usando las máscaras de clasificar_pasajeros.
+    
+    Args:
+        df: DataFrame de pasajeros
+        tipos: columnas tipadas de df (si no se pasan se tipan acá)
+    
+    Returns:
+        tuple: (DataFrame de pasajeros activos, dict de reservas futuras por habitación)
+    """
+    if df.empty:
+        return df, {}
+    
+    en_casa, futuros, _ = clasificar_pasajeros(tipos if tipos is not None else df)
+    
+    # Si hay varias reservas futuras en la misma habitación, queda la última del archivo
+    habitaciones_futuras = {}
+    for reserva in df[futuros].to_dict('records'):
+        try:
+            habitaciones_futuras[int(reserva['Nro. habitación'])] = {
+                'pasajero': reserva['Apellido y nombre'],
+                'plazas': int(reserva['Plazas ocupadas']),
+                'ingreso': reserva['Fecha de ingreso'],
+                'egreso': reserva['Fecha de egreso'],
+                'servicios': reserva['Servicios']
+            }
+        except:
+            pass
+    
+    return df[en_casa], habitaciones_futuras
+
+
+def _titular_por_grupo(datos, clave):
+    """
+    Fila del titular (mayor edad) de cada grupo de `clave`.
+    Igual que obtener_titular_por_edad: ante empate gana el primero del archivo
+    y si alguna edad del grupo no es válida se toma el primer pasajero.
+    """
+    grupos = datos.groupby(clave, sort=False)
+    mayor = grupos['edad'].idxmax()
+    primero = grupos['fila'].first()
+    return mayor.where(~grupos['edad_invalida'].any(), primero)
+
+
+def resolver_titulares(df_activos, tipos=None):
+    """
+    Determina la fila del titular de cada habitación ocupada usando groupby.
+    
+    Para cada habitación el titular es el pasajero de mayor edad. Si el voucher
+    de la habitación (el de su primer pasajero) abarca varias habitaciones
+    (familia), el titular es el mayor del grupo familiar completo.
+    
+    Args:
+        df_activos: DataFrame con los pasajeros que ya ingresaron
+        tipos: columnas tipadas de df_activos (si no se pasan se tipan acá)
+    
+    Returns:
+        DataFrame indexado por número de habitación (en el orden en que
+        aparecen) con las columnas 'titular' (etiqueta de fila del titular)
+        y 'voucher' (voucher de la habitación).
+    """
+    if df_activos.empty:
+        return pd.DataFrame(columns=['titular', 'voucher'])
+    
+    if tipos is None:
+        tipos = tipar_pasajeros(df_activos)
+    
+    if 'Edad' in tipos.columns:
+        edad = tipos['Edad']
+    else:
+        edad = pd.Series(0, index=df_activos.index, dtype='Int64')
+    
+    if 'Voucher' in tipos.columns:
+        voucher = tipos['Voucher'].astype(str)
+    else:
+        voucher = pd.Series('', index=df_activos.index)
+    
+    datos = pd.DataFrame({
+        'habitacion': tipos['Nro. habitación'],
+        'voucher': voucher,
+        'edad': edad.fillna(0),
+        'edad_invalida': edad.isna(),
+        'fila': df_activos.index
+    }, index=df_activos.index)
+    
+    titular_habitacion = _titular_por_grupo(datos, 'habitacion')
+    
+    con_voucher = datos[datos['voucher'] != '']
+    titular_voucher = _titular_por_grupo(con_voucher, 'voucher')
+    habitaciones_por_voucher = con_voucher.groupby('voucher')['habitacion'].nunique()
+    
+    # El voucher de cada habitación es el de su primer pasajero
+    voucher_habitacion = datos.groupby('habitacion', sort=False)['voucher'].first()
+    es_familia = voucher_habitacion.map(habitaciones_por_voucher).fillna(0) > 1
+    
+    return pd.DataFrame({
+        'titular': titular_habitacion.where(~es_familia, voucher_habitacion.map(titular_voucher)),
+        'voucher': voucher_habitacion
+    })
+
+
+def _edad(valor):
+    try:
+        return int(valor)
+    except (TypeError, ValueError):
+        return 0
+
+
+def _resolver_titulares(df_activos, tipos=None):
+    """
+    Arma el diccionario de habitaciones ocupadas con los datos del titular.
+    """
+    titulares = resolver_titulares(df_activos, tipos.loc[df_activos.index] if tipos is not None else None)
+    filas = df_activos.loc[titulares['titular'].values].to_dict('records')
+    
+    habitaciones_ocupadas = {}
+    for num_hab, voucher, titular in zip(titulares.index, titulares['voucher'], filas):
+        habitaciones_ocupadas[int(num_hab)] = {
+            'pasajero': titular['Apellido y nombre'],
+            'plazas': int(titular['Plazas ocupadas']),
+            'ingreso': titular['Fecha de ingreso'],
+            'egreso': titular['Fecha de egreso'],
+            'servicios': titular['Servicios'],
+            'edad': _edad(titular.get('Edad', 0)),
+            'voucher': voucher
+        }
+    
+    return habitaciones_ocupadas
+
+
 def obtener_habitaciones_ocupadas(archivo_pasajeros='data/pasajeros.csv'):
     """
     Obtiene la lista de habitaciones ocupadas ACTUALMENTE desde el CSV de pasajeros.
@@ -48,83 +213,29 @@ def obtener_habitaciones_ocupadas(archivo_pasajeros='data/pasajeros.csv'):
     
     Retorna un diccionario con número de habitación como key y datos del titular.
     """
-    if not os.path.exists(archivo_pasajeros):
+    if not obtener_almacen_pasajeros(archivo_pasajeros).existe():
         return {}
     
-    df = pd.read_csv(archivo_pasajeros)
-    fecha_hoy = datetime.now().strftime('%d/%m/%Y')
-    
-    # Filtrar pasajeros que ya ingresaron
-    pasajeros_activos = []
-    for _, row in df.iterrows():
-        fecha_ingreso = row['Fecha de ingreso']
-        
-        try:
-            ingreso_dt = datetime.strptime(fecha_ingreso, '%d/%m/%Y')
-            hoy_dt = datetime.strptime(fecha_hoy, '%d/%m/%Y')
-            
-            if ingreso_dt <= hoy_dt:
-                pasajeros_activos.append(row.to_dict())
-        except:
-            # Si hay error en la fecha, incluir por defecto
-            pasajeros_activos.append(row.to_dict())
-    
-    # Agrupar por voucher para identificar grupos familiares
-    vouchers = {}
-    for pasajero in pasajeros_activos:
-        voucher = str(pasajero.get('Voucher', '')).strip()
-        if voucher:
-            if voucher not in vouchers:
-                vouchers[voucher] = []
-            vouchers[voucher].append(pasajero)
-    
-    # Para cada grupo de voucher, seleccionar el titular (mayor edad)
-    titulares_por_voucher = {}
-    for voucher, grupo in vouchers.items():
-        titular = obtener_titular_por_edad(grupo)
-        if titular:
-            titulares_por_voucher[voucher] = titular
-    
-    # Ahora agrupar por habitación
-    # Si hay varias personas en una habitación, usar el mayor de esa habitación
-    # PERO si comparten voucher con otras habitaciones, usar el titular del voucher completo
-    habitaciones_ocupadas = {}
-    habitaciones_con_pasajeros = {}
-    
-    # Primero agrupar todos los pasajeros por habitación
-    for pasajero in pasajeros_activos:
-        num_hab = int(pasajero['Nro. habitación'])
-        if num_hab not in habitaciones_con_pasajeros:
-            habitaciones_con_pasajeros[num_hab] = []
-        habitaciones_con_pasajeros[num_hab].append(pasajero)
-    
-    # Para cada habitación, determinar quién es el titular
-    for num_hab, pasajeros_hab in habitaciones_con_pasajeros.items():
-        # Obtener voucher de esta habitación
-        voucher = str(pasajeros_hab[0].get('Voucher', '')).strip()
-        
-        # Si el voucher tiene múltiples habitaciones, usar el titular del voucher
-        habitaciones_del_voucher = [p['Nro. habitación'] for p in vouchers.get(voucher, [])]
-        
-        if voucher and len(set(habitaciones_del_voucher)) > 1:
-            # Familia con múltiples habitaciones: usar titular del voucher completo
-            titular = titulares_por_voucher.get(voucher)
-        else:
-            # Habitación individual o sin voucher: usar el mayor de esta habitación
-            titular = obtener_titular_por_edad(pasajeros_hab)
-        
-        if titular:
-            habitaciones_ocupadas[num_hab] = {
-                'pasajero': titular['Apellido y nombre'],
-                'plazas': int(titular['Plazas ocupadas']),
-                'ingreso': titular['Fecha de ingreso'],
-                'egreso': titular['Fecha de egreso'],
-                'servicios': titular['Servicios'],
-                'edad': int(titular.get('Edad', 0)),
-                'voucher': voucher
-            }
+    return _ocupacion_del_dia(obtener_almacen_pasajeros(archivo_pasajeros))[0]
+
+
+def _ocupacion_del_dia(almacen):
+    """
+    Habitaciones ocupadas (con su titular) y reservas futuras de hoy.
+    Se calculan una vez por versión del archivo y por día (ver
+    AlmacenCSV.derivado), así que también se guardan en la caché en disco.
     
-    return habitaciones_ocupadas
+    Returns:
+        tuple: (ocupadas, reservadas), copias que se pueden modificar
+    """
+    def calcular(_):
+        df, tipos = almacen.proyeccion_tipada('dashboard')
+        pasajeros_activos, habitaciones_reservadas = _analizar_pasajeros(df, tipos)
+        return _resolver_titulares(pasajeros_activos, tipos), habitaciones_reservadas
+    
+    ocupadas, reservadas = almacen.derivado(('titulares', datetime.now().date()), calcular, proyeccion='dashboard')
+    return ({num_hab: dict(datos) for num_hab, datos in ocupadas.items()},
+            {num_hab: dict(datos) for num_hab, datos in reservadas.items()})
 
 
 def obtener_todos_pasajeros_habitacion(num_habitacion, archivo_pasajeros='data/pasajeros.csv'):
@@ -141,79 +252,69 @@ def obtener_todos_pasajeros_habitacion(num_habitacion, archivo_pasajeros='data/p
         Cada pasajero incluye: nombre, voucher, edad, documento, servicios
         Retorna lista vacía si la habitación no está ocupada.
     """
-    if not os.path.exists(archivo_pasajeros):
+    if not obtener_almacen_pasajeros(archivo_pasajeros).existe():
         return []
     
-    df = pd.read_csv(archivo_pasajeros)
-    fecha_hoy = datetime.now().strftime('%d/%m/%Y')
-    
-    # Filtrar pasajeros de esta habitación que ya ingresaron
-    pasajeros = []
-    for _, row in df.iterrows():
-        # Verificar que sea la habitación correcta
-        if int(row['Nro. habitación']) != num_habitacion:
-            continue
-        
-        # Verificar que ya ingresó
-        fecha_ingreso = row['Fecha de ingreso']
-        try:
-            ingreso_dt = datetime.strptime(fecha_ingreso, '%d/%m/%Y')
-            hoy_dt = datetime.strptime(fecha_hoy, '%d/%m/%Y')
-            
-            if ingreso_dt > hoy_dt:
-                continue  # No ha ingresado aún
-        except:
-            pass  # Si hay error en fecha, incluir
-        
-        # Agregar pasajero a la lista
-        pasajeros.append({
-            'nombre': row['Apellido y nombre'],
-            'voucher': str(row.get('Voucher', '')).strip(),
-            'edad': int(row.get('Edad', 0)),
-            'documento': f"{row.get('Tipo documento', 'DNI')} {row.get('Nro. doc.', '')}",
-            'servicios': row.get('Servicios', ''),
-            'ingreso': row['Fecha de ingreso'],
-            'egreso': row['Fecha de egreso']
-        })
+    return obtener_pasajeros_por_habitacion([num_habitacion], archivo_pasajeros)[int(num_habitacion)]
+
+
+def obtener_pasajeros_por_habitacion(habitaciones, archivo_pasajeros='data/pasajeros.csv'):
+    """
+    Versión por lotes de obtener_todos_pasajeros_habitacion: arma las listas
+    de pasajeros en casa de varias habitaciones con una sola pasada sobre
+    los pasajeros.
+    
+    Returns:
+        Diccionario {num_habitacion: lista de pasajeros} (lista vacía si
+        la habitación no está ocupada)
+    """
+    habitaciones = [int(num_hab) for num_hab in habitaciones]
+    pasajeros = {num_hab: [] for num_hab in habitaciones}
+    
+    almacen = obtener_almacen_pasajeros(archivo_pasajeros)
+    if not almacen.existe() or not habitaciones:
+        return pasajeros
+    
+    df = almacen.proyeccion('folio')
+    if df.empty:
+        return pasajeros
+    
+    # Solo se tipan las filas de las habitaciones pedidas
+    df_habs = df[df['Nro. habitación'].isin(habitaciones)]
+    en_casa, _, _ = clasificar_pasajeros(df_habs)
+    
+    for row in df_habs[en_casa].to_dict('records'):
+        pasajeros[int(row['Nro. habitación'])].append(_datos_pasajero(row))
     
     # Ordenar por edad (mayor edad primero) para que el titular aparezca primero
-    pasajeros.sort(key=lambda p: p['edad'], reverse=True)
+    for lista in pasajeros.values():
+        lista.sort(key=lambda p: p['edad'], reverse=True)
     
     return pasajeros
 
 
+def _datos_pasajero(row):
+    """Datos individuales de un pasajero para fichas y folios"""
+    return {
+        'nombre': row['Apellido y nombre'],
+        'voucher': str(row.get('Voucher', '')).strip(),
+        'edad': int(row.get('Edad', 0)),
+        'documento': f"{row.get('Tipo documento', 'DNI')} {row.get('Nro. doc.', '')}",
+        'servicios': row.get('Servicios', ''),
+        'ingreso': row['Fecha de ingreso'],
+        'egreso': row['Fecha de egreso']
+    }
+
+
 def obtener_habitaciones_reservadas_futuras(archivo_pasajeros='data/pasajeros.csv'):
     """
     Obtiene la lista de habitaciones con reservas para ingresos futuros.
     Retorna un diccionario con número de habitación como key y datos de la reserva.
     """
-    if not os.path.exists(archivo_pasajeros):
+    if not obtener_almacen_pasajeros(archivo_pasajeros).existe():
         return {}
     
-    df = pd.read_csv(archivo_pasajeros)
-    habitaciones_futuras = {}
-    fecha_hoy = datetime.now().strftime('%d/%m/%Y')
-    
-    for _, row in df.iterrows():
-        fecha_ingreso = row['Fecha de ingreso']
-        
-        # Solo incluir si ingresa en el futuro (fecha ingreso > hoy)
-        try:
-            ingreso_dt = datetime.strptime(fecha_ingreso, '%d/%m/%Y')
-            hoy_dt = datetime.strptime(fecha_hoy, '%d/%m/%Y')
-            
-            if ingreso_dt > hoy_dt:
-                habitaciones_futuras[int(row['Nro. habitación'])] = {
-                    'pasajero': row['Apellido y nombre'],
-                    'plazas': int(row['Plazas ocupadas']),
-                    'ingreso': row['Fecha de ingreso'],
-                    'egreso': row['Fecha de egreso'],
-                    'servicios': row['Servicios']
-                }
-        except:
-            pass
-    
-    return habitaciones_futuras
+    return _ocupacion_del_dia(obtener_almacen_pasajeros(archivo_pasajeros))[1]
 
 
 def obtener_habitaciones_con_consumos(archivo_consumos='data/consumos_diarios.csv'):
@@ -221,31 +322,31 @@ def obtener_habitaciones_con_consumos(archivo_consumos='data/consumos_diarios.cs
     Obtiene la lista de habitaciones que tienen consumos registrados.
     Retorna un set con los números de habitación.
     """
-    if not os.path.exists(archivo_consumos):
+    if not obtener_almacen_consumos(archivo_consumos).existe():
         return set()
     
-    df = pd.read_csv(archivo_consumos)
-    return set(df['habitacion'].astype(int).unique())
+    return obtener_almacen_consumos(archivo_consumos).habitaciones()
 
 
 def es_checkout_hoy(fecha_egreso):
     """
     Verifica si la fecha de egreso es hoy.
-    Formato esperado: DD/MM/YYYY
+    Formato esperado: DD/MM/YYYY (se compara la fecha, no el texto)
     """
     try:
-        fecha_hoy = datetime.now().strftime('%d/%m/%Y')
-        return fecha_egreso == fecha_hoy
+        return parsear_fecha(fecha_egreso) == pd.Timestamp(datetime.now().date())
     except:
         return False
 
 
-def obtener_habitaciones_checkout():
+def obtener_habitaciones_checkout(habitaciones_ocupadas=None):
     """
     Obtiene las habitaciones con checkout programado para hoy.
+    Si ya se calcularon las habitaciones ocupadas se pueden pasar para no releerlas.
     Retorna un set con los números de habitación.
     """
-    habitaciones_ocupadas = obtener_habitaciones_ocupadas()
+    if habitaciones_ocupadas is None:
+        habitaciones_ocupadas = obtener_habitaciones_ocupadas()
     checkouts_hoy = set()
     
     for num_hab, datos in habitaciones_ocupadas.items():
@@ -286,22 +387,41 @@ def calcular_estado_habitacion(num_habitacion, habitaciones_ocupadas, habitacion
     return 'vacia'
 
 
-def obtener_datos_dashboard():
+@dataclass(frozen=True)
+class SnapshotHotel:
     """
-    Obtiene todos los datos necesarios para renderizar el dashboard.
+    Foto inmutable del estado del hotel en un momento dado.
+    Se calcula una sola vez y la comparten el dashboard, el checkout masivo
+    y la reserva express dentro de una misma request.
+    """
+    ocupadas: Mapping
+    reservadas: Mapping
+    checkouts_hoy: frozenset
+    con_consumos: frozenset
+    estados: Mapping
+    estadisticas: Mapping
+
+
+def _congelar(habitaciones):
+    """Convierte un dict {habitación: datos} en un mapping de solo lectura"""
+    return MappingProxyType({num_hab: MappingProxyType(datos) for num_hab, datos in habitaciones.items()})
+
+
+def construir_snapshot(archivo_pasajeros='data/pasajeros.csv', archivo_consumos='data/consumos_diarios.csv'):
+    """
+    Calcula en una sola pasada ocupadas, reservas futuras, checkouts de hoy,
+    habitaciones con consumos, estados y estadísticas.
     
-    Retorna un diccionario con:
-        - pisos: estructura de habitaciones por piso
-        - estados: estado de cada habitación
-        - ocupadas: datos de habitaciones ocupadas
-        - reservadas: datos de habitaciones con reserva futura
-        - estadisticas: resumen general
-        - checkouts_hoy: habitaciones con checkout hoy
+    Returns:
+        SnapshotHotel
     """
-    habitaciones_ocupadas = obtener_habitaciones_ocupadas()
-    habitaciones_reservadas = obtener_habitaciones_reservadas_futuras()
-    habitaciones_con_consumos = obtener_habitaciones_con_consumos()
-    checkouts_hoy = obtener_habitaciones_checkout()
+    if obtener_almacen_pasajeros(archivo_pasajeros).existe():
+        habitaciones_ocupadas, habitaciones_reservadas = _ocupacion_del_dia(obtener_almacen_pasajeros(archivo_pasajeros))
+    else:
+        habitaciones_ocupadas, habitaciones_reservadas = {}, {}
+    
+    habitaciones_con_consumos = obtener_habitaciones_con_consumos(archivo_consumos)
+    checkouts_hoy = obtener_habitaciones_checkout(habitaciones_ocupadas)
     
     # Calcular estados de todas las habitaciones
     estados = {}
@@ -339,13 +459,39 @@ def obtener_datos_dashboard():
         'checkouts_hoy': total_checkouts
     }
     
+    return SnapshotHotel(
+        ocupadas=_congelar(habitaciones_ocupadas),
+        reservadas=_congelar(habitaciones_reservadas),
+        checkouts_hoy=frozenset(checkouts_hoy),
+        con_consumos=frozenset(habitaciones_con_consumos),
+        estados=MappingProxyType(estados),
+        estadisticas=MappingProxyType(estadisticas)
+    )
+
+
+def obtener_datos_dashboard(snapshot=None):
+    """
+    Obtiene todos los datos necesarios para renderizar el dashboard.
+    Si se pasa un snapshot ya calculado se reutiliza en lugar de releer los archivos.
+    
+    Retorna un diccionario con:
+        - pisos: estructura de habitaciones por piso
+        - estados: estado de cada habitación
+        - ocupadas: datos de habitaciones ocupadas
+        - reservadas: datos de habitaciones con reserva futura
+        - estadisticas: resumen general
+        - checkouts_hoy: habitaciones con checkout hoy
+    """
+    if snapshot is None:
+        snapshot = construir_snapshot()
+    
     return {
         'pisos': PISOS,
-        'estados': estados,
-        'ocupadas': habitaciones_ocupadas,
-        'reservadas': habitaciones_reservadas,
-        'estadisticas': estadisticas,
-        'checkouts_hoy': checkouts_hoy
+        'estados': snapshot.estados,
+        'ocupadas': snapshot.ocupadas,
+        'reservadas': snapshot.reservadas,
+        'estadisticas': snapshot.estadisticas,
+        'checkouts_hoy': snapshot.checkouts_hoy
     }
 
 
@@ -353,13 +499,7 @@ def obtener_total_consumos_habitacion(num_habitacion, archivo_consumos='data/con
     """
     Calcula el total de consumos de una habitación específica.
     """
-    if not os.path.exists(archivo_consumos):
-        return 0
-    
-    df = pd.read_csv(archivo_consumos)
-    consumos_hab = df[df['habitacion'] == num_habitacion]
-    
-    if consumos_hab.empty:
+    if not obtener_almacen_consumos(archivo_consumos).existe():
         return 0
     
-    return consumos_hab['monto'].sum()
+    return sum(obtener_almacen_consumos(archivo_consumos).totales_habitacion(num_habitacion).values())
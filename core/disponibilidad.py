@@ -0,0 +1,145 @@
+"""
+Motor de disponibilidad por rango de fechas.
+Arma una matriz booleana habitaciones × días con la ocupación de cada noche
+según pasajeros.csv y responde "qué habitaciones están libres N noches desde
+el día D" con sumas por ventana sobre la matriz acumulada: el costo de una
+consulta depende de la cantidad de habitaciones, no del horizonte.
+"""
+
+from datetime import date, timedelta
+
+from core.almacen import DB_PASAJEROS, obtener_almacen_pasajeros
+from core.perezoso import importar_perezoso
+
+np = importar_perezoso('numpy')
+
+# Días hacia adelante (desde hoy) que cubre la matriz
+HORIZONTE_DIAS = 730
+
+
+class MatrizOcupacion:
+    """
+    Ocupación noche por noche de las habitaciones del hotel desde `hoy`.
+
+    Se construye con las columnas tipadas de los pasajeros
+    (PasajerosStore.obtener_tipado()). ocupada[i, d] es True si la habitación
+    habitaciones[i] está ocupada la noche hoy + d. Igual que en el dashboard,
+    quien ya ingresó (o tiene fecha de ingreso inválida) ocupa la habitación
+    al menos esta noche aunque su egreso haya pasado; sin fecha de egreso
+    válida se la considera ocupada hasta el final del horizonte.
+    """
+
+    def __init__(self, tipos, hoy, habitaciones, horizonte=HORIZONTE_DIAS):
+        self.hoy = hoy
+        self.horizonte = horizonte
+        self.habitaciones = np.array(sorted(habitaciones), dtype=np.int64)
+        self.ocupada = np.zeros((len(self.habitaciones), horizonte), dtype=bool)
+
+        if not tipos.empty:
+            self._marcar_estadias(tipos)
+
+        # acumulada[:, d] = noches ocupadas en [0, d); una ventana es una resta
+        self._acumulada = np.zeros((len(self.habitaciones), horizonte + 1), dtype=np.int32)
+        np.cumsum(self.ocupada, axis=1, out=self._acumulada[:, 1:])
+
+    def _marcar_estadias(self, tipos):
+        origen = np.datetime64(self.hoy, 'D')
+        ingreso = tipos['Fecha de ingreso'].to_numpy()
+        egreso = tipos['Fecha de egreso'].to_numpy()
+        habitacion = tipos['Nro. habitación'].to_numpy(dtype=np.float64, na_value=np.nan)
+
+        # Días relativos a hoy; ingreso inválido = ya alojado, egreso inválido = sin fin
+        dias_ingreso = np.where(np.isnat(ingreso), 0,
+                                (ingreso.astype('datetime64[D]') - origen).astype(np.int64))
+        dias_egreso = np.where(np.isnat(egreso), self.horizonte,
+                               (egreso.astype('datetime64[D]') - origen).astype(np.int64))
+        # Quien ya está alojado ocupa al menos esta noche
+        dias_egreso = np.maximum(dias_egreso, np.maximum(dias_ingreso, 0) + 1)
+
+        desde = np.clip(dias_ingreso, 0, self.horizonte)
+        hasta = np.clip(dias_egreso, 0, self.horizonte)
+
+        fila = np.searchsorted(self.habitaciones, np.nan_to_num(habitacion, nan=-1).astype(np.int64))
+        fila = np.minimum(fila, len(self.habitaciones) - 1)
+        del_hotel = (self.habitaciones[fila] == habitacion) & (hasta > desde)
+
+        # Cada estadía suma +1 al ingreso y -1 al egreso; el acumulado da las noches ocupadas
+        marcas = np.zeros((len(self.habitaciones), self.horizonte + 1), dtype=np.int32)
+        np.add.at(marcas, (fila[del_hotel], desde[del_hotel]), 1)
+        np.add.at(marcas, (fila[del_hotel], hasta[del_hotel]), -1)
+        self.ocupada = np.cumsum(marcas, axis=1)[:, :-1] > 0
+
+    def noches_ocupadas(self, desde, noches):
+        """
+        Noches ocupadas de cada habitación en [desde, desde + noches).
+
+        Returns:
+            np.ndarray alineado con self.habitaciones
+
+        Raises:
+            ValueError si el rango empieza antes de hoy o excede el horizonte
+        """
+        inicio = (desde - self.hoy).days
+        fin = inicio + noches
+        if noches < 1:
+            raise ValueError("La cantidad de noches debe ser al menos 1")
+        if inicio < 0:
+            raise ValueError("La fecha de ingreso no puede ser anterior a hoy")
+        if fin > self.horizonte:
+            raise ValueError(f"El rango excede el horizonte de {self.horizonte} días")
+        return self._acumulada[:, fin] - self._acumulada[:, inicio]
+
+    def libres(self, desde, noches):
+        """Habitaciones sin ninguna noche ocupada en [desde, desde + noches)"""
+        return self.habitaciones[self.noches_ocupadas(desde, noches) == 0].tolist()
+
+
+def _todas_las_habitaciones():
+    from core.dashboard import PISOS
+    return [hab for habitaciones in PISOS.values() for hab in habitaciones]
+
+
+def obtener_matriz(archivo_pasajeros=DB_PASAJEROS):
+    """
+    Matriz de ocupación del archivo de pasajeros, construida una vez por
+    versión del archivo y por día a partir de la proyección 'disponibilidad'
+    (solo habitación y fechas).
+    """
+    hoy = date.today()
+    habitaciones = _todas_las_habitaciones()
+    almacen = obtener_almacen_pasajeros(archivo_pasajeros)
+    return almacen.derivado(
+        ('ocupacion', hoy),
+        lambda df: MatrizOcupacion(almacen.obtener_tipado('disponibilidad'), hoy, habitaciones),
+        proyeccion='disponibilidad')
+
+
+def buscar_disponibles(desde, noches=1, archivo_pasajeros=DB_PASAJEROS):
+    """
+    Busca las habitaciones libres durante `noches` noches desde `desde`.
+
+    Args:
+        desde (date): Fecha de ingreso
+        noches (int): Cantidad de noches
+        archivo_pasajeros (str): Ruta al archivo CSV de pasajeros
+
+    Returns:
+        Diccionario con 'desde', 'hasta' (fecha de egreso), 'noches',
+        'disponibles' (lista ordenada) y 'por_piso'
+
+    Raises:
+        ValueError si el rango no es válido
+    """
+    from core.dashboard import PISOS
+
+    libres = obtener_matriz(archivo_pasajeros).libres(desde, noches)
+    conjunto = set(libres)
+    return {
+        'desde': desde.isoformat(),
+        'hasta': (desde + timedelta(days=noches)).isoformat(),
+        'noches': noches,
+        'disponibles': libres,
+        'cantidad': len(libres),
+        'por_piso': {piso: [hab for hab in habitaciones if hab in conjunto]
+                     for piso, habitaciones in PISOS.items()}
+    }
@@ -0,0 +1,136 @@
+"""
+Escritura diferida (write-behind) de consumos.
+Los consumos se encolan y un único hilo escritor los agrega al almacén en
+grupos, con una sola escritura y un solo fsync por grupo. Así las ráfagas
+(desayuno, cierre del bar) no abren el archivo una vez por consumo ni
+compiten entre requests por el mismo archivo.
+"""
+
+import atexit
+import queue
+import threading
+import time
+
+from core.almacen import obtener_almacen_consumos
+from core.metricas import atribuir_a, request_actual
+
+# Máximo de consumos por grupo y espera máxima para completar un grupo
+MAX_LOTE = 200
+INTERVALO_MS = 2
+
+# Consumos pendientes como máximo; si la cola está llena, agregar() espera
+CAPACIDAD_COLA = 5000
+ESPERA_COLA_SEGUNDOS = 5
+
+
+class _Pendiente:
+    """Consumos encolados por una misma llamada y su confirmación"""
+
+    def __init__(self, registros, durable):
+        self.registros = registros
+        self.durable = durable
+        self.listo = threading.Event()
+        self.error = None
+        # Request que encoló los consumos: la escritura del grupo cuenta en sus métricas
+        self.request = request_actual()
+
+
+class EscritorConsumos:
+    """
+    Hilo escritor con cola acotada para un almacén de consumos.
+
+    En modo durable (por defecto) agregar() retorna recién cuando el grupo
+    que contiene los consumos quedó escrito y sincronizado en disco. En modo
+    no durable retorna apenas los consumos entran en la cola.
+    """
+
+    def __init__(self, almacen, max_lote=MAX_LOTE, intervalo_ms=INTERVALO_MS, capacidad=CAPACIDAD_COLA):
+        self.almacen = almacen
+        self.max_lote = max_lote
+        self.intervalo = intervalo_ms / 1000
+        self._cola = queue.Queue(maxsize=capacidad)
+        self._hilo = threading.Thread(target=self._escribir, name='escritor-consumos', daemon=True)
+        self._hilo.start()
+
+    def agregar(self, registros, durable=True):
+        """
+        Encola consumos para escribirlos en el próximo grupo.
+
+        Args:
+            registros: lista de diccionarios con las columnas de COLUMNAS_CONSUMOS
+            durable (bool): esperar a que el grupo esté sincronizado en disco
+
+        Raises:
+            ValueError si algún consumo tiene habitación o monto inválidos,
+            queue.Full si la cola sigue llena después de ESPERA_COLA_SEGUNDOS,
+            o el error de escritura del grupo en modo durable
+        """
+        # Los tipos se validan acá: un consumo inválido no debe hacer fallar
+        # al grupo completo, que incluye consumos de otras requests
+        registros = [dict(registro, habitacion=int(registro['habitacion']), monto=float(registro['monto']))
+                     for registro in registros]
+        pendiente = _Pendiente(registros, durable)
+        self._cola.put(pendiente, timeout=ESPERA_COLA_SEGUNDOS)
+        if durable:
+            pendiente.listo.wait()
+            if pendiente.error is not None:
+                raise pendiente.error
+
+    def vaciar(self):
+        """Espera a que se escriban todos los consumos encolados hasta ahora"""
+        self.agregar([], durable=True)
+
+    def _siguiente_grupo(self):
+        grupo = [self._cola.get()]
+        cantidad = len(grupo[0].registros)
+        limite = time.monotonic() + self.intervalo
+
+        while cantidad < self.max_lote:
+            restante = limite - time.monotonic()
+            try:
+                pendiente = self._cola.get(timeout=restante) if restante > 0 else self._cola.get_nowait()
+            except queue.Empty:
+                break
+            grupo.append(pendiente)
+            cantidad += len(pendiente.registros)
+
+        return grupo
+
+    def _escribir(self):
+        while True:
+            grupo = self._siguiente_grupo()
+            registros = [registro for pendiente in grupo for registro in pendiente.registros]
+            error = None
+
+            if registros:
+                try:
+                    with atribuir_a(p.request for p in grupo):
+                        self.almacen.agregar(registros, sincronizar=any(p.durable for p in grupo))
+                except Exception as e:
+                    error = e
+                    print(f"Error al escribir grupo de {len(registros)} consumos: {e}")
+
+            for pendiente in grupo:
+                pendiente.error = error
+                pendiente.listo.set()
+
+
+_escritores = {}
+_lock_escritores = threading.Lock()
+
+
+def obtener_escritor(archivo_consumos='data/consumos_diarios.csv'):
+    """
+    Retorna el escritor diferido compartido del almacén de consumos indicado.
+    """
+    almacen = obtener_almacen_consumos(archivo_consumos)
+    with _lock_escritores:
+        if almacen not in _escritores:
+            _escritores[almacen] = EscritorConsumos(almacen)
+        return _escritores[almacen]
+
+
+@atexit.register
+def _vaciar_al_salir():
+    for escritor in list(_escritores.values()):
+        escritor.vaciar()
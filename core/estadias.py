@@ -0,0 +1,140 @@
+"""
+Índice de estadías por habitación.
+Cada habitación guarda sus estadías [ingreso, egreso) ordenadas por fecha de
+ingreso, para responder por búsqueda binaria cuándo es la próxima llegada,
+cuántas noches se pueden vender y si un rango de fechas choca con una estadía.
+"""
+
+from datetime import date, timedelta
+
+from core.perezoso import importar_perezoso
+
+np = importar_perezoso('numpy')
+
+# Egreso de las estadías sin fecha de egreso válida: sin fin conocido
+# (el máximo de int64; literal para no importar numpy al importar el módulo)
+_SIN_EGRESO = 2 ** 63 - 1
+
+_EPOCA = date(1970, 1, 1)
+
+
+def _a_dias(fecha):
+    """Fecha → días desde 1970-01-01 (la misma escala que datetime64[D])"""
+    return (fecha - _EPOCA).days
+
+
+def _a_fecha(dias):
+    return _EPOCA + timedelta(days=int(dias))
+
+
+class IndiceEstadias:
+    """
+    Estadías de pasajeros.csv agrupadas por habitación.
+
+    Por habitación se guardan tres arreglos alineados: ingresos ordenados,
+    egresos y el máximo acumulado de los egresos. El máximo acumulado es
+    creciente, por lo que también se puede buscar con searchsorted.
+
+    Se construye con las columnas tipadas de los pasajeros
+    (PasajerosStore.obtener_tipado()). Las filas con fecha de ingreso
+    inválida se ignoran (esas habitaciones ya figuran ocupadas en el dashboard).
+    """
+
+    def __init__(self, tipos):
+        self._estadias = {}
+        if tipos.empty:
+            return
+
+        ingreso, egreso = tipos['Fecha de ingreso'], tipos['Fecha de egreso']
+        habitacion = tipos['Nro. habitación']
+
+        validas = (ingreso.notna() & habitacion.notna()).to_numpy()
+        habitaciones = habitacion[validas].to_numpy(dtype=np.int64)
+        ingresos = ingreso.to_numpy()[validas].astype('datetime64[D]').astype(np.int64)
+        egresos = egreso.to_numpy()[validas].astype('datetime64[D]')
+        egresos = np.where(np.isnat(egresos), _SIN_EGRESO, egresos.astype(np.int64))
+        # Una estadía ocupa al menos la noche de ingreso
+        egresos = np.maximum(egresos, ingresos + 1)
+
+        orden = np.lexsort((ingresos, habitaciones))
+        habitaciones, ingresos, egresos = habitaciones[orden], ingresos[orden], egresos[orden]
+        cortes = np.flatnonzero(np.diff(habitaciones)) + 1
+        for inicio, fin in zip(np.r_[0, cortes], np.r_[cortes, len(habitaciones)]):
+            self._estadias[int(habitaciones[inicio])] = (
+                ingresos[inicio:fin], egresos[inicio:fin], np.maximum.accumulate(egresos[inicio:fin])
+            )
+
+    def _de_habitacion(self, habitacion):
+        return self._estadias.get(int(habitacion))
+
+    def primer_ingreso(self, habitacion):
+        """
+        Fecha de ingreso más temprana de la habitación.
+
+        Returns:
+            date o None si la habitación no tiene estadías
+        """
+        estadias = self._de_habitacion(habitacion)
+        return _a_fecha(estadias[0][0]) if estadias is not None else None
+
+    def proxima_llegada(self, habitacion, desde):
+        """
+        Fecha de ingreso de la primera estadía que empieza después de `desde`.
+
+        Returns:
+            date o None si no hay llegadas posteriores
+        """
+        estadias = self._de_habitacion(habitacion)
+        if estadias is None:
+            return None
+        ingresos = estadias[0]
+        i = np.searchsorted(ingresos, _a_dias(desde), side='right')
+        return _a_fecha(ingresos[i]) if i < len(ingresos) else None
+
+    def noches_maximas(self, habitacion, desde):
+        """
+        Noches que se pueden vender desde `desde` hasta la próxima llegada.
+
+        Returns:
+            int o None si no hay llegadas posteriores (sin límite)
+        """
+        llegada = self.proxima_llegada(habitacion, desde)
+        return (llegada - desde).days if llegada is not None else None
+
+    def conflictos(self, habitacion, inicio, fin):
+        """
+        Estadías de la habitación que se superponen con [inicio, fin).
+
+        Returns:
+            lista de tuplas (ingreso, egreso) ordenadas por ingreso; egreso es
+            None si la estadía no tiene fecha de egreso válida
+        """
+        estadias = self._de_habitacion(habitacion)
+        if estadias is None:
+            return []
+        ingresos, egresos, max_egresos = estadias
+        inicio, fin = _a_dias(inicio), _a_dias(fin)
+
+        # Candidatas: las que ingresan antes del fin. La primera que termina
+        # después del inicio es donde el máximo acumulado supera al inicio.
+        hasta = np.searchsorted(ingresos, fin, side='left')
+        desde = np.searchsorted(max_egresos[:hasta], inicio, side='right')
+        return [(_a_fecha(ingresos[i]), None if egresos[i] == _SIN_EGRESO else _a_fecha(egresos[i]))
+                for i in range(desde, hasta) if egresos[i] > inicio]
+
+    def primer_conflicto(self, habitacion, inicio, fin):
+        """
+        Primera estadía (por fecha de ingreso) que se superpone con [inicio, fin).
+
+        Returns:
+            tupla (ingreso, egreso) o None si el rango está libre
+        """
+        estadias = self._de_habitacion(habitacion)
+        if estadias is None:
+            return None
+        ingresos, egresos, max_egresos = estadias
+        hasta = np.searchsorted(ingresos, _a_dias(fin), side='left')
+        i = np.searchsorted(max_egresos[:hasta], _a_dias(inicio), side='right')
+        if i >= hasta:
+            return None
+        return (_a_fecha(ingresos[i]), None if egresos[i] == _SIN_EGRESO else _a_fecha(egresos[i]))
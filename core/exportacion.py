@@ -0,0 +1,101 @@
+"""
+Módulo de exportaciones descargables (Excel y CSV).
+Los archivos se generan en memoria y se envían directamente al navegador,
+sin pasar por archivos temporales en disco.
+"""
+
+import io
+
+COLUMNAS_PASE_DE_CAJA = ['HAB', 'Estadía', 'Map', 'Bebidas', 'Forma de pago', 'Total']
+
+# Filas que ocupa el formato salidas.xlsx aunque haya pocas habitaciones
+FILAS_MINIMAS_PASE_DE_CAJA = 30
+
+TIPO_XLSX = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+TIPO_CSV = 'text/csv'
+
+
+def _monto_o_vacio(valor):
+    """Los montos en cero se dejan en blanco en la planilla"""
+    return valor if valor > 0 else None
+
+
+def filas_pase_de_caja(habitaciones, fecha, detalle, total_relleno=None):
+    """
+    Genera las filas del formato "Pase de caja" (replica salidas.xlsx).
+
+    Args:
+        habitaciones: iterable de diccionarios con las claves 'habitacion',
+            'Estadía', 'Map', 'Bebidas' y 'Total', en el orden a imprimir
+        fecha (str): Fecha ya formateada para el encabezado
+        detalle (str): Título de la tabla de habitaciones
+        total_relleno: Valor de la columna Total en las filas vacías
+
+    Yields:
+        Listas de 6 valores, una por fila de la hoja
+    """
+    yield ['Pase de caja e información a turno mañana', None, None, None, None, None]
+    yield [None, None, None, None, None, None]
+    yield [None, None, 'Turno:   00 A 08 HS', None, None, None]
+    yield [None, None, None, None, f'Fecha: {fecha}', None]
+    yield [detalle, None, None, None, None, None]
+    yield list(COLUMNAS_PASE_DE_CAJA)
+    yield [None, None, None, None, None, None]
+
+    filas = 7
+    for item in habitaciones:
+        yield [
+            int(item['habitacion']),           # HAB
+            _monto_o_vacio(item['Estadía']),   # Estadía
+            _monto_o_vacio(item['Map']),       # Map
+            _monto_o_vacio(item['Bebidas']),   # Bebidas
+            None,                              # Forma de pago
+            item['Total']                      # Total
+        ]
+        filas += 1
+
+    # Rellenar filas vacías hasta completar el formato
+    for _ in range(filas, FILAS_MINIMAS_PASE_DE_CAJA):
+        yield [None, None, None, None, None, total_relleno]
+
+
+def generar_xlsx(filas, nombre_hoja='Sheet1'):
+    """
+    Escribe las filas en un libro de Excel en modo de solo escritura
+    (las filas se vuelcan a medida que se generan).
+
+    Returns:
+        io.BytesIO posicionado al inicio, listo para send_file
+    """
+    # openpyxl se importa recién al generar la primera planilla
+    from openpyxl import Workbook
+
+    libro = Workbook(write_only=True)
+    hoja = libro.create_sheet(nombre_hoja)
+    for fila in filas:
+        hoja.append(fila)
+
+    buffer = io.BytesIO()
+    libro.save(buffer)
+    buffer.seek(0)
+    return buffer
+
+
+def generar_pase_de_caja(habitaciones, fecha, detalle, total_relleno=None):
+    """
+    Genera el Excel "Pase de caja" para cualquier cantidad de habitaciones.
+
+    Returns:
+        io.BytesIO con el archivo .xlsx
+    """
+    return generar_xlsx(filas_pase_de_caja(habitaciones, fecha, detalle, total_relleno))
+
+
+def generar_csv(df, **opciones):
+    """
+    Escribe un DataFrame como CSV en memoria.
+
+    Returns:
+        io.BytesIO con el CSV codificado en UTF-8
+    """
+    return io.BytesIO(df.to_csv(**opciones).encode('utf-8'))
@@ -0,0 +1,274 @@
+"""
+Métricas de rendimiento de la app.
+Cuenta lecturas y escrituras de los archivos de datos (cantidad, bytes,
+filas y tiempo), la latencia de cada ruta en un histograma y el tiempo que
+cada request pasa leyendo/escribiendo archivos, renderizando plantillas y en
+el resto del código (pandas). Se exponen en formato de texto de Prometheus
+en /metrics y, por request, en el pie de depuración del dashboard.
+
+Los almacenes (core/almacen.py) llaman a registrar_lectura/registrar_escritura;
+instalar(app) agrega los hooks de Flask. Sin app instalada (scripts) solo se
+acumulan los totales del proceso.
+"""
+
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+# Límites superiores de los baldes del histograma de latencia, en segundos
+BALDES_SEGUNDOS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Requests recientes que se muestran en el pie del dashboard
+CANTIDAD_RECIENTES = 15
+
+# Ruta para las requests que no coinciden con ninguna regla (404):
+# no se usa la URL para no crear una serie por cada dirección inventada
+SIN_RUTA = 'sin_ruta'
+
+
+class _Request:
+    """Costos acumulados de la request en curso"""
+
+    def __init__(self, metodo, ruta):
+        self.metodo = metodo
+        self.ruta = ruta
+        self.inicio = time.perf_counter()
+        self.lecturas = 0
+        self.escrituras = 0
+        self.bytes_leidos = 0
+        self.bytes_escritos = 0
+        self.filas = 0
+        self.segundos_archivos = 0.0
+        self.segundos_plantillas = 0.0
+        self._inicio_plantilla = None
+
+    def resumen(self, estado=None):
+        total = time.perf_counter() - self.inicio
+        return {
+            'metodo': self.metodo,
+            'ruta': self.ruta,
+            'estado': estado,
+            'ms': round(total * 1000, 1),
+            'ms_archivos': round(self.segundos_archivos * 1000, 1),
+            'ms_plantillas': round(self.segundos_plantillas * 1000, 1),
+            'ms_resto': round(max(total - self.segundos_archivos - self.segundos_plantillas, 0) * 1000, 1),
+            'lecturas': self.lecturas,
+            'escrituras': self.escrituras,
+            'bytes_leidos': self.bytes_leidos,
+            'bytes_escritos': self.bytes_escritos,
+            'filas': self.filas,
+        }
+
+
+_request_actual = ContextVar('request_actual', default=None)
+# Requests a las que se atribuyen las escrituras hechas desde otro hilo (ver atribuir_a)
+_requests_atribuidas = ContextVar('requests_atribuidas', default=())
+
+
+def _requests_medidas():
+    actual = _request_actual.get()
+    atribuidas = _requests_atribuidas.get()
+    return atribuidas + (actual,) if actual is not None else atribuidas
+
+
+class _Histograma:
+    def __init__(self):
+        self.baldes = [0] * len(BALDES_SEGUNDOS)
+        self.suma = 0.0
+        self.cantidad = 0
+
+    def observar(self, valor):
+        for i, limite in enumerate(BALDES_SEGUNDOS):
+            if valor <= limite:
+                self.baldes[i] += 1
+        self.suma += valor
+        self.cantidad += 1
+
+
+class Metricas:
+    """Registro de métricas del proceso, seguro entre hilos"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reiniciar()
+
+    def reiniciar(self):
+        with self._lock:
+            # {(metodo, ruta): _Histograma}
+            self._latencias = {}
+            # {(metodo, ruta, estado): cantidad}
+            self._requests = {}
+            # {(ruta, fase): segundos}, fase = archivos | plantillas | resto
+            self._fases = {}
+            # {(archivo, operacion): [cantidad, bytes, filas, segundos]}
+            self._archivos = {}
+            self._recientes = deque(maxlen=CANTIDAD_RECIENTES)
+
+    def _acumular_archivo(self, archivo, operacion, bytes_, filas, segundos):
+        with self._lock:
+            acumulado = self._archivos.setdefault((archivo, operacion), [0, 0, 0, 0.0])
+            acumulado[0] += 1
+            acumulado[1] += bytes_
+            acumulado[2] += filas
+            acumulado[3] += segundos
+
+    def registrar_lectura(self, archivo, bytes_, filas, segundos):
+        self._acumular_archivo(archivo, 'lectura', bytes_, filas, segundos)
+        for actual in _requests_medidas():
+            actual.lecturas += 1
+            actual.bytes_leidos += bytes_
+            actual.filas += filas
+            actual.segundos_archivos += segundos
+
+    def registrar_escritura(self, archivo, bytes_, filas, segundos):
+        self._acumular_archivo(archivo, 'escritura', bytes_, filas, segundos)
+        for actual in _requests_medidas():
+            actual.escrituras += 1
+            actual.bytes_escritos += bytes_
+            actual.segundos_archivos += segundos
+
+    def registrar_request(self, resumen):
+        clave = (resumen['metodo'], resumen['ruta'])
+        with self._lock:
+            self._latencias.setdefault(clave, _Histograma()).observar(resumen['ms'] / 1000)
+            clave_estado = clave + (resumen['estado'],)
+            self._requests[clave_estado] = self._requests.get(clave_estado, 0) + 1
+            for fase in ('archivos', 'plantillas', 'resto'):
+                clave_fase = (resumen['ruta'], fase)
+                self._fases[clave_fase] = self._fases.get(clave_fase, 0.0) + resumen[f'ms_{fase}'] / 1000
+            self._recientes.append(resumen)
+
+    def recientes(self):
+        """Resúmenes de las últimas requests, de la más nueva a la más vieja"""
+        with self._lock:
+            return list(reversed(self._recientes))
+
+    def exponer(self):
+        """Todas las métricas en formato de texto de Prometheus"""
+        lineas = []
+        with self._lock:
+            lineas += ['# HELP recepcion_request_segundos Latencia de las requests por ruta.',
+                       '# TYPE recepcion_request_segundos histogram']
+            for (metodo, ruta), histograma in sorted(self._latencias.items()):
+                etiquetas = f'metodo="{metodo}",ruta="{_escapar(ruta)}"'
+                for limite, cantidad in zip(BALDES_SEGUNDOS, histograma.baldes):
+                    lineas.append(f'recepcion_request_segundos_bucket{{{etiquetas},le="{limite}"}} {cantidad}')
+                lineas.append(f'recepcion_request_segundos_bucket{{{etiquetas},le="+Inf"}} {histograma.cantidad}')
+                lineas.append(f'recepcion_request_segundos_sum{{{etiquetas}}} {histograma.suma:.6f}')
+                lineas.append(f'recepcion_request_segundos_count{{{etiquetas}}} {histograma.cantidad}')
+
+            lineas += ['# HELP recepcion_requests_total Requests atendidas por ruta y código de estado.',
+                       '# TYPE recepcion_requests_total counter']
+            for (metodo, ruta, estado), cantidad in sorted(self._requests.items(), key=str):
+                lineas.append(f'recepcion_requests_total{{metodo="{metodo}",ruta="{_escapar(ruta)}",'
+                              f'estado="{estado}"}} {cantidad}')
+
+            lineas += ['# HELP recepcion_request_fase_segundos_total Tiempo de las requests leyendo/escribiendo '
+                       'archivos, renderizando plantillas y en el resto del código (pandas).',
+                       '# TYPE recepcion_request_fase_segundos_total counter']
+            for (ruta, fase), segundos in sorted(self._fases.items()):
+                lineas.append(f'recepcion_request_fase_segundos_total{{ruta="{_escapar(ruta)}",fase="{fase}"}} '
+                              f'{segundos:.6f}')
+
+            for indice, nombre, ayuda in (
+                (0, 'recepcion_archivo_operaciones_total', 'Lecturas y escrituras de los archivos de datos.'),
+                (1, 'recepcion_archivo_bytes_total', 'Bytes leídos y escritos de los archivos de datos.'),
+                (2, 'recepcion_archivo_filas_total', 'Filas parseadas o escritas.'),
+                (3, 'recepcion_archivo_segundos_total', 'Tiempo leyendo y escribiendo los archivos de datos.'),
+            ):
+                lineas += [f'# HELP {nombre} {ayuda}', f'# TYPE {nombre} counter']
+                for (archivo, operacion), acumulado in sorted(self._archivos.items()):
+                    valor = f'{acumulado[indice]:.6f}' if indice == 3 else acumulado[indice]
+                    lineas.append(f'{nombre}{{archivo="{_escapar(archivo)}",operacion="{operacion}"}} {valor}')
+
+        return '\n'.join(lineas) + '\n'
+
+
+def _escapar(valor):
+    return str(valor).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+metricas = Metricas()
+
+
+def registrar_lectura(archivo, bytes_, filas, segundos):
+    """Una lectura de un archivo de datos (ver Metricas.registrar_lectura)"""
+    metricas.registrar_lectura(archivo, bytes_, filas, segundos)
+
+
+def registrar_escritura(archivo, bytes_, filas, segundos):
+    """Una escritura de un archivo de datos (ver Metricas.registrar_escritura)"""
+    metricas.registrar_escritura(archivo, bytes_, filas, segundos)
+
+
+def request_actual():
+    """Mediciones de la request en curso (para pasarlas a otro hilo), o None"""
+    return _request_actual.get()
+
+
+@contextmanager
+def atribuir_a(requests):
+    """
+    Atribuye a `requests` (resultados de request_actual()) las lecturas y
+    escrituras hechas dentro del bloque, por ejemplo las del escritor diferido
+    de consumos, que escribe en su propio hilo lo que encolaron las requests.
+    """
+    token = _requests_atribuidas.set(tuple(r for r in requests if r is not None))
+    try:
+        yield
+    finally:
+        _requests_atribuidas.reset(token)
+
+
+def resumen_request():
+    """Costos de la request en curso hasta este momento, o None fuera de una request"""
+    actual = _request_actual.get()
+    return actual.resumen() if actual is not None else None
+
+
+def instalar(app):
+    """
+    Agrega a la app los hooks que miden cada request: latencia por ruta,
+    tiempo en plantillas (señales de Flask) y costos de archivos.
+    """
+    from flask import before_render_template, g, request, template_rendered
+
+    @app.before_request
+    def _iniciar_medicion():
+        ruta = request.url_rule.rule if request.url_rule is not None else SIN_RUTA
+        g._token_metricas = _request_actual.set(_Request(request.method, ruta))
+
+    @app.after_request
+    def _registrar_medicion(respuesta):
+        actual = _request_actual.get()
+        if actual is not None:
+            metricas.registrar_request(actual.resumen(respuesta.status_code))
+            _request_actual.set(None)
+        return respuesta
+
+    @app.teardown_request
+    def _cerrar_medicion(error=None):
+        # Si la vista lanzó una excepción after_request no se ejecuta
+        actual = _request_actual.get()
+        if actual is not None:
+            metricas.registrar_request(actual.resumen(500))
+        token = g.pop('_token_metricas', None)
+        if token is not None:
+            _request_actual.reset(token)
+
+    def _antes_de_plantilla(sender, template, context, **extra):
+        actual = _request_actual.get()
+        if actual is not None:
+            actual._inicio_plantilla = time.perf_counter()
+
+    def _plantilla_renderizada(sender, template, context, **extra):
+        actual = _request_actual.get()
+        if actual is not None and actual._inicio_plantilla is not None:
+            actual.segundos_plantillas += time.perf_counter() - actual._inicio_plantilla
+            actual._inicio_plantilla = None
+
+    # weak=False: las funciones son locales y se perderían al salir de instalar()
+    before_render_template.connect(_antes_de_plantilla, app, weak=False)
+    template_rendered.connect(_plantilla_renderizada, app, weak=False)
@@ -0,0 +1,29 @@
+"""
+Importación diferida de las librerías pesadas (pandas, numpy).
+Importar pandas lleva una fracción de segundo que se pagaba al arrancar,
+dos veces con el recargador de Flask (proceso vigilante + servidor). Con
+importar_perezoso() el módulo se importa recién la primera vez que se usa
+uno de sus atributos, así el servidor acepta conexiones antes.
+"""
+
+import importlib
+import types
+
+
+class _ModuloPerezoso(types.ModuleType):
+    """Representa a un módulo que todavía no se importó"""
+
+    def __getattr__(self, atributo):
+        # import_module usa el bloqueo de importación: es seguro entre hilos
+        valor = getattr(importlib.import_module(self.__name__), atributo)
+        # Los próximos accesos ya no pasan por __getattr__
+        setattr(self, atributo, valor)
+        return valor
+
+
+def importar_perezoso(nombre):
+    """
+    Retorna un objeto que se usa igual que el módulo `nombre` (pd.DataFrame,
+    np.int64, ...) y lo importa en el primer acceso a un atributo.
+    """
+    return _ModuloPerezoso(nombre)
@@ -0,0 +1,230 @@
+"""
+Perfilado de requests con cProfile.
+Se activa en caliente, desde /debug/profiles o con variables de entorno,
+para rutas elegidas (se perfilan todas sus requests) o con un umbral de
+latencia (se perfila una muestra de las requests y se guardan las que lo
+superan). Cada perfil se guarda en data/profiles/ como .prof (pstats) junto
+con un .json con la ruta, la habitación, los tamaños de los archivos de
+datos y las funciones con más tiempo acumulado.
+
+Variables de entorno (valores iniciales):
+    RECEPCION_PERFIL_RUTAS      reglas separadas por coma, ej. /dashboard,/checkout-masivo
+    RECEPCION_PERFIL_UMBRAL_MS  guardar las requests que tarden más que esto
+    RECEPCION_PERFIL_MUESTREO   fracción de requests perfiladas con umbral (1 = todas)
+"""
+
+import cProfile
+import io
+import json
+import os
+import pstats
+import random
+import re
+import threading
+import time
+from datetime import datetime
+
+CARPETA_PERFILES = 'data/profiles'
+
+# Perfiles guardados como máximo; al superarlo se borran los más rápidos
+MAXIMO_PERFILES = 200
+
+# Funciones con más tiempo acumulado que se guardan en el resumen de cada perfil
+FUNCIONES_RESUMEN = 25
+
+ARCHIVOS_DATOS = ('data/pasajeros.csv', 'data/consumos_diarios.csv', 'data/consumos_diarios_bajas.csv')
+
+
+def _float_entorno(nombre, defecto=None):
+    try:
+        return float(os.environ[nombre])
+    except (KeyError, ValueError):
+        return defecto
+
+
+class Perfilador:
+    """
+    Configuración y estado del perfilado del proceso.
+
+    cProfile no admite dos perfiles activos a la vez en un mismo proceso
+    (desde Python 3.12), así que se perfila una request por vez: las que
+    llegan mientras otra se está perfilando se atienden sin perfilar.
+    """
+
+    def __init__(self, carpeta=CARPETA_PERFILES):
+        self.carpeta = carpeta
+        self.rutas = {ruta.strip() for ruta in os.environ.get('RECEPCION_PERFIL_RUTAS', '').split(',')
+                      if ruta.strip()}
+        self.umbral_ms = _float_entorno('RECEPCION_PERFIL_UMBRAL_MS')
+        self.muestreo = _float_entorno('RECEPCION_PERFIL_MUESTREO', 1.0)
+        self._ocupado = threading.Lock()
+
+    def activo(self):
+        return bool(self.rutas) or self.umbral_ms is not None
+
+    def configurar(self, rutas=None, umbral_ms=None, muestreo=None):
+        """Cambia la configuración en caliente; umbral_ms=None desactiva el umbral"""
+        if rutas is not None:
+            self.rutas = {ruta.strip() for ruta in rutas if ruta.strip()}
+        self.umbral_ms = umbral_ms
+        if muestreo is not None:
+            self.muestreo = min(max(muestreo, 0.0), 1.0)
+
+    def debe_perfilar(self, ruta):
+        if ruta in self.rutas:
+            return True
+        return self.umbral_ms is not None and random.random() < self.muestreo
+
+    def iniciar(self, ruta):
+        """
+        Perfil activo para la request de `ruta`, o None si no corresponde
+        perfilarla o ya hay otra request perfilándose.
+        """
+        if not self.debe_perfilar(ruta) or not self._ocupado.acquire(blocking=False):
+            return None
+        perfil = cProfile.Profile()
+        try:
+            perfil.enable()
+        except ValueError:
+            # Otro perfilador (un depurador, por ejemplo) ya está activo
+            self._ocupado.release()
+            return None
+        return perfil
+
+    def terminar(self, perfil, ruta, segundos, datos):
+        """
+        Detiene el perfil y lo guarda si la ruta está elegida o si la request
+        superó el umbral.
+
+        Args:
+            datos (dict): metodo, url, habitacion y estado de la request
+
+        Returns:
+            str: nombre del perfil guardado, o None si se descartó
+        """
+        try:
+            perfil.disable()
+        finally:
+            self._ocupado.release()
+
+        ms = segundos * 1000
+        if ruta not in self.rutas and (self.umbral_ms is None or ms < self.umbral_ms):
+            return None
+        try:
+            return self._guardar(perfil, dict(datos, ruta=ruta, ms=round(ms, 1)))
+        except OSError as e:
+            print(f"Error al guardar perfil de {ruta}: {e}")
+            return None
+
+    def _guardar(self, perfil, datos):
+        os.makedirs(self.carpeta, exist_ok=True)
+        ahora = datetime.now()
+        slug = re.sub(r'[^A-Za-z0-9]+', '_', datos['ruta']).strip('_') or 'raiz'
+        nombre = f"{ahora.strftime('%Y%m%d-%H%M%S-%f')}_{slug}_{int(datos['ms'])}ms"
+
+        estadisticas = pstats.Stats(perfil, stream=io.StringIO())
+        estadisticas.dump_stats(os.path.join(self.carpeta, nombre + '.prof'))
+
+        datos.update({
+            'nombre': nombre,
+            'fecha': ahora.strftime('%d/%m/%Y %H:%M:%S'),
+            'archivos': {os.path.basename(archivo): os.path.getsize(archivo)
+                         for archivo in ARCHIVOS_DATOS if os.path.exists(archivo)},
+            'funciones': _funciones_acumuladas(estadisticas),
+        })
+        with open(os.path.join(self.carpeta, nombre + '.json'), 'w', encoding='utf-8') as f:
+            json.dump(datos, f, ensure_ascii=False, indent=1)
+
+        self._podar()
+        return nombre
+
+    def _podar(self):
+        perfiles = self.listar()
+        for perfil in perfiles[MAXIMO_PERFILES:]:
+            for extension in ('.json', '.prof'):
+                try:
+                    os.remove(os.path.join(self.carpeta, perfil['nombre'] + extension))
+                except OSError:
+                    pass
+
+    def listar(self):
+        """Resúmenes de los perfiles guardados, de la request más lenta a la más rápida"""
+        if not os.path.isdir(self.carpeta):
+            return []
+        perfiles = []
+        for archivo in os.listdir(self.carpeta):
+            if not archivo.endswith('.json'):
+                continue
+            try:
+                with open(os.path.join(self.carpeta, archivo), encoding='utf-8') as f:
+                    perfiles.append(json.load(f))
+            except (OSError, ValueError):
+                continue
+        return sorted(perfiles, key=lambda perfil: perfil.get('ms', 0), reverse=True)
+
+    def ruta_prof(self, nombre):
+        """Ruta del .prof de un perfil guardado, o None si el nombre no es válido"""
+        if not re.fullmatch(r'[\w.-]+', nombre):
+            return None
+        ruta = os.path.join(self.carpeta, nombre + '.prof')
+        return ruta if os.path.exists(ruta) else None
+
+
+def _archivo_corto(archivo):
+    """Ruta relativa al proyecto, o paquete/módulo para las librerías (flask/app.py)"""
+    relativa = os.path.relpath(archivo)
+    if not relativa.startswith('..'):
+        return relativa
+    return os.path.join(*archivo.split(os.sep)[-2:])
+
+
+def _funciones_acumuladas(estadisticas, cantidad=FUNCIONES_RESUMEN):
+    """Las `cantidad` funciones con más tiempo acumulado de un pstats.Stats"""
+    filas = []
+    for (archivo, linea, funcion), (_, llamadas, propio, acumulado, _) in estadisticas.stats.items():
+        filas.append({
+            'funcion': f"{_archivo_corto(archivo)}:{linea}({funcion})" if linea else funcion,
+            'llamadas': llamadas,
+            'propio_ms': round(propio * 1000, 2),
+            'acumulado_ms': round(acumulado * 1000, 2),
+        })
+    filas.sort(key=lambda fila: fila['acumulado_ms'], reverse=True)
+    return filas[:cantidad]
+
+
+perfilador = Perfilador()
+
+
+def instalar(app):
+    """Agrega a la app los hooks que perfilan las requests según la configuración"""
+    from flask import g, request
+
+    @app.before_request
+    def _iniciar_perfil():
+        if not perfilador.activo() or request.path.startswith(('/static', '/debug/profiles')):
+            return
+        ruta = request.url_rule.rule if request.url_rule is not None else request.path
+        perfil = perfilador.iniciar(ruta)
+        if perfil is not None:
+            g._perfil = (perfil, ruta, time.perf_counter())
+
+    @app.after_request
+    def _anotar_estado(respuesta):
+        if '_perfil' in g:
+            g._perfil_estado = respuesta.status_code
+        return respuesta
+
+    @app.teardown_request
+    def _terminar_perfil(error=None):
+        perfil = g.pop('_perfil', None)
+        if perfil is None:
+            return
+        perfil, ruta, inicio = perfil
+        view_args = request.view_args or {}
+        habitacion = view_args.get('num_habitacion', request.values.get('habitacion'))
+        perfilador.terminar(perfil, ruta, time.perf_counter() - inicio, {
+            'metodo': request.method,
+            'url': request.full_path.rstrip('?'),
+            'habitacion': habitacion,
+            'estado': g.pop('_perfil_estado', 500),
+        })
@@ -4,14 +4,16 @@ Permite registrar huéspedes sin reserva previa con estadía de 1 noche.
 """
 
 from datetime import date, timedelta
-import pandas as pd
-import os
 
-DB_PASAJEROS = 'data/pasajeros.csv'
+from core.almacen import DB_PASAJEROS, obtener_almacen_pasajeros
+from core.perezoso import importar_perezoso
 
-def obtener_habitaciones_disponibles():
+pd = importar_perezoso('pandas')
+
+def obtener_habitaciones_disponibles(ocupadas=None):
     """
     Retorna lista de habitaciones NO ocupadas actualmente.
+    Acepta las habitaciones ocupadas ya calculadas (por ejemplo de un snapshot).
     """
     from core.dashboard import PISOS, obtener_habitaciones_ocupadas
     
@@ -21,7 +23,8 @@ def obtener_habitaciones_disponibles():
         todas_habitaciones.extend(piso_habs)
     
     # Habitaciones ocupadas
-    ocupadas = obtener_habitaciones_ocupadas()
+    if ocupadas is None:
+        ocupadas = obtener_habitaciones_ocupadas()
     
     # Retornar solo las disponibles
     disponibles = [h for h in todas_habitaciones if h not in ocupadas.keys()]
@@ -43,8 +46,6 @@ def crear_reserva_express(habitacion, nombre="Huésped sin reserva", pax=1, serv
         tuple: (dict_reserva, str_mensaje) 
                Si falla, retorna (None, str_error)
     """
-    from datetime import datetime
-    
     # Validar que la habitación esté disponible
     disponibles = obtener_habitaciones_disponibles()
     if int(habitacion) not in disponibles:
@@ -62,23 +63,7 @@ def crear_reserva_express(habitacion, nombre="Huésped sin reserva", pax=1, serv
     hoy = date.today()
     fecha_salida = hoy + timedelta(days=noches)
     
-    # Verificar que no haya conflicto con reservas futuras
-    if os.path.exists(DB_PASAJEROS):
-        df_existente = pd.read_csv(DB_PASAJEROS)
-        habitaciones_futuras = df_existente[df_existente['Nro. habitación'] == int(habitacion)]
-        
-        for _, row in habitaciones_futuras.iterrows():
-            try:
-                fecha_ingreso_futura = datetime.strptime(row['Fecha de ingreso'], '%d/%m/%Y').date()
-                
-                # Si hay una reserva futura que ingresa ANTES de nuestra fecha de salida
-                if fecha_ingreso_futura < fecha_salida:
-                    max_noches = (fecha_ingreso_futura - hoy).days
-                    if max_noches <= 0:
-                        return None, f"La habitación {habitacion} ya está ocupada"
-                    return None, f"La habitación {habitacion} tiene una reserva el {fecha_ingreso_futura.strftime('%d/%m/%Y')}. Máximo {max_noches} noche(s) disponible(s)"
-            except:
-                pass
+    almacen = obtener_almacen_pasajeros(DB_PASAJEROS)
     
     # Crear registro compatible con pasajeros.csv
     nueva_reserva = {
@@ -101,27 +86,18 @@ def crear_reserva_express(habitacion, nombre="Huésped sin reserva", pax=1, serv
         # Agregar al CSV existente
         df_nuevo = pd.DataFrame([nueva_reserva])
         
-        if os.path.exists(DB_PASAJEROS):
-            df_existente = pd.read_csv(DB_PASAJEROS)
-            
-            # Verificar que no esté ocupada HOY (solo rechazar si ingreso <= hoy)
-            habitaciones_hoy = df_existente[df_existente['Nro. habitación'] == int(habitacion)]
-            for _, row in habitaciones_hoy.iterrows():
-                from datetime import datetime
-                try:
-                    fecha_ingreso = datetime.strptime(row['Fecha de ingreso'], '%d/%m/%Y')
-                    hoy_dt = datetime.combine(hoy, datetime.min.time())
-                    
-                    # Solo rechazar si la habitación ya está ocupada (ingreso <= hoy)
-                    if fecha_ingreso <= hoy_dt:
-                        return None, f"La habitación {habitacion} ya está ocupada hoy"
-                except:
-                    pass
+        # Verificar que no haya conflicto con reservas futuras, bajo el bloqueo
+        # del archivo para que otra reserva no ocupe la habitación entre la
+        # consulta y la escritura
+        with almacen.bloqueo():
+            error = _verificar_conflicto(almacen, habitacion, hoy, fecha_salida)
+            if error:
+                return None, error
             
-            df_nuevo = pd.concat([df_existente, df_nuevo], ignore_index=True)
-        
-        # Guardar
-        df_nuevo.to_csv(DB_PASAJEROS, index=False)
+            if almacen.existe():
+                almacen.agregar(df_nuevo)
+            else:
+                almacen.guardar(df_nuevo)
         
         return nueva_reserva, "Reserva express creada exitosamente"
         
@@ -129,6 +105,35 @@ def crear_reserva_express(habitacion, nombre="Huésped sin reserva", pax=1, serv
         return None, f"Error al crear reserva: {str(e)}"
 
 
+def _verificar_conflicto(almacen, habitacion, hoy, fecha_salida):
+    """
+    Busca en el índice de estadías la primera que se superpone con
+    [hoy, fecha_salida). Una estadía que ingresó hasta hoy ocupa la
+    habitación aunque su egreso ya haya pasado: el pasajero sigue en la
+    habitación hasta que se procese el checkout (como en el dashboard).
+    
+    Returns:
+        str con el error o None si la habitación está libre en ese rango
+    """
+    if not almacen.existe():
+        return None
+    
+    estadias = almacen.estadias()
+    primer_ingreso = estadias.primer_ingreso(habitacion)
+    if primer_ingreso is not None and primer_ingreso <= hoy:
+        return f"La habitación {habitacion} ya está ocupada"
+    
+    conflicto = estadias.primer_conflicto(habitacion, hoy, fecha_salida)
+    if conflicto is None:
+        return None
+    
+    fecha_ingreso_futura = conflicto[0]
+    max_noches = (fecha_ingreso_futura - hoy).days
+    if max_noches <= 0:
+        return f"La habitación {habitacion} ya está ocupada"
+    return f"La habitación {habitacion} tiene una reserva el {fecha_ingreso_futura.strftime('%d/%m/%Y')}. Máximo {max_noches} noche(s) disponible(s)"
+
+
 def calcular_noches_maximas(habitacion):
     """
     Calcula cuántas noches máximo se puede reservar una habitación
@@ -137,29 +142,13 @@ def calcular_noches_maximas(habitacion):
     Returns:
         int: Cantidad máxima de noches disponibles (0 si no hay límite conocido)
     """
-    from datetime import datetime
-    
-    if not os.path.exists(DB_PASAJEROS):
+    almacen = obtener_almacen_pasajeros(DB_PASAJEROS)
+    if not almacen.existe():
         return 0  # Sin límite conocido
     
     try:
-        df = pd.read_csv(DB_PASAJEROS)
-        habitaciones_futuras = df[df['Nro. habitación'] == int(habitacion)]
-        
-        hoy = date.today()
-        min_dias = None
-        
-        for _, row in habitaciones_futuras.iterrows():
-            try:
-                fecha_ingreso = datetime.strptime(row['Fecha de ingreso'], '%d/%m/%Y').date()
-                if fecha_ingreso > hoy:
-                    dias = (fecha_ingreso - hoy).days
-                    if min_dias is None or dias < min_dias:
-                        min_dias = dias
-            except:
-                pass
-        
-        return min_dias if min_dias else 0
+        # Búsqueda binaria en las estadías de la habitación, ordenadas por ingreso
+        return almacen.estadias().noches_maximas(habitacion, date.today()) or 0
     except:
         return 0
 
@@ -0,0 +1,24 @@
+#!/bin/bash
+# Instala las dependencias de requirements.txt solo si cambiaron.
+# Se usa con "source" desde run_hotel.sh e iniciar_recepcion.sh, con el
+# entorno virtual ya activado y parados en la carpeta del proyecto.
+#
+# El hash de requirements.txt de la última instalación correcta se guarda en
+# .venv/.requirements.sha256; si coincide no se llama a pip (arranque rápido).
+# Para forzar la reinstalación: borrar ese archivo.
+
+ARCHIVO_HASH=".venv/.requirements.sha256"
+HASH_ACTUAL=$(sha256sum requirements.txt | cut -d' ' -f1)
+
+if [ -f "$ARCHIVO_HASH" ] && [ "$(cat "$ARCHIVO_HASH")" = "$HASH_ACTUAL" ]; then
+    echo "✅ Dependencias al día (requirements.txt sin cambios)"
+else
+    echo "📦 Instalando dependencias (requirements.txt cambió o es la primera vez)..."
+    pip install --upgrade pip -q
+    if ! pip install -r requirements.txt -q; then
+        echo "❌ Error al instalar dependencias"
+        exit 1
+    fi
+    echo "$HASH_ACTUAL" > "$ARCHIVO_HASH"
+    echo "✅ Dependencias actualizadas"
+fi
@@ -0,0 +1,281 @@
+#!/usr/bin/env python3
+"""
+Generador de datos sintéticos para pruebas y benchmarks.
+Escribe un pasajeros.csv (esquema de activos o de jubilados) y un
+consumos_diarios.csv realistas: vouchers familiares repartidos en varias
+habitaciones, checkouts del día, reservas futuras y consumos de los alojados.
+
+La escala es configurable: con 53 habitaciones usa las del hotel (PISOS) y
+con más agrega pisos ficticios (401, 402, ...) que el dashboard no muestra
+pero que sí pasan por la lectura y el filtrado de los archivos.
+
+Uso:
+    python generar_datos_prueba.py                      # 53 habitaciones en data_prueba/
+    python generar_datos_prueba.py --habitaciones 2000 --consumos 1000000
+    python generar_datos_prueba.py --esquema jubilados --carpeta /tmp/hotel/data
+"""
+
+import argparse
+import os
+import random
+import sys
+from datetime import date, datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+from core.dashboard import PISOS
+
+COLUMNAS_ACTIVOS = [
+    'Apellido y nombre', 'Nro. doc.', 'Edad', 'Nro. habitación', 'Tipo habitación', 'Voucher',
+    'Sede', 'Fecha de ingreso', 'Fecha de egreso', 'Servicios', 'Plazas ocupadas'
+]
+
+COLUMNAS_JUBILADOS = [
+    'Cód. Alojamiento', 'Descripción', 'Nro. habitación', 'Tipo habitación', 'Observación habitación',
+    'Cantidad plazas', 'Voucher', 'Sede', 'Fecha de ingreso', 'Fecha de egreso', 'Plazas ocupadas',
+    'Tipo documento', 'Nro. doc.', 'Apellido y nombre', 'Edad', 'Entidad', 'Servicios', 'Paquete',
+    'Transporte', 'Fecha viaje', 'Hora viaje', 'Parada', 'Email', 'Estado', 'Fecha de nacimiento',
+    'Teléfono', 'Celular', 'Usuario'
+]
+
+COLUMNAS_CONSUMOS = ['fecha', 'habitacion', 'pasajero', 'categoria', 'monto']
+
+APELLIDOS = ['GOMEZ', 'FERNANDEZ', 'LOPEZ', 'MARTINEZ', 'RODRIGUEZ', 'GARCIA', 'PEREZ', 'SANCHEZ',
+             'ROMERO', 'DIAZ', 'ALVAREZ', 'TORRES', 'RUIZ', 'SOSA', 'BENITEZ', 'ACOSTA', 'MEDINA',
+             'HERRERA', 'AGUIRRE', 'PEREYRA', 'GIMENEZ', 'MOLINA', 'CASTRO', 'ORTIZ', 'SILVA']
+NOMBRES = ['MARIA', 'JUAN', 'ANA', 'CARLOS', 'LAURA', 'JOSE', 'SILVIA', 'JORGE', 'CLAUDIA', 'MIGUEL',
+           'GRACIELA', 'RAUL', 'MONICA', 'OSCAR', 'NORMA', 'LUIS', 'ALICIA', 'HUGO', 'MARTA', 'PABLO']
+SEDES = ['CAPITAL FEDERAL', 'CORDOBA', 'ROSARIO', 'MENDOZA', 'LA PLATA', 'TUCUMAN']
+SERVICIOS = ['DESAYUNO', 'DESAYUNO', 'MEDIA PENSION', 'MAP', 'ALL INCLUSIVE']
+TIPOS_HABITACION = {1: 'SGL', 2: 'DBL', 3: 'TPL', 4: 'CPL'}
+CATEGORIAS = ['Bebidas', 'Estadía', 'Map']
+
+FORMATO_FECHA = '%d/%m/%Y'
+
+# Habitaciones por piso ficticio cuando se piden más que las del hotel
+HABITACIONES_POR_PISO = 50
+
+# Consumos escritos por bloque, para no armar millones de filas en memoria
+BLOQUE_CONSUMOS = 200_000
+
+
+def generar_habitaciones(cantidad):
+    """
+    Las habitaciones del hotel (PISOS) y, si no alcanzan, pisos ficticios
+    desde el 4: 401..450, 501..550, ...
+    """
+    habitaciones = [hab for piso in PISOS.values() for hab in piso]
+    piso = 4
+    while len(habitaciones) < cantidad:
+        habitaciones.extend(piso * 100 + n for n in range(1, HABITACIONES_POR_PISO + 1))
+        piso += 1
+    return habitaciones[:cantidad]
+
+
+def _nombre(rng, apellido=None):
+    return f"{apellido or rng.choice(APELLIDOS)} {rng.choice(NOMBRES)}"
+
+
+def _estadias(rng, hoy, habitaciones, ocupacion, dias_futuros):
+    """
+    Reparte estadías en las habitaciones: las ocupadas hoy (algunas con
+    checkout hoy) y reservas futuras encadenadas hasta
+    `dias_futuros`. Devuelve tuplas (habitaciones, ingreso, egreso), donde un
+    grupo familiar comparte fechas en habitaciones contiguas.
+    """
+    estadias = []
+    i = 0
+    while i < len(habitaciones):
+        # Grupo familiar: la mayoría en una habitación, algunos en dos o tres contiguas
+        grupo = habitaciones[i:i + rng.choice([1, 1, 1, 1, 2, 2, 3])]
+        i += len(grupo)
+
+        # Algunas habitaciones quedan sin ningún pasajero (destinos posibles de un cambio)
+        if rng.random() < 0.1:
+            continue
+
+        libre_desde = hoy
+        if rng.random() < ocupacion:
+            ingreso = hoy - timedelta(days=rng.randint(0, 6))
+            if rng.random() < 0.2:
+                egreso = hoy
+            else:
+                egreso = hoy + timedelta(days=rng.randint(1, 7))
+            estadias.append((grupo, ingreso, egreso))
+            libre_desde = egreso
+
+        # Reservas futuras con algunos días libres entre una y otra
+        ingreso = libre_desde + timedelta(days=rng.randint(1, 10))
+        while ingreso < hoy + timedelta(days=dias_futuros):
+            egreso = ingreso + timedelta(days=rng.randint(2, 7))
+            estadias.append((grupo, ingreso, egreso))
+            ingreso = egreso + timedelta(days=rng.randint(0, 12))
+
+    return estadias
+
+
+def generar_pasajeros(rng, hoy, habitaciones, ocupacion=0.75, dias_futuros=60, esquema='activos'):
+    """
+    Arma el DataFrame de pasajeros con las columnas del esquema indicado.
+
+    Returns:
+        tuple: (DataFrame, dict {habitación: [nombres alojados hoy]})
+    """
+    filas = []
+    alojados = {}
+    voucher = 30100000
+    documento = 20000000
+
+    for grupo, ingreso, egreso in _estadias(rng, hoy, habitaciones, ocupacion, dias_futuros):
+        apellido = rng.choice(APELLIDOS)
+        voucher += 1
+        servicios = rng.choice(SERVICIOS)
+        sede = rng.choice(SEDES)
+
+        for habitacion in grupo:
+            pax = rng.choice([1, 2, 2, 2, 3, 4])
+            for n in range(pax):
+                documento += rng.randint(1, 500)
+                nombre = _nombre(rng, apellido)
+                # En jubilados cada pasajero suele tener su propio voucher
+                voucher_pasajero = voucher
+                if esquema == 'jubilados' and n > 0 and rng.random() < 0.5:
+                    voucher += 1
+                    voucher_pasajero = voucher
+                edad = rng.randint(3, 17) if n >= 2 else rng.randint(25, 85)
+
+                fila = {
+                    'Apellido y nombre': nombre,
+                    'Nro. doc.': str(documento),
+                    'Edad': edad,
+                    'Nro. habitación': habitacion,
+                    'Tipo habitación': TIPOS_HABITACION[pax],
+                    'Voucher': str(voucher_pasajero),
+                    'Sede': sede,
+                    'Fecha de ingreso': ingreso.strftime(FORMATO_FECHA),
+                    'Fecha de egreso': egreso.strftime(FORMATO_FECHA),
+                    'Servicios': servicios,
+                    'Plazas ocupadas': pax,
+                }
+                if esquema == 'jubilados':
+                    nacimiento = date(hoy.year - edad, rng.randint(1, 12), rng.randint(1, 28))
+                    fila.update({
+                        'Cód. Alojamiento': f'ALO{habitacion}',
+                        'Descripción': 'HOTEL SINDICAL',
+                        'Observación habitación': '',
+                        'Cantidad plazas': pax,
+                        'Tipo documento': 'DNI',
+                        'Entidad': 'PAMI',
+                        'Paquete': f'PAQ-{servicios[:3]}',
+                        'Transporte': rng.choice(['BUS', 'PROPIO']),
+                        'Fecha viaje': (ingreso - timedelta(days=1)).strftime(FORMATO_FECHA),
+                        'Hora viaje': '22:00',
+                        'Parada': f'{rng.randint(1, 40):03d}',
+                        'Email': f'{apellido.lower()}{documento % 1000}@correo.com',
+                        'Estado': 'CONFIRMADO',
+                        'Fecha de nacimiento': nacimiento.strftime(FORMATO_FECHA),
+                        'Teléfono': f'0{rng.randint(11, 388)}-{rng.randint(4000000, 4999999)}',
+                        'Celular': f'0{rng.randint(11, 388)}15{rng.randint(5000000, 6999999)}',
+                        'Usuario': 'carga',
+                    })
+                filas.append(fila)
+
+                if ingreso <= hoy <= egreso:
+                    alojados.setdefault(habitacion, []).append(nombre)
+
+    columnas = COLUMNAS_JUBILADOS if esquema == 'jubilados' else COLUMNAS_ACTIVOS
+    return pd.DataFrame(filas, columns=columnas), alojados
+
+
+def escribir_consumos(archivo, cantidad, alojados, hoy, semilla=0):
+    """
+    Escribe `cantidad` consumos de los pasajeros alojados, en bloques de
+    BLOQUE_CONSUMOS filas.
+    """
+    pd.DataFrame(columns=COLUMNAS_CONSUMOS).to_csv(archivo, index=False)
+    if not alojados or cantidad <= 0:
+        return
+
+    rng = np.random.default_rng(semilla)
+    habitaciones = np.array([hab for hab, nombres in alojados.items() for _ in nombres])
+    pasajeros = np.array([nombre for nombres in alojados.values() for nombre in nombres], dtype=object)
+    inicio = datetime.combine(hoy - timedelta(days=6), datetime.min.time())
+
+    escritos = 0
+    while escritos < cantidad:
+        n = min(BLOQUE_CONSUMOS, cantidad - escritos)
+        quien = rng.integers(0, len(pasajeros), n)
+        minutos = rng.integers(0, 7 * 24 * 60, n)
+        fechas = (pd.Timestamp(inicio) + pd.to_timedelta(minutos, unit='min')).strftime('%d/%m/%Y %H:%M')
+        montos = np.round(rng.choice([350, 800, 1200, 2500, 4800, 9500], n) * rng.uniform(0.8, 1.5, n), 2)
+
+        bloque = pd.DataFrame({
+            'fecha': fechas,
+            'habitacion': habitaciones[quien],
+            'pasajero': pasajeros[quien],
+            'categoria': rng.choice(CATEGORIAS, n, p=[0.6, 0.25, 0.15]),
+            'monto': montos,
+        })
+        bloque.to_csv(archivo, mode='a', header=False, index=False)
+        escritos += n
+
+
+def generar_dataset(carpeta, habitaciones=53, consumos=300, esquema='activos', ocupacion=0.75,
+                    dias_futuros=60, semilla=2026, hoy=None):
+    """
+    Escribe pasajeros.csv y consumos_diarios.csv en `carpeta`.
+
+    Returns:
+        dict con las rutas y la cantidad de filas escritas
+    """
+    hoy = hoy or date.today()
+    rng = random.Random(semilla)
+    os.makedirs(carpeta, exist_ok=True)
+
+    df, alojados = generar_pasajeros(rng, hoy, generar_habitaciones(habitaciones),
+                                     ocupacion, dias_futuros, esquema)
+    archivo_pasajeros = os.path.join(carpeta, 'pasajeros.csv')
+    df.to_csv(archivo_pasajeros, index=False)
+
+    archivo_consumos = os.path.join(carpeta, 'consumos_diarios.csv')
+    escribir_consumos(archivo_consumos, consumos, alojados, hoy, semilla)
+
+    return {
+        'pasajeros': archivo_pasajeros,
+        'consumos': archivo_consumos,
+        'filas_pasajeros': len(df),
+        'habitaciones_ocupadas': len(alojados),
+        'filas_consumos': consumos if alojados else 0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Genera datos sintéticos de pasajeros y consumos.')
+    parser.add_argument('--carpeta', default='data_prueba',
+                        help='Carpeta de salida (por defecto data_prueba/, nunca data/)')
+    parser.add_argument('--habitaciones', type=int, default=53, help='Cantidad de habitaciones (53 = el hotel)')
+    parser.add_argument('--consumos', type=int, default=300, help='Cantidad de consumos a generar')
+    parser.add_argument('--esquema', choices=['activos', 'jubilados'], default='activos',
+                        help='Esquema de columnas de pasajeros.csv')
+    parser.add_argument('--ocupacion', type=float, default=0.75, help='Fracción de habitaciones ocupadas hoy')
+    parser.add_argument('--dias-futuros', type=int, default=60, help='Horizonte de reservas futuras en días')
+    parser.add_argument('--semilla', type=int, default=2026, help='Semilla para repetir el mismo dataset')
+    parser.add_argument('--forzar', action='store_true', help='Permite escribir en data/')
+    args = parser.parse_args()
+
+    if os.path.abspath(args.carpeta) == os.path.abspath('data') and not args.forzar:
+        print("❌ data/ contiene los datos reales. Usá otra carpeta o --forzar.")
+        sys.exit(1)
+
+    print(f"🏨 Generando {args.habitaciones} habitaciones ({args.esquema}) y {args.consumos:,} consumos...")
+    resultado = generar_dataset(args.carpeta, args.habitaciones, args.consumos, args.esquema,
+                                args.ocupacion, args.dias_futuros, args.semilla)
+
+    print(f"✅ {resultado['pasajeros']}: {resultado['filas_pasajeros']:,} pasajeros, "
+          f"{resultado['habitaciones_ocupadas']} habitaciones ocupadas hoy")
+    print(f"✅ {resultado['consumos']}: {resultado['filas_consumos']:,} consumos")
+
+
+if __name__ == '__main__':
+    main()
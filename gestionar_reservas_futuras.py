@@ -7,9 +7,9 @@ Permite eliminar y volver a cargar reservas de una fecha específica
 import pandas as pd
 import sys
 from datetime import datetime
-import shutil
 
-DB_PASAJEROS = 'data/pasajeros.csv'
+from core.almacen import DB_PASAJEROS, obtener_almacen_pasajeros, parsear_fecha
+
 BACKUP_DIR = 'data/backups'
 
 def crear_backup():
@@ -20,7 +20,7 @@ def crear_backup():
     
     timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
     backup_file = f'{BACKUP_DIR}/pasajeros_backup_{timestamp}.csv'
-    shutil.copy(DB_PASAJEROS, backup_file)
+    obtener_almacen_pasajeros(DB_PASAJEROS).respaldar(backup_file)
     print(f'✅ Backup creado: {backup_file}')
     return backup_file
 
@@ -31,20 +31,21 @@ def eliminar_reservas_por_fecha(fecha_ingreso):
     Args:
         fecha_ingreso: Fecha en formato DD/MM/YYYY
     """
+    try:
+        parsear_fecha(fecha_ingreso)
+    except ValueError:
+        print(f'❌ Fecha inválida: {fecha_ingreso} (formato DD/MM/YYYY)')
+        return
+    
     # Crear backup primero
     crear_backup()
     
-    # Leer archivo
-    df = pd.read_csv(DB_PASAJEROS)
-    registros_antes = len(df)
+    almacen = obtener_almacen_pasajeros(DB_PASAJEROS)
+    registros_antes = len(almacen.obtener_df())
     
-    # Filtrar (mantener todos EXCEPTO los de esa fecha)
-    df_filtrado = df[df['Fecha de ingreso'] != fecha_ingreso]
-    registros_despues = len(df_filtrado)
-    eliminados = registros_antes - registros_despues
-    
-    # Guardar
-    df_filtrado.to_csv(DB_PASAJEROS, index=False)
+    # Eliminar las reservas de esa fecha (con bloqueo y reemplazo atómico del archivo)
+    eliminados = almacen.eliminar_por_fecha('Fecha de ingreso', fecha_ingreso)
+    registros_despues = registros_antes - eliminados
     
     print(f'\n📊 RESULTADO:')
     print(f'   Registros antes: {registros_antes}')
@@ -62,19 +63,16 @@ def agregar_reservas_desde_csv(archivo_csv):
     # Crear backup primero
     crear_backup()
     
-    # Leer ambos archivos
-    df_actual = pd.read_csv(DB_PASAJEROS)
+    # Leer las nuevas reservas
+    almacen = obtener_almacen_pasajeros(DB_PASAJEROS)
     df_nuevas = pd.read_csv(archivo_csv)
     
-    registros_antes = len(df_actual)
-    
-    # Combinar (append)
-    df_combinado = pd.concat([df_actual, df_nuevas], ignore_index=True)
-    registros_despues = len(df_combinado)
-    agregados = registros_despues - registros_antes
+    registros_antes = len(almacen.obtener_df())
     
-    # Guardar
-    df_combinado.to_csv(DB_PASAJEROS, index=False)
+    # Combinar (append) y guardar
+    almacen.agregar(df_nuevas)
+    agregados = len(df_nuevas)
+    registros_despues = registros_antes + agregados
     
     print(f'\n📊 RESULTADO:')
     print(f'   Registros antes: {registros_antes}')
@@ -84,24 +82,24 @@ def agregar_reservas_desde_csv(archivo_csv):
 
 def mostrar_resumen():
     """Muestra un resumen de las reservas por fecha"""
-    df = pd.read_csv(DB_PASAJEROS)
+    almacen = obtener_almacen_pasajeros(DB_PASAJEROS)
+    tipos = almacen.obtener_tipado()
     
     print('\n📊 RESUMEN DE RESERVAS:')
-    print(f'Total registros: {len(df)}\n')
+    print(f'Total registros: {len(tipos)}\n')
     
-    # Contar por fecha de ingreso
-    ingresos = df.groupby('Fecha de ingreso').size().sort_index()
+    # Contar por fecha de ingreso (ordenado por fecha, no por texto)
+    de_2026 = tipos[tipos['Fecha de ingreso'].dt.year == 2026]
+    ingresos = de_2026.groupby('Fecha de ingreso').size().sort_index()
     print('Reservas por fecha de ingreso:')
     for fecha, count in ingresos.items():
-        if '2026' in str(fecha):
-            print(f'  {fecha}: {count} pasajeros')
+        print(f"  {fecha.strftime('%d/%m/%Y')}: {count} pasajeros")
     
     # Contar habitaciones únicas por fecha
     print('\nHabitaciones por fecha de ingreso:')
-    habitaciones_por_fecha = df.groupby('Fecha de ingreso')['Nro. habitación'].nunique().sort_index()
+    habitaciones_por_fecha = de_2026.groupby('Fecha de ingreso')['Nro. habitación'].nunique().sort_index()
     for fecha, count in habitaciones_por_fecha.items():
-        if '2026' in str(fecha):
-            print(f'  {fecha}: {count} habitaciones')
+        print(f"  {fecha.strftime('%d/%m/%Y')}: {count} habitaciones")
 
 def menu_principal():
     """Menú interactivo para gestionar reservas"""
@@ -13,6 +13,9 @@ echo "================================================"
 echo "Activando entorno virtual..."
 source .venv/bin/activate
 
+# Reinstala dependencias solo si requirements.txt cambió (por ejemplo después de un git pull)
+source ./dependencias.sh
+
 echo "Iniciando servidor Flask..."
 echo "================================================"
 echo ""
@@ -26,23 +26,24 @@ fi
 echo "🔄 Activando entorno virtual..."
 source .venv/bin/activate
 
-# 3. Instalar/actualizar dependencias
+# 3. Instalar dependencias solo si cambió requirements.txt
 echo "📦 Verificando dependencias..."
-pip install --upgrade pip -q
-pip install -r requirements.txt -q
-
-if [ $? -ne 0 ]; then
-    echo "❌ Error al instalar dependencias"
-    exit 1
-fi
-
-echo "✅ Dependencias actualizadas"
+source ./dependencias.sh
 echo ""
 
-# 4. Abrir el navegador automáticamente
-# Espera 3 segundos para que Flask inicie correctamente
-echo "🌐 Abriendo navegador en 3 segundos..."
-(sleep 3 && xdg-open http://127.0.0.1:5000 2>/dev/null) &
+# 4. Abrir el navegador apenas el servidor acepte conexiones
+# Se prueba el puerto cada 0,2 segundos (hasta 30 segundos) en lugar de esperar un tiempo fijo
+echo "🌐 El navegador se abrirá cuando el servidor esté listo..."
+(
+    for _ in $(seq 150); do
+        if (echo > /dev/tcp/127.0.0.1/5000) 2>/dev/null; then
+            xdg-open http://127.0.0.1:5000 2>/dev/null
+            exit 0
+        fi
+        sleep 0.2
+    done
+    echo "⚠️  El servidor no respondió; abrí http://localhost:5000 a mano"
+) &
 
 # 5. Ejecutar la aplicación Flask
 echo "🚀 Iniciando servidor Flask..."
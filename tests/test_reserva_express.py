@@ -0,0 +1,53 @@
+"""
+Conflictos de la reserva express con las estadías de pasajeros.csv.
+"""
+
+import os
+import sys
+from datetime import date, timedelta
+
+import pandas as pd
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if RAIZ not in sys.path:
+    sys.path.insert(0, RAIZ)
+
+from core.almacen import PasajerosStore
+from core.reserva_express import _verificar_conflicto
+
+HOY = date(2026, 3, 10)
+
+
+def _almacen(carpeta, estadias):
+    """PasajerosStore con una fila por (habitación, ingreso, egreso)"""
+    archivo = os.path.join(carpeta, 'pasajeros.csv')
+    pd.DataFrame({
+        'Nro. habitación': [habitacion for habitacion, _, _ in estadias],
+        'Fecha de ingreso': [ingreso.strftime('%d/%m/%Y') for _, ingreso, _ in estadias],
+        'Fecha de egreso': [egreso.strftime('%d/%m/%Y') for _, _, egreso in estadias],
+        'Apellido y nombre': 'Pasajero',
+    }).to_csv(archivo, index=False)
+    return PasajerosStore(archivo)
+
+
+def test_pasajero_con_egreso_vencido_ocupa_la_habitacion(tmp_path):
+    # Egresaba ayer pero todavía no se procesó el checkout: sigue en la habitación
+    almacen = _almacen(tmp_path, [(101, HOY - timedelta(days=5), HOY - timedelta(days=1))])
+
+    error = _verificar_conflicto(almacen, 101, HOY, HOY + timedelta(days=1))
+
+    assert error == "La habitación 101 ya está ocupada"
+
+
+def test_reserva_futura_limita_las_noches(tmp_path):
+    almacen = _almacen(tmp_path, [(101, HOY + timedelta(days=2), HOY + timedelta(days=5))])
+
+    assert _verificar_conflicto(almacen, 101, HOY, HOY + timedelta(days=2)) is None
+    error = _verificar_conflicto(almacen, 101, HOY, HOY + timedelta(days=3))
+    assert error == "La habitación 101 tiene una reserva el 12/03/2026. Máximo 2 noche(s) disponible(s)"
+
+
+def test_habitacion_sin_estadias_esta_libre(tmp_path):
+    almacen = _almacen(tmp_path, [(101, HOY - timedelta(days=5), HOY - timedelta(days=1))])
+
+    assert _verificar_conflicto(almacen, 102, HOY, HOY + timedelta(days=1)) is None
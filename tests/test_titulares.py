@@ -0,0 +1,107 @@
+"""
+Equivalencia de resolver_titulares (groupby) con la resolución original
+fila por fila basada en obtener_titular_por_edad, sobre grupos de pasajeros
+generados al azar: vouchers familiares de varias habitaciones, empates de
+edad, edades faltantes o inválidas y pasajeros sin voucher.
+
+Cada caso se escribe como CSV y se lee como lo hacía cada versión: la
+original con pd.read_csv sin tipos, la actual con los tipos del almacén.
+"""
+
+import io
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if RAIZ not in sys.path:
+    sys.path.insert(0, RAIZ)
+
+from core.almacen import TIPOS_PASAJEROS, tipar_pasajeros
+from core.dashboard import obtener_titular_por_edad, resolver_titulares
+
+# Edades que la versión original interpretaba igual que la actual
+EDADES = ['30', '30', '45', '45', '70', '8', '', 'sin dato']
+
+
+def _csv_al_azar(semilla):
+    rng = np.random.default_rng(semilla)
+    cantidad = int(rng.integers(1, 40))
+    df = pd.DataFrame({
+        'Nro. habitación': rng.choice([101, 102, 103, 222, 223, 343, 344], size=cantidad),
+        'Apellido y nombre': [f'Pasajero {i}' for i in range(cantidad)],
+        # Pocos vouchers para que se repitan entre habitaciones (familias)
+        'Voucher': rng.choice(['V1', 'V2', ' V2 ', 'V3', '', '', 'V4'], size=cantidad),
+        'Edad': rng.choice(EDADES, size=cantidad),
+        'Fecha de ingreso': '01/03/2026',
+        'Fecha de egreso': '08/03/2026',
+    })
+    return df.to_csv(index=False)
+
+
+def _titulares_actuales(csv):
+    """{habitación: nombre del titular} con resolver_titulares, leyendo como el almacén"""
+    df = pd.read_csv(io.StringIO(csv), dtype=TIPOS_PASAJEROS)
+    titulares = resolver_titulares(df, tipar_pasajeros(df))
+    return {int(num_hab): df.loc[fila, 'Apellido y nombre'] for num_hab, fila in titulares['titular'].items()}
+
+
+def _titulares_fila_por_fila(csv):
+    """
+    Resolución original de obtener_habitaciones_ocupadas: read_csv sin
+    tipos y agrupación fila por fila. {habitación: nombre del titular}
+    """
+    df = pd.read_csv(io.StringIO(csv))
+    pasajeros = [row.to_dict() for _, row in df.iterrows()]
+
+    vouchers = {}
+    for pasajero in pasajeros:
+        voucher = str(pasajero.get('Voucher', '')).strip()
+        if voucher:
+            vouchers.setdefault(voucher, []).append(pasajero)
+    titulares_por_voucher = {voucher: obtener_titular_por_edad(grupo) for voucher, grupo in vouchers.items()}
+
+    por_habitacion = {}
+    for pasajero in pasajeros:
+        por_habitacion.setdefault(int(pasajero['Nro. habitación']), []).append(pasajero)
+
+    titulares = {}
+    for num_hab, pasajeros_hab in por_habitacion.items():
+        voucher = str(pasajeros_hab[0].get('Voucher', '')).strip()
+        habitaciones_del_voucher = [p['Nro. habitación'] for p in vouchers.get(voucher, [])]
+        if voucher and len(set(habitaciones_del_voucher)) > 1:
+            titular = titulares_por_voucher.get(voucher)
+        else:
+            titular = obtener_titular_por_edad(pasajeros_hab)
+        titulares[num_hab] = titular['Apellido y nombre']
+    return titulares
+
+
+@pytest.mark.parametrize('semilla', range(300))
+def test_resolver_titulares_igual_a_fila_por_fila(semilla):
+    csv = _csv_al_azar(semilla)
+    resultado = _titulares_actuales(csv)
+
+    assert resultado == _titulares_fila_por_fila(csv)
+    # Las habitaciones salen en el orden en que aparecen en el archivo
+    habitaciones = pd.read_csv(io.StringIO(csv))['Nro. habitación'].astype(int)
+    assert list(resultado) == list(dict.fromkeys(habitaciones))
+
+
+def test_edad_con_decimales_se_interpreta():
+    """
+    Diferencia buscada: si la columna Edad tiene algún texto, read_csv sin
+    tipos la dejaba como texto y int('45.0') fallaba, así que la versión
+    original tomaba al primer pasajero de la habitación. Ahora '45.0' es 45
+    y el titular es el mayor.
+    """
+    csv = ('Nro. habitación,Apellido y nombre,Voucher,Edad,Fecha de ingreso,Fecha de egreso\n'
+           '101,Menor,V1,30,01/03/2026,08/03/2026\n'
+           '101,Mayor,V1,45.0,01/03/2026,08/03/2026\n'
+           '102,Otro,V2,sin dato,01/03/2026,08/03/2026\n')
+
+    assert _titulares_fila_por_fila(csv) == {101: 'Menor', 102: 'Otro'}
+    assert _titulares_actuales(csv) == {101: 'Mayor', 102: 'Otro'}